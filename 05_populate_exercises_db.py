@@ -1,60 +1,140 @@
 # 05_populate_exercises_db.py
+import argparse
+import time
 import pandas as pd
 import os
+from sqlalchemy import bindparam, delete, select, update
 from app import create_app
-from app.models import db, Exercise
+from app.models import db, Exercise, DataVersion
+from app.services import EQUIPMENT_PROFILES, equipment_profiles
 
 print("--- KORAK 5: PUNJENJE BAZE VJEŽBAMA I LINKOVIMA IZ EXCEL DATOTEKE ---")
 
 
 XLSX_PATH = os.path.join('data', 'Gym_exercise_dataset.xlsx')
 
+# Stupci iz Excel datoteke -> stupci tablice 'exercise'
+COLUMNS = {
+    'Exercise_Name': 'exercise_name',
+    'muscle_gp': 'body_part_targeted',
+    'Equipment': 'equipment_needed',
+    'Description_URL': 'link',
+}
+VALUE_COLUMNS = ['body_part_targeted', 'equipment_needed', 'difficulty', 'link']
 
-def populate_exercises():
-    """
-    Čita 'Gym_exercise_dataset.xlsx' i unosi vježbe u bazu.
-    """
-    try:
 
-        df = pd.read_excel(XLSX_PATH)
+def load_exercises():
+    """Čita 'Gym_exercise_dataset.xlsx' i vraća DataFrame sa stupcima tablice 'exercise'."""
+    try:
+        df = pd.read_excel(XLSX_PATH, usecols=list(COLUMNS))
         print(f"-> Učitano {len(df)} vježbi iz datoteke: {XLSX_PATH}")
     except FileNotFoundError:
         print(f"GREŠKA: Datoteka '{XLSX_PATH}' nije pronađena. Jeste li je stavili u 'data' direktorij?")
-        return
+        return None
     except Exception as e:
         print(f"GREŠKA pri čitanju Excel datoteke: {e}")
-        return
+        return None
 
-    df.dropna(subset=['Exercise_Name', 'muscle_gp', 'Equipment', 'Description_URL'], inplace=True)
+    df = df.dropna(subset=list(COLUMNS)).rename(columns=COLUMNS)
+    df['difficulty'] = 'Intermediate'
+    return df[['exercise_name'] + VALUE_COLUMNS]
+
+
+def replace_exercises(df, connection):
+    """Briše sve vježbe i unosi nove u serijama od 1000 redaka; vraća promijenjene DataVersion nazive."""
+    connection.execute(delete(Exercise.__table__))
+    df.to_sql('exercise', connection, if_exists='append', index=False, chunksize=1000)
+    print(f"-> Zamijenjeno: {len(df)} vježbi.")
+    return ['exercise'] + [f'exercise:{profile}' for profile in EQUIPMENT_PROFILES]
+
+
+def upsert_exercises(df, connection):
+    """
+    Uspoređuje datoteku s bazom po nazivu vježbe i dira samo nove, promijenjene i uklonjene retke.
+    Vraća DataVersion nazive koje treba povećati: naziv 'exercise' (indeks naziva) samo ako su
+    dodane/uklonjene vježbe, a 'exercise:<profil>' samo za profile opreme kojih se promjena tiče.
+    """
+    table = Exercise.__table__
+    df = df.drop_duplicates(subset=['exercise_name'], keep='first')
+    existing = pd.read_sql(select(table.c.id, table.c.exercise_name, *[table.c[c] for c in VALUE_COLUMNS]),
+                           connection)
+    # Stari duplikati istog naziva: zadržavamo prvi redak, ostale brišemo
+    duplicates = existing[existing.duplicated(subset=['exercise_name'], keep='first')]
+    existing = existing.drop(duplicates.index)
 
+    merged = df.merge(existing, on='exercise_name', how='outer', suffixes=('', '_old'), indicator=True)
+    inserted = merged[merged['_merge'] == 'left_only']
+    removed = merged[merged['_merge'] == 'right_only']
+    both = merged[merged['_merge'] == 'both']
+    changed = pd.Series(False, index=both.index)
+    for column in VALUE_COLUMNS:
+        new, old = both[column], both[f'{column}_old']
+        changed |= (new != old) & ~(new.isna() & old.isna())
+    updated = both[changed]
 
-    for index, row in df.iterrows():
-        new_exercise = Exercise(
-            exercise_name=row['Exercise_Name'],
-            body_part_targeted=row['muscle_gp'],
-            equipment_needed=row['Equipment'],
-            difficulty='Intermediate',
-            link=row['Description_URL']
-        )
-        db.session.add(new_exercise)
+    if len(inserted):
+        inserted[['exercise_name'] + VALUE_COLUMNS].to_sql('exercise', connection, if_exists='append',
+                                                          index=False, chunksize=1000)
+    if len(updated):
+        records = updated[['id'] + VALUE_COLUMNS].rename(columns={'id': 'row_id'})
+        connection.execute(update(table).where(table.c.id == bindparam('row_id')),
+                           records.astype(object).where(records.notna(), None).to_dict('records'))
+    removed_ids = [int(i) for i in removed['id']] + [int(i) for i in duplicates['id']]
+    for start in range(0, len(removed_ids), 500):
+        connection.execute(delete(table).where(table.c.id.in_(removed_ids[start:start + 500])))
 
-    # Spremi sve promjene u bazu
+    print(f"-> Nove: {len(inserted)}, promijenjene: {len(updated)}, uklonjene: {len(removed_ids)}, "
+          f"nepromijenjene: {len(both) - len(updated)}")
+
+    touched_equipment = set(inserted['equipment_needed']) | set(updated['equipment_needed']) \
+        | set(updated['equipment_needed_old']) | set(removed['equipment_needed_old']) \
+        | set(duplicates['equipment_needed'])
+    profiles = {profile for equipment in touched_equipment for profile in equipment_profiles(equipment)}
+    versions = [f'exercise:{profile}' for profile in sorted(profiles)]
+    if len(inserted) or removed_ids:
+        versions.insert(0, 'exercise')
+    return versions
+
+
+def populate_exercises(mode='replace'):
+    """
+    Unosi vježbe u bazu u jednoj transakciji. 'replace' briše i ponovno puni cijelu tablicu,
+    'upsert' mijenja samo razlike, pa ne poništava bazene vježbi kojih se promjena ne tiče.
+    """
+    df = load_exercises()
+    if df is None:
+        return
+
+    started = time.perf_counter()
     try:
+        connection = db.session.connection()
+        if mode == 'upsert':
+            versions = upsert_exercises(df, connection)
+        else:
+            versions = replace_exercises(df, connection)
+        # Aplikacija po verzijama zna koje indekse i bazene vježbi treba ponovno izgraditi
+        for name in versions:
+            DataVersion.bump(name)
         db.session.commit()
-        print(f"\n-> Baza podataka je uspješno popunjena s {len(df)} vježbi!")
     except Exception as e:
         db.session.rollback()
         print(f"\nGREŠKA pri spremanju u bazu: {e}")
+        return
+
+    elapsed = time.perf_counter() - started
+    print(f"\n-> Baza podataka je uspješno popunjena s {len(df)} vježbi "
+          f"({elapsed:.2f} s, {len(df) / max(elapsed, 1e-9):,.0f} redaka/s).")
+    print(f"-> Povećane verzije: {', '.join(versions) or 'nema promjena'}")
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Punjenje tablice vježbi iz Excel datoteke.")
+    parser.add_argument('--mode', choices=['replace', 'upsert'], default='replace',
+                        help="replace = obriši i ponovno napuni; upsert = promijeni samo razlike po nazivu vježbe")
+    args = parser.parse_args()
 
     app = create_app()
 
-
     with app.app_context():
-        print("Brišem stare unose iz tablice vježbi...")
-        db.session.query(Exercise).delete()
-        db.session.commit()
-        print("Započinjem novo punjenje...")
-        populate_exercises()
+        print(f"Započinjem punjenje (način: {args.mode})...")
+        populate_exercises(args.mode)
@@ -1,22 +1,46 @@
 # a_11_populate_usda_db.py (Verzija prilagođena za novu strukturu)
+import argparse
+import time
 import pandas as pd
 import os
+from sqlalchemy import text
+from sqlalchemy.orm import Session
 from app import create_app
-from app.models import db, FoodItem
+from app.models import db, FoodItem, DataVersion
 
 print("--- KORAK 11: PUNJENJE BAZE PODATAKA S USDA NAMIRNICAMA ---")
 
 # Putanja do .csv dataseta
 CSV_PATH = os.path.join('data', 'USDA.csv')
+CHUNK_SIZE = 5000
 
+# Stupci iz USDA.csv -> stupci tablice 'food_item'. Čitaju se samo ti stupci; nutrijenti ostaju
+# float64 jer idu u REAL stupce (float32 bi 52.1 spremio kao 52.099998)
+COLUMNS = {
+    'Description': 'name',
+    'Calories': 'calories',
+    'Protein': 'protein',
+    'TotalFat': 'fat',
+    'Carbohydrate': 'carbs'
+}
+DTYPES = {'Description': 'string', 'Calories': 'float64', 'Protein': 'float64',
+          'TotalFat': 'float64', 'Carbohydrate': 'float64'}
 
-def populate_food_items():
+
+def populate_food_items(chunk_size=CHUNK_SIZE, prune=False):
     """
-    Čita 'USDA.csv' i unosi namirnice u bazu.
+    Čita 'USDA.csv' u blokovima i upsertom (po nazivu) unosi namirnice u bazu.
+
+    Svaki blok ide u svojoj kratkoj transakciji, pa aplikacija za vrijeme uvoza može
+    upisivati u bazu, a tablica nikad nije prazna. Kao i prije vrijedi prvo pojavljivanje
+    naziva u datoteci; već viđeni nazivi pamte se u privremenoj tablici (na istoj konekciji),
+    tako da memorija ovisi samo o veličini bloka. Brisanje namirnica kojih više nema u
+    datoteci (`prune=True`) i nova verzija tablice idu na kraju u zasebnoj transakciji.
+    Ako uvoz pukne usred datoteke, već spremljeni blokovi ostaju (upsert je idempotentan),
+    ali bez brisanja i nove verzije - skriptu treba ponovno pokrenuti.
     """
     try:
-        df = pd.read_csv(CSV_PATH)
-        print(f"-> Učitano {len(df)} namirnica iz datoteke: {CSV_PATH}")
+        reader = pd.read_csv(CSV_PATH, usecols=list(COLUMNS), dtype=DTYPES, chunksize=chunk_size)
     except FileNotFoundError:
         print(f"GREŠKA: Datoteka '{CSV_PATH}' nije pronađena. Jeste li je stavili u 'data' direktorij?")
         return
@@ -24,50 +48,68 @@ def populate_food_items():
         print(f"GREŠKA pri čitanju CSV datoteke: {e}")
         return
 
-    # Očisti podatke - izbacujemo retke gdje nedostaju ključni podaci
-    required_columns = ['Description', 'Calories', 'Protein', 'TotalFat', 'Carbohydrate']
-    df.dropna(subset=required_columns, inplace=True)
-
-    # Preimenuj stupce da odgovaraju našem modelu u bazi podataka
-    df.rename(columns={
-        'Description': 'name',
-        'Calories': 'calories',
-        'Protein': 'protein',
-        'TotalFat': 'fat',
-        'Carbohydrate': 'carbs'
-    }, inplace=True)
-
-    # Filtriramo samo potrebne stupce nakon preimenovanja
-    df_to_load = df[['name', 'calories', 'protein', 'fat', 'carbs']]
-    # Uklanjamo duplikate po imenu
-    df_to_load.drop_duplicates(subset=['name'], inplace=True)
+    started = time.perf_counter()
+    total = 0
+    connection = db.engine.connect()
+    try:
+        connection.execute(text("CREATE TEMP TABLE IF NOT EXISTS usda_seen (name TEXT PRIMARY KEY)"))
+        connection.execute(text("CREATE TEMP TABLE IF NOT EXISTS usda_chunk "
+                                "(name TEXT PRIMARY KEY, calories REAL, protein REAL, fat REAL, carbs REAL)"))
+        connection.execute(text("DELETE FROM usda_seen"))
+        connection.commit()
 
-    print(f"Nakon čišćenja, unosim {len(df_to_load)} jedinstvenih namirnica u bazu...")
+        for number, chunk in enumerate(reader, start=1):
+            chunk_started = time.perf_counter()
+            # Očisti podatke - izbacujemo retke gdje nedostaju ključni podaci, pa duplikate u bloku
+            chunk = chunk.dropna(subset=list(COLUMNS)).rename(columns=COLUMNS).drop_duplicates(subset=['name'])
+            connection.execute(text("DELETE FROM usda_chunk"))
+            if len(chunk):
+                connection.execute(text("INSERT INTO usda_chunk (name, calories, protein, fat, carbs) "
+                                        "VALUES (:name, :calories, :protein, :fat, :carbs)"),
+                                   chunk.to_dict('records'))
+            # Upsert iz SELECT-a: SQLite traži WHERE u SELECT-u da bi ispravno parsirao ON CONFLICT
+            result = connection.execute(text(
+                "INSERT INTO food_item (name, calories, protein, fat, carbs) "
+                "SELECT name, calories, protein, fat, carbs FROM usda_chunk "
+                "WHERE name NOT IN (SELECT name FROM usda_seen) "
+                "ON CONFLICT (name) DO UPDATE SET calories = excluded.calories, protein = excluded.protein, "
+                "fat = excluded.fat, carbs = excluded.carbs"))
+            connection.execute(text("INSERT OR IGNORE INTO usda_seen (name) SELECT name FROM usda_chunk"))
+            connection.commit()
+            total += result.rowcount
+            elapsed = time.perf_counter() - chunk_started
+            print(f"   Blok {number}: {result.rowcount} namirnica u {elapsed:.3f} s "
+                  f"({result.rowcount / max(elapsed, 1e-9):,.0f} redaka/s)")
 
-    try:
-        # Koristimo to_sql za brzi unos svih podataka odjednom
-        # 'food_item' je ime tablice u bazi podataka
-        df_to_load.to_sql('food_item', db.engine, if_exists='append', index=False, chunksize=1000)
-        print("\n-> Baza podataka je uspješno popunjena USDA namirnicama!")
+        # Završna transakcija na istoj konekciji (privremena tablica usda_seen postoji samo na njoj)
+        with Session(bind=connection) as session:
+            removed = 0
+            if prune:
+                removed = session.execute(text(
+                    "DELETE FROM food_item WHERE name NOT IN (SELECT name FROM usda_seen)")).rowcount
+            # Aplikacija po verziji zna da treba ponovno izgraditi indeks naziva namirnica
+            DataVersion.bump('food_item', session)
+            session.commit()
     except Exception as e:
+        connection.rollback()
         print(f"\nGREŠKA pri spremanju u bazu: {e}")
-        print("Mogući uzrok je da podaci već postoje. Pokušajte prvo obrisati stare unose.")
+        return
+    finally:
+        connection.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"\n-> Baza podataka je uspješno popunjena USDA namirnicama: {total} unesenih/ažuriranih"
+          f"{f', {removed} uklonjenih' if prune else ''} ({elapsed:.2f} s).")
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Uvoz USDA namirnica u tablicu food_item.")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="broj redaka CSV-a po bloku")
+    parser.add_argument('--prune', action='store_true', help="obriši namirnice kojih više nema u datoteci")
+    args = parser.parse_args()
 
     app = create_app()
 
-
     with app.app_context():
-        print("Brišem stare unose iz tablice namirnica (food_item)...")
-        try:
-            db.session.query(FoodItem).delete()
-            db.session.commit()
-            print("Stari unosi obrisani.")
-        except Exception as e:
-            db.session.rollback()
-            print(f"Greška pri brisanju starih unosa: {e}")
-
-        print("Započinjem novo punjenje...")
-        populate_food_items()
+        print("Započinjem uvoz...")
+        populate_food_items(args.chunk_size, args.prune)
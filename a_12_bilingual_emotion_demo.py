@@ -1,66 +1,28 @@
 # a_12_bilingual_emotion_demo.py
-from transformers import pipeline
-from langdetect import detect, LangDetectException
+from emotion_service import emotion_service
 
 print("--- KORAK 12: DEMONSTRACIJA BILINGVALNOG MODELA (V2.1 - ISPRAVLJENO) ---")
 
 # --- Učitavanje OBA modela pri pokretanju ---
 print("Učitavam modele... (ovo može potrajati)")
-try:
-    emotion_classifier = pipeline(
-        "text-classification",
-        model="j-hartmann/emotion-english-distilroberta-base",
-        top_k=1
-    )
-    print("-> Engleski model za emocije uspješno učitan.")
-
-    sentiment_classifier = pipeline(
-        "sentiment-analysis",
-        model="nlptown/bert-base-multilingual-uncased-sentiment"
-    )
-    print("-> Višejezični model za sentiment uspješno učitan.")
-
-except Exception as e:
-    print(f"Greška pri učitavanju modela: {e}")
-    emotion_classifier = None
-    sentiment_classifier = None
+emotion_classifier, sentiment_classifier = emotion_service.load()
 
 
 def analyze_bilingual_emotion(text):
     """
-    Detektira jezik teksta i koristi odgovarajući model za analizu.
+    Detektira jezik teksta i koristi odgovarajući model za analizu (vidi emotion_service.py).
     """
     if not text or (emotion_classifier is None and sentiment_classifier is None):
         return {"error": "Nema unosa ili modeli nisu dostupni."}
 
-    try:
-        lang = detect(text)
-        print(f"(Detektiran jezik: {lang})")
-
-        if lang == 'en' and emotion_classifier:
-            # =============================== KLJUČAN POPRAVAK OVDJE ===============================
-            # Dohvaćamo prvi element vanjske liste, pa prvi element unutarnje liste
-            result_dict = emotion_classifier(text)[0][0]
-            # ====================================================================================
-            return {"language": "en", "type": "emotion", "value": result_dict['label'], "score": result_dict['score']}
-        else:
-            if sentiment_classifier:
-                result_dict = sentiment_classifier(text)[0]
-                score = int(result_dict['label'].split()[0])
-
-                if score <= 2:
-                    sentiment = 'negative'
-                elif score == 3:
-                    sentiment = 'neutral'
-                else:
-                    sentiment = 'positive'
-
-                return {"language": lang, "type": "sentiment", "value": sentiment, "score": result_dict['score']}
-            else:
-                return {"error": "Višejezični model nije dostupan."}
-
-    except LangDetectException:
+    result = emotion_service.analyze([text])[0]
+    if result['language'] is None:
         return {"error": "Nije moguće detektirati jezik."}
+    print(f"(Detektiran jezik: {result['language']})")
+    if result['type'] is None:
+        return {"error": "Višejezični model nije dostupan."}
+    return {"language": result['language'], "type": result['type'], "value": result['label'],
+            "score": result['score']}
 
 
 if __name__ == '__main__':
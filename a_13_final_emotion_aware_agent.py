@@ -10,48 +10,87 @@ project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ''))
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
-from app import User
-from transformers import pipeline
-from langdetect import detect, LangDetectException
+from app.models import User
+from emotion_service import EMOTION_MAP, emotion_service
 
 print("--- KORAK 13: TRENIRANJE FINALNOG, EMOCIONALNO SVJESNOG RL AGENTA ---")
 
-# --- 1. Učitavanje Modela za Emocije ---
-print("Učitavam modele za analizu teksta...")
-try:
-    emotion_classifier = pipeline("text-classification", model="j-hartmann/emotion-english-distilroberta-base", top_k=1)
-    sentiment_classifier = pipeline("sentiment-analysis", model="nlptown/bert-base-multilingual-uncased-sentiment")
-    print("-> Modeli za emocije/sentiment uspješno učitani.")
-except Exception as e:
-    print(f"GREŠKA pri učitavanju NLP modela: {e}")
-    emotion_classifier = sentiment_classifier = None
+# --- 1. Modeli za Emocije (emotion_service: učitavaju se tek pri prvoj klasifikaciji) ---
+def get_classifiers():
+    return emotion_service.load()
+
+
+def build_emotion_lookup(texts):
+    """
+    Vraća {tekst: oznaka} za sve tekstove. Još neviđeni tekstovi klasificiraju se zajedno -
+    jedan batch poziv po modelu - a rezultat se pamti, pa se isti tekst nikad ne klasificira dvaput.
+    """
+    return dict(zip(texts, emotion_service.labels(texts)))
+
 
 def analyze_bilingual_emotion(text):
     if not text: return "neutral"
-    try:
-        lang = detect(text)
-        if lang == 'en' and emotion_classifier:
-            return emotion_classifier(text)[0][0]['label']
-        elif sentiment_classifier:
-            result = sentiment_classifier(text)[0]
-            score = int(result['label'].split()[0])
-            if score <= 2: return 'negative'
-            elif score == 3: return 'neutral'
-            else: return 'positive'
-        return "neutral"
-    except LangDetectException:
-        return "neutral"
+    return emotion_service.labels([text])[0]
 
 # --- 2. Definiranje Finalnog Okruženja (V4) ---
+EMOTION_TEXTS = ["I feel great today", "I am so sad", "Just a regular day"]
+MEAL_CALORIES = [300, 600, 900]
+
+
+def compute_reward(user_goal, caloric_status, is_training_day, emotion_idx, action):
+    """Nagrada za jedan obrok; zajednička za NutritionEnvironmentV4 i vektorizirani trener (a_14)."""
+    reward = 0
+    if user_goal == 0:
+        if caloric_status == 0: reward += 15
+        elif caloric_status == 1: reward += -5 if not is_training_day else 5
+        else: reward += -20 if not is_training_day else -10
+    elif user_goal == 1:
+        reward += 15 if caloric_status == 1 else -10
+    elif user_goal == 2:
+        if caloric_status == 2: reward += 15 if is_training_day else 10
+        elif caloric_status == 1: reward += 5
+        else: reward += -20
+    if emotion_idx == 2:
+        if action == 1: reward += 10
+        elif action == 0: reward += -5
+    elif emotion_idx == 0:
+        if action == 0: reward += 10
+    return reward
+
+
 class NutritionEnvironmentV4:
-    def __init__(self, user, workout_plan_structure):
+    def __init__(self, user, workout_plan_structure, emotion_lookup=None, emotion_distribution=None):
+        """
+        Emocije se ne klasificiraju u petlji treniranja. `emotion_lookup` je {tekst: oznaka} za
+        EMOTION_TEXTS (ako nije zadan, gradi se ovdje jednim batch pozivom), a `emotion_distribution`
+        su vjerojatnosti indeksa emocija [pozitivno, neutralno, negativno] - tada se tekstovi ne koriste.
+        """
         self.user, self.workout_plan_structure = user, workout_plan_structure
         self.tdee = self._calculate_tdee()
         self.state_space_shape = (7, 3, 3, 3)
         self.action_space_size = 3
-        self.emotion_map = {'positive': 0, 'joy': 0, 'love': 0, 'surprise': 0, 'neutral': 1, 'negative': 2, 'sadness': 2, 'anger': 2, 'fear': 2}
+        self.emotion_map = EMOTION_MAP
+        self.emotion_distribution = emotion_distribution
+        if emotion_distribution is None:
+            lookup = emotion_lookup or build_emotion_lookup(EMOTION_TEXTS)
+            self.text_emotion_idx = {text: self.emotion_map.get(lookup.get(text), 1) for text in EMOTION_TEXTS}
         self.reset(0)
 
+    def emotion_probabilities(self):
+        """Vjerojatnost svakog indeksa emocije po koraku (koristi vektorizirani trener u a_14)."""
+        if self.emotion_distribution is not None:
+            probabilities = np.asarray(self.emotion_distribution, dtype=np.float64)
+        else:
+            probabilities = np.bincount(list(self.text_emotion_idx.values()), minlength=3).astype(np.float64)
+        return probabilities / probabilities.sum()
+
+    def _draw_emotion(self):
+        if self.emotion_distribution is not None:
+            self.current_emotion_text = None
+            return random.choices(range(3), weights=self.emotion_distribution)[0]
+        self.current_emotion_text = random.choice(EMOTION_TEXTS)
+        return self.text_emotion_idx[self.current_emotion_text]
+
     def _calculate_tdee(self):
         s = 5 if self.user.gender == 'male' else -161
         bmr = (10 * self.user.weight) + (6.25 * self.user.height) - (5 * self.user.age) + s
@@ -70,37 +109,18 @@ class NutritionEnvironmentV4:
         self.calories_consumed_today = 0
         self.user_goal = {'weight_loss': 0, 'maintenance': 1, 'muscle_gain': 2}.get(self.user.goal)
         self.done = False
-        self.current_emotion_text = random.choice(["I feel great today", "I am so sad", "Just a regular day"])
-        emotion = analyze_bilingual_emotion(self.current_emotion_text)
-        self.current_emotion_idx = self.emotion_map.get(emotion, 1)
+        self.current_emotion_idx = self._draw_emotion()
         return (self.day_of_week, self.user_goal, self._get_caloric_status(), self.current_emotion_idx)
 
     def step(self, action):
-        meal_calories = [300, 600, 900][action]
+        meal_calories = MEAL_CALORIES[action]
         self.calories_consumed_today += meal_calories
         is_training_day = "Odmor" not in self.workout_plan_structure.get(self.day_of_week, "Odmor")
-        reward = 0
         current_status = self._get_caloric_status()
-        if self.user_goal == 0:
-            if current_status == 0: reward += 15
-            elif current_status == 1: reward += -5 if not is_training_day else 5
-            else: reward += -20 if not is_training_day else -10
-        elif self.user_goal == 1:
-            reward += 15 if current_status == 1 else -10
-        elif self.user_goal == 2:
-            if current_status == 2: reward += 15 if is_training_day else 10
-            elif current_status == 1: reward += 5
-            else: reward += -20
-        if self.current_emotion_idx == 2:
-            if action == 1: reward += 10
-            elif action == 0: reward += -5
-        elif self.current_emotion_idx == 0:
-            if action == 0: reward += 10
+        reward = compute_reward(self.user_goal, current_status, is_training_day, self.current_emotion_idx, action)
         self.time_of_day += 1
         if self.time_of_day >= 3: self.done = True
-        self.current_emotion_text = random.choice(["I feel great today", "I am so sad", "Just a regular day"])
-        emotion = analyze_bilingual_emotion(self.current_emotion_text)
-        self.current_emotion_idx = self.emotion_map.get(emotion, 1)
+        self.current_emotion_idx = self._draw_emotion()
         next_state = (self.day_of_week, self.user_goal, self._get_caloric_status(), self.current_emotion_idx)
         return next_state, reward, self.done
 
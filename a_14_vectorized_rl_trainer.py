@@ -0,0 +1,112 @@
+# a_14_vectorized_rl_trainer.py
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import joblib
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ''))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from app.models import User
+from a_13_final_emotion_aware_agent import (NutritionEnvironmentV4, QLearningAgentV4, compute_reward,
+                                            build_emotion_lookup, EMOTION_TEXTS, MEAL_CALORIES)
+
+print("--- KORAK 14: VEKTORIZIRANO TRENIRANJE RL AGENATA (SVI CILJEVI) ---")
+
+GOALS = ['weight_loss', 'maintenance', 'muscle_gain']
+WORKOUT_DAYS = {0: "Trening", 1: "Trening", 2: "Odmor", 3: "Trening", 4: "Trening", 5: "Odmor", 6: "Odmor"}
+
+
+def train_vectorized(env, num_episodes=100000, num_envs=100, seed=None):
+    """
+    Trenira QLearningAgentV4 na `num_envs` neovisnih okruženja u koraku (lockstep).
+
+    Stanja, kalorije i nagrade su numpy polja, a nagrade se čitaju iz tablice izračunate
+    iz compute_reward(). Ako u istom koraku k okruženja ažurira istu (stanje, akcija)
+    ćeliju, ćelija se pomiče prema prosjeku njihovih ciljeva kao da je ažurirana k puta
+    zaredom. Epsilon opada jednako kao u a_13 - jednom po prijelazu, dakle `num_envs`
+    puta po koraku.
+    """
+    rng = np.random.default_rng(seed)
+    agent = QLearningAgentV4(state_shape=env.state_space_shape, action_size=env.action_space_size)
+    q_table = agent.q_table
+    q_flat = q_table.reshape(-1)
+    goal = env.user_goal
+
+    is_training_day = np.array(["Odmor" not in env.workout_plan_structure.get(day, "Odmor") for day in range(7)],
+                               dtype=np.intp)
+    emotion_probabilities = env.emotion_probabilities()
+    meal_calories = np.array(MEAL_CALORIES, dtype=np.float64)
+    # reward_table[status, trening, emocija, akcija]
+    reward_table = np.array([[[[compute_reward(goal, status, bool(training), emotion, action)
+                                for action in range(env.action_space_size)]
+                               for emotion in range(3)]
+                              for training in range(2)]
+                             for status in range(3)], dtype=np.float64)
+
+    def caloric_status(calories):
+        ratio = calories / env.tdee
+        return np.where(ratio < 0.85, 0, np.where(ratio <= 1.15, 1, 2))
+
+    for first_episode in range(0, num_episodes, num_envs):
+        n = min(num_envs, num_episodes - first_episode)
+        day = (first_episode + np.arange(n)) % 7
+        training = is_training_day[day]
+        calories = np.zeros(n)
+        status = caloric_status(calories)
+        emotion = rng.choice(3, size=n, p=emotion_probabilities)
+
+        for time_of_day in range(3):
+            explore = rng.random(n) < agent.epsilon
+            greedy = q_table[day, goal, status, emotion].argmax(axis=1)
+            action = np.where(explore, rng.integers(0, env.action_space_size, n), greedy)
+
+            calories = calories + meal_calories[action]
+            next_status = caloric_status(calories)
+            reward = reward_table[next_status, training, emotion, action]
+            next_emotion = rng.choice(3, size=n, p=emotion_probabilities)
+
+            done = time_of_day == 2
+            next_max = 0.0 if done else q_table[day, goal, next_status, next_emotion].max(axis=1)
+            cells = np.ravel_multi_index((day, np.full(n, goal), status, emotion, action), q_table.shape)
+            target = reward + agent.gamma * next_max
+            target_sum = np.bincount(cells, weights=target, minlength=q_flat.size)
+            hits = np.bincount(cells, minlength=q_flat.size)
+            touched = np.flatnonzero(hits)
+            # k uzastopnih ažuriranja prema istom cilju = jedan korak s udjelom 1 - (1 - lr)^k
+            rate = 1.0 - (1.0 - agent.lr) ** hits[touched]
+            q_flat[touched] += rate * (target_sum[touched] / hits[touched] - q_flat[touched])
+
+            if agent.epsilon > agent.epsilon_min:
+                agent.epsilon = max(agent.epsilon * agent.epsilon_decay ** n, agent.epsilon_min)
+            status, emotion = next_status, next_emotion
+
+    return agent
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Vektorizirano treniranje RL agenata za preporuke obroka.")
+    parser.add_argument('--episodes', type=int, default=100000)
+    parser.add_argument('--envs', type=int, default=100, help="broj paralelnih okruženja")
+    parser.add_argument('--goals', nargs='+', choices=GOALS, default=GOALS)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    MODELS_PATH = 'models'
+    os.makedirs(MODELS_PATH, exist_ok=True)
+    # Tekstovi emocija klasificiraju se jednom, zajedno, i dijele između svih ciljeva
+    emotion_lookup = build_emotion_lookup(EMOTION_TEXTS)
+    for goal in args.goals:
+        test_user = User(username='final_user', age=30, gender='male', height=180, weight=85,
+                         goal=goal, fitness_level='intermediate')
+        env = NutritionEnvironmentV4(user=test_user, workout_plan_structure=WORKOUT_DAYS,
+                                     emotion_lookup=emotion_lookup)
+        started = time.perf_counter()
+        agent = train_vectorized(env, args.episodes, args.envs, args.seed)
+        print(f"-> {goal}: {args.episodes} epizoda u {time.perf_counter() - started:.2f} s")
+        AGENT_PATH = os.path.join(MODELS_PATH, f'final_rl_agent_{goal}.joblib')
+        joblib.dump(agent, AGENT_PATH)
+        print(f"   Agent spremljen u: {AGENT_PATH}")
@@ -0,0 +1,140 @@
+# a_15_optimize_nlp_models.py
+import argparse
+import json
+import os
+import sys
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ''))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from model_variants import MODELS, OPTIMIZED_PATH, export_variant, load_model, variant_path
+
+print("--- KORAK 15: IZVOZ OPTIMIZIRANIH (INT8 / ONNX) VARIJANTI NLP MODELA ---")
+
+# Uzorci za usporedbu s fp32 modelom; za sentiment i hrvatski, jer ga aplikacija tako koristi
+SAMPLES = {
+    'dialogpt': ["Korisnik: Danas sam radio čučanj 3x10 100kg.\nTrener:",
+                 "Korisnik: I'm tired after my workout, what should I eat?\nTrener:",
+                 "Korisnik: Koliko vode trebam piti dnevno?\nTrener:",
+                 "Korisnik: I skipped the gym today.\nTrener:"],
+    'emotion': ["I feel great today", "I am so sad", "Just a regular day", "I'm furious that I missed my workout",
+                "That was a scary lift", "I can't believe I hit a new personal record!", "This diet is disgusting"],
+    'sentiment': ["Osjećam se odlično nakon treninga", "Danas sam jako umoran i tužan", "Običan dan, ništa posebno",
+                  "Ovo je najgori trening ikad", "I feel great today", "Prehrana mi ide sasvim solidno"],
+}
+
+
+def _directory_mb(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _dirs, files in os.walk(path) for name in files) / 1e6
+
+
+def _size_mb(key, variant, model):
+    """Veličina težina: izvezena datoteka za int8/onnx, parametri u memoriji za fp32."""
+    if variant == 'fp32':
+        return sum(p.numel() * p.element_size() for p in model.parameters()) / 1e6
+    return _directory_mb(variant_path(key, variant))
+
+
+def _predict(key, tokenizer, model, text):
+    """Predikcija za usporedbu: oznaka klase, ili za DialoGPT najvjerojatniji sljedeći token na svakoj poziciji."""
+    import torch
+    inputs = tokenizer(text, return_tensors='pt')
+    with torch.inference_mode():
+        logits = model(**inputs).logits
+    if key == 'dialogpt':
+        return logits[0].argmax(-1).tolist()
+    return int(logits[0].argmax(-1))
+
+
+def _timed_call(key, tokenizer, model, text):
+    import torch
+    inputs = tokenizer(text, return_tensors='pt')
+    started = time.perf_counter()
+    with torch.inference_mode():
+        if key == 'dialogpt':
+            model.generate(**inputs, max_new_tokens=32, do_sample=False, pad_token_id=tokenizer.eos_token_id)
+        else:
+            model(**inputs)
+    return time.perf_counter() - started
+
+
+def evaluate(key, variant, repeat=3):
+    """Vrijeme učitavanja, veličina, latencija i predikcije varijante na SAMPLES[key]."""
+    started = time.perf_counter()
+    tokenizer, model, loaded = load_model(key, variant)
+    load_seconds = time.perf_counter() - started
+    if loaded != variant:
+        return None
+
+    samples = SAMPLES[key]
+    _timed_call(key, tokenizer, model, samples[0])  # zagrijavanje
+    latencies = sorted(_timed_call(key, tokenizer, model, text) for _ in range(repeat) for text in samples)
+    return {
+        'load_seconds': round(load_seconds, 2),
+        'size_mb': round(_size_mb(key, variant, model), 1),
+        'latency_ms': {'mean': round(sum(latencies) / len(latencies) * 1000, 1),
+                       'p95': round(latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))] * 1000, 1)},
+        'predictions': [_predict(key, tokenizer, model, text) for text in samples],
+    }
+
+
+def _agreement(baseline, predictions):
+    """Udio predikcija jednakih fp32 (za DialoGPT po tokenima)."""
+    if isinstance(baseline[0], list):
+        pairs = [(a, b) for base, pred in zip(baseline, predictions) for a, b in zip(base, pred)]
+    else:
+        pairs = list(zip(baseline, predictions))
+    return round(sum(a == b for a, b in pairs) / len(pairs), 3)
+
+
+def compare(keys, variants, repeat=3):
+    """Izvještaj {model: {varijanta: metrike}} s omjerima prema fp32."""
+    report = {}
+    for key in keys:
+        print(f"\n== {MODELS[key]['name']} ==")
+        baseline = evaluate(key, 'fp32', repeat)
+        rows = {'fp32': baseline}
+        for variant in variants:
+            result = evaluate(key, variant, repeat)
+            if result is None:
+                print(f"-> {variant}: nije izvezena, preskačem")
+                continue
+            result['agreement_with_fp32'] = _agreement(baseline['predictions'], result['predictions'])
+            result['speedup'] = round(baseline['latency_ms']['mean'] / result['latency_ms']['mean'], 2)
+            result['size_ratio'] = round(result['size_mb'] / baseline['size_mb'], 3)
+            rows[variant] = result
+        for variant, result in rows.items():
+            print(f"-> {variant:5} {result['size_mb']:8.1f} MB  {result['latency_ms']['mean']:8.1f} ms  "
+                  f"ubrzanje {result.get('speedup', 1.0):4.2f}x  slaganje s fp32 {result.get('agreement_with_fp32', 1.0):.1%}")
+            result.pop('predictions')
+        report[key] = rows
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Izvoz int8/ONNX varijanti NLP modela i usporedba s fp32.")
+    parser.add_argument('--models', nargs='+', choices=sorted(MODELS), default=sorted(MODELS))
+    parser.add_argument('--variants', nargs='+', choices=['int8', 'onnx'], default=['int8'],
+                        help="onnx treba paket optimum[onnxruntime]")
+    parser.add_argument('--skip-export', action='store_true', help="samo usporedba već izvezenih varijanti")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--report', default=os.path.join(OPTIMIZED_PATH, 'report.json'))
+    args = parser.parse_args()
+
+    if not args.skip_export:
+        for key in args.models:
+            for variant in args.variants:
+                print(f"Izvozim {MODELS[key]['name']} ({variant})...")
+                try:
+                    print(f"-> Spremljeno u {export_variant(key, variant)}")
+                except ImportError as e:
+                    print(f"-> Preskačem, nedostaje paket: {e}")
+
+    report = compare(args.models, args.variants, args.repeat)
+    os.makedirs(os.path.dirname(args.report), exist_ok=True)
+    with open(args.report, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\nIzvještaj spremljen u {args.report}")
+    print("Odabir varijante u aplikaciji: MODEL_VARIANT=int8 (ili MODEL_VARIANT_DIALOGPT=onnx, ...)")
@@ -2,8 +2,12 @@
 
 import os
 import json
+import queue
 import random
 import re
+import threading
+import time
+from collections import OrderedDict, deque
 from datetime import datetime, timedelta
 from typing import List, Dict, Any
 
@@ -11,36 +15,467 @@ import torch
 from transformers import AutoTokenizer, AutoModelForCausalLM
 from langdetect import detect
 
+from fitness_patterns import extract
+from model_variants import load_model, model_key
+
+
+# Mikro-grupiranje generiranja: najviše zahtjeva u jednom pozivu modela i najdulje čekanje na njih
+MICRO_BATCH_MAX_SIZE = int(os.environ.get('MICRO_BATCH_MAX_SIZE', 8))
+MICRO_BATCH_MAX_WAIT_MS = float(os.environ.get('MICRO_BATCH_MAX_WAIT_MS', 10))
+MAX_NEW_TOKENS = 150
+# Povijest razgovora (tokeni) raste dok stane u budžet, a zatim se skraćuje na zadnjih HISTORY_TOKENS;
+# KV cache (past_key_values) po sesiji drži se samo unutar budžeta i ukupnog limita memorije
+HISTORY_TOKENS = 500
+KV_CACHE_MAX_TOKENS = int(os.environ.get('KV_CACHE_MAX_TOKENS', 640))
+# Ukupni limit memorije KV cache-a po procesu. Token košta K i V po sloju, float32: za DialoGPT-medium
+# 2 × 24 sloja × 1024 × 4 B = 192 KiB, tj. ~120 MiB za pun razgovor od 640 tokena, pa zadanih 384 MB
+# drži 3 puna razgovora (a više kraćih). Broj razgovora ispisuje se pri učitavanju modela; veći
+# limit (KV_CACHE_MAX_MB) ima smisla samo uz dovoljno memorije pored težina modela.
+KV_CACHE_MAX_MB = float(os.environ.get('KV_CACHE_MAX_MB', 384))
+
+
+def _whole(value):
+    """Broj bez decimala ako je cijeli (npr. 100.0 kg -> 100)."""
+    return int(value) if float(value).is_integer() else value
+
+
+def _cache_layers(cache):
+    """(key, value) po sloju modela, iz tuple-a ili Cache objekta koji vrati generate."""
+    if hasattr(cache, 'layers'):
+        return [(layer.keys, layer.values) for layer in cache.layers]
+    if hasattr(cache, 'to_legacy_cache'):
+        return list(cache.to_legacy_cache())
+    return list(cache)
+
+
+def _cache_from_layers(layers):
+    """Obrnuto od _cache_layers: oblik koji generate prima kao past_key_values."""
+    try:
+        from transformers import DynamicCache
+    except ImportError:
+        return tuple(layers)
+    if hasattr(DynamicCache, 'from_legacy_cache'):
+        return DynamicCache.from_legacy_cache(tuple(layers))
+    return DynamicCache(tuple(layers))
+
+
+class _GenerationRequest:
+    __slots__ = ('input_ids', 'past', 'cached', 'output', 'cache', 'error', 'done', 'enqueued')
+
+    def __init__(self, input_ids, past=None, cached=0):
+        self.input_ids = input_ids
+        self.past = past  # slojevi KV cache-a za prvih `cached` tokena ulaza (batch dimenzija 1)
+        self.cached = cached if past is not None else 0
+        self.output = None
+        self.cache = None
+        self.error = None
+        self.done = threading.Event()
+        self.enqueued = time.perf_counter()
+
+
+class KVCachePool:
+    """
+    past_key_values po sesiji razgovora. Cache pokriva tokene povijesti, pa se u sljedećem
+    potezu modelu šalju samo novi tokeni. Sesija čiji razgovor preraste `max_tokens` gubi
+    cache, a iznad `max_mb` odbacuju se najdulje nekorišteni. Cijena tokena računa se iz
+    konfiguracije modela (configure) ili se mjeri na prvom spremljenom cache-u.
+    """
+
+    def __init__(self, max_tokens=KV_CACHE_MAX_TOKENS, max_mb=KV_CACHE_MAX_MB):
+        self.max_tokens = max_tokens
+        self.max_bytes = max_mb * 1024 * 1024
+        self.bytes_per_token = None
+        self._entries = OrderedDict()  # id(sesije) -> sesija
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def sessions(self):
+        """Koliko punih razgovora (max_tokens) stane u limit; None dok cijena tokena nije poznata."""
+        if not self.bytes_per_token:
+            return None
+        return int(self.max_bytes // (self.max_tokens * self.bytes_per_token))
+
+    def configure(self, model):
+        """Cijena tokena iz konfiguracije modela (K i V po sloju); vraća broj punih razgovora u limitu."""
+        config = getattr(model, 'config', None)
+        layers = getattr(config, 'n_layer', None) or getattr(config, 'num_hidden_layers', None)
+        hidden = getattr(config, 'n_embd', None) or getattr(config, 'hidden_size', None)
+        if layers and hidden:
+            try:
+                element = next(model.parameters()).element_size()
+            except (AttributeError, StopIteration):
+                element = 4
+            with self._lock:
+                self.bytes_per_token = 2 * layers * hidden * element
+        return self.sessions
+
+    def _drop(self, session):
+        if session.kv_cache is not None:
+            self.bytes -= session.kv_cache[2]
+            session.kv_cache = None
+        self._entries.pop(id(session), None)
+
+    def take(self, session, input_ids):
+        """(slojevi, broj tokena) ako cache sesije pokriva početak `input_ids`, inače None; cache se vadi iz bazena."""
+        with self._lock:
+            entry = session.kv_cache
+            self._drop(session)
+            if entry is None or input_ids[:len(entry[1])] != entry[1]:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[0], len(entry[1])
+
+    def store(self, session, layers, token_ids):
+        """Spremi cache za `token_ids` (tokeni koje pokriva); preko budžeta tokena se ne sprema."""
+        with self._lock:
+            self._drop(session)
+            if len(token_ids) > self.max_tokens:
+                self.evictions += 1
+                return
+            size = sum(key.nbytes + value.nbytes for key, value in layers)
+            if self.bytes_per_token is None and token_ids:
+                self.bytes_per_token = size / len(token_ids)
+            session.kv_cache = (layers, list(token_ids), size)
+            self._entries[id(session)] = session
+            self.bytes += size
+            while self.bytes > self.max_bytes and self._entries:
+                _key, oldest = self._entries.popitem(last=False)
+                self._drop(oldest)
+                self.evictions += 1
+
+    def release(self, session):
+        with self._lock:
+            self._drop(session)
+
+    def stats(self):
+        with self._lock:
+            return {'sessions': len(self._entries), 'memory_mb': round(self.bytes / 1024 / 1024, 1),
+                    'max_tokens': self.max_tokens,
+                    'max_mb': round(self.max_bytes / 1024 / 1024, 1), 'full_sessions': self.sessions,
+                    'kib_per_token': round(self.bytes_per_token / 1024, 1) if self.bytes_per_token else None,
+                    'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+
+kv_cache_pool = KVCachePool()
+
+
+class MicroBatcher:
+    """
+    Red zahtjeva za generiranje ispred zajedničkog modela. Jedna pozadinska dretva uzima
+    prvi zahtjev, još najviše `max_wait_ms` skuplja istovremene (do `max_batch_size`),
+    poravna ih paddingom slijeva i pokrene jedan model.generate za sve. Na CPU-u je jedan
+    poziv za N ulaza znatno brži od N uzastopnih, pa propusnost raste s brojem korisnika.
+
+    Zahtjev može donijeti KV cache za početak svog ulaza; modelu tada ide samo ostatak.
+    Svaki redak batcha dobije natrag cache za cijeli svoj niz (bez paddinga).
+    """
+
+    def __init__(self, host, max_batch_size=MICRO_BATCH_MAX_SIZE, max_wait_ms=MICRO_BATCH_MAX_WAIT_MS,
+                 max_new_tokens=MAX_NEW_TOKENS, **generate_options):
+        self.host = host
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.max_new_tokens = max_new_tokens
+        self.generate_options = generate_options
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._latencies = deque(maxlen=1000)
+        self.requests = 0
+        self.batches = 0
+        self.errors = 0
+        self.generated_tokens = 0
+        self.busy_seconds = 0.0
+
+    def generate(self, input_ids, timeout=None, past=None, cached=0):
+        """
+        (novi tokeni, slojevi KV cache-a) za ulaz `input_ids`; blokira dok batch u kojem je
+        zahtjev ne završi. Vraćeni cache pokriva `input_ids` + novi tokeni bez zadnjeg.
+        """
+        request = _GenerationRequest(list(input_ids), past, cached)
+        self._start_worker()
+        self._queue.put(request)
+        if not request.done.wait(timeout):
+            raise TimeoutError("Generiranje odgovora nije završilo na vrijeme")
+        if request.error is not None:
+            raise request.error
+        return request.output, request.cache
+
+    def _start_worker(self):
+        if self._worker is not None:
+            return
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name='trainer-micro-batcher', daemon=True)
+                self._worker.start()
+
+    def _collect(self):
+        """Prvi zahtjev čeka se neograničeno, ostali najviše do roka od dolaska prvog."""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            self._run_batch(self._collect())
+
+    def _run_batch(self, batch):
+        tokenizer, model = self.host.tokenizer, self.host.model
+        pad_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+        eos_id = tokenizer.eos_token_id
+
+        # Svaki redak = [dio pokriven cache-om | novi dio]; oba dijela poravnata paddingom slijeva.
+        # Novi dio je dug koliko najdulji nepokriveni ostatak u batchu, pa retku s kraćim
+        # ostatkom zadnji tokeni cache-a idu modelu ponovno (cache se skrati na `kept`).
+        new_width = max(len(r.input_ids) - r.cached for r in batch)
+        kept = [max(0, min(r.cached, len(r.input_ids) - new_width)) for r in batch]
+        cache_width = max(kept)
+        padded, mask = [], []
+        for request, keep in zip(batch, kept):
+            head, tail = request.input_ids[:keep], request.input_ids[keep:]
+            padded.append([pad_id] * (cache_width - keep) + head + [pad_id] * (new_width - len(tail)) + tail)
+            mask.append([0] * (cache_width - keep) + [1] * keep + [0] * (new_width - len(tail)) + [1] * len(tail))
+
+        started = time.perf_counter()
+        generated = 0
+        try:
+            options = dict(self.generate_options)
+            if cache_width:
+                options['past_key_values'] = _cache_from_layers(self._stack_caches(batch, kept, cache_width))
+            with torch.inference_mode():
+                output = model.generate(
+                    torch.tensor(padded, dtype=torch.long),
+                    attention_mask=torch.tensor(mask, dtype=torch.long),
+                    max_new_tokens=self.max_new_tokens,
+                    pad_token_id=pad_id,
+                    use_cache=True,
+                    return_dict_in_generate=True,
+                    **options
+                )
+            width = cache_width + new_width
+            layers = _cache_layers(output.past_key_values)
+            for row, (request, tokens) in enumerate(zip(batch, output.sequences[:, width:].tolist())):
+                # Redak koji je ranije završio dopunjen je pad tokenima do kraja batcha
+                if eos_id in tokens:
+                    tokens = tokens[:tokens.index(eos_id) + 1]
+                request.output = tokens
+                generated += len(tokens)
+                # Pozicije retka u cache-u: ulaz bez paddinga i generirani tokeni osim zadnjeg
+                positions = [i for i, m in enumerate(mask[row]) if m] + list(range(width, width + len(tokens) - 1))
+                index = torch.tensor(positions, dtype=torch.long)
+                request.cache = [(key[row:row + 1, :, index], value[row:row + 1, :, index]) for key, value in layers]
+        except Exception as e:
+            for request in batch:
+                request.error = e
+        finished = time.perf_counter()
+
+        with self._stats_lock:
+            self.batches += 1
+            self.requests += len(batch)
+            self.errors += len(batch) if batch[0].error is not None else 0
+            self.generated_tokens += generated
+            self.busy_seconds += finished - started
+            self._latencies.extend(finished - request.enqueued for request in batch)
+        for request in batch:
+            request.done.set()
+
+    @staticmethod
+    def _stack_caches(batch, kept, cache_width):
+        """Cache-evi redaka skraćeni na `kept` tokena, s nulama slijeva do `cache_width`, spojeni u batch."""
+        template = next(r.past for r in batch if r.past is not None)
+        layers = []
+        for layer, (key, _value) in enumerate(template):
+            keys, values = [], []
+            for request, keep in zip(batch, kept):
+                shape = (1, key.shape[1], cache_width - keep, key.shape[3])
+                padding = torch.zeros(shape, dtype=key.dtype)
+                if keep:
+                    row_key, row_value = request.past[layer]
+                    keys.append(torch.cat([padding, row_key[:, :, :keep]], dim=2))
+                    values.append(torch.cat([padding, row_value[:, :, :keep]], dim=2))
+                else:
+                    keys.append(padding)
+                    values.append(padding)
+            layers.append((torch.cat(keys, dim=0), torch.cat(values, dim=0)))
+        return layers
+
+    def stats(self):
+        """Broj zahtjeva i batcheva, prosječna veličina batcha, propusnost i latencija (p50/p95/p99)."""
+        with self._stats_lock:
+            latencies = sorted(self._latencies)
+            requests, batches, busy = self.requests, self.batches, self.busy_seconds
+            errors, tokens = self.errors, self.generated_tokens
+
+        def percentile(p):
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 1) if latencies else None
+
+        return {
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000,
+            'queued': self._queue.qsize(),
+            'requests': requests,
+            'errors': errors,
+            'batches': batches,
+            'average_batch_size': round(requests / batches, 2) if batches else None,
+            'throughput': {'requests_per_second': round(requests / busy, 2) if busy else None,
+                           'tokens_per_second': round(tokens / busy, 1) if busy else None},
+            'latency_ms': {'p50': percentile(0.5), 'p95': percentile(0.95), 'p99': percentile(0.99)},
+        }
+
+
+class ModelHost:
+    """
+    Jezični model koji se učitava jednom po procesu i dijeli između svih korisnika.
+    Model ne ovisi o korisniku, pa svaka instanca AIVirtualTrainer-a koristi isti
+    (ModelHost.instance()), a stanje razgovora drži TrainerSession.
+    """
+    DEFAULT_MODEL = "microsoft/DialoGPT-medium"
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, model_name=DEFAULT_MODEL):
+        self.model_name = model_name
+        self.model = None
+        self.tokenizer = None
+        self._loaded = False
+        self._load_lock = threading.Lock()
+        # Isti parametri uzorkovanja kao ranije za pojedinačno generiranje
+        self.batcher = MicroBatcher(self, do_sample=True, top_p=0.9, temperature=0.75, repetition_penalty=1.2)
+
+    @classmethod
+    def instance(cls, model_name=DEFAULT_MODEL):
+        """Zajednički host za dani model (kreira se pri prvom pozivu)."""
+        with cls._instances_lock:
+            if model_name not in cls._instances:
+                cls._instances[model_name] = cls(model_name)
+            return cls._instances[model_name]
+
+    def load(self):
+        """Učitaj model ako još nije; ponovni pozivi (i iz drugih dretvi) ništa ne rade."""
+        if self._loaded:
+            return self
+        with self._load_lock:
+            if self._loaded:
+                return self
+            try:
+                print("🤖 Učitavam AI model...")
+                key = model_key(self.model_name)
+                if key:
+                    # Varijanta (fp32/int8/onnx) po MODEL_VARIANT, vidi model_variants.py
+                    self.tokenizer, self.model, variant = load_model(key)
+                    print(f"-> Varijanta modela: {variant}")
+                else:
+                    self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+                    self.model = AutoModelForCausalLM.from_pretrained(self.model_name)
+                    self.model.eval()
+
+                if self.tokenizer.pad_token is None:
+                    self.tokenizer.pad_token = self.tokenizer.eos_token
+
+                sessions = kv_cache_pool.configure(self.model)
+                if sessions is not None:
+                    print(f"-> KV cache: {kv_cache_pool.max_bytes / 1024 / 1024:g} MB, "
+                          f"{kv_cache_pool.bytes_per_token / 1024:g} KiB po tokenu, "
+                          f"punih razgovora ({KV_CACHE_MAX_TOKENS} tokena): {sessions}")
+                    if sessions < 1:
+                        print("⚠️ KV_CACHE_MAX_MB je manji od jednog punog razgovora; dugi razgovori neće imati cache")
+
+                print("✅ AI model uspješno učitan!")
+
+            except Exception as e:
+                print(f"❌ Greška pri učitavanju AI modela: {e}")
+                self.model = None
+                self.tokenizer = None
+            self._loaded = True
+        return self
+
+    def generate(self, input_ids, timeout=None, session=None):
+        """
+        Novi tokeni za `input_ids`, generirani zajedno s istovremenim zahtjevima drugih korisnika.
+        Uz `session` se koristi i obnavlja njen KV cache, pa model obrađuje samo nove tokene.
+        """
+        cached = kv_cache_pool.take(session, input_ids) if session is not None else None
+        past, cached_tokens = cached or (None, 0)
+        new_tokens, cache = self.batcher.generate(input_ids, timeout, past, cached_tokens)
+        if session is not None and cache is not None:
+            kv_cache_pool.store(session, cache, (input_ids + new_tokens)[:-1])
+        return new_tokens
+
+
+class TrainerSession:
+    """Stanje razgovora jednog korisnika: podaci o korisniku, tokeni razgovora i njihov KV cache."""
+    __slots__ = ('user', 'history', 'kv_cache')
+
+    def __init__(self, user_dict: dict):
+        self.user = user_dict
+        self.history = []
+        self.kv_cache = None  # (slojevi, tokeni koje pokriva, bajtovi); upravlja kv_cache_pool
+
+
+_sessions = OrderedDict()
+_sessions_lock = threading.Lock()
+MAX_SESSIONS = 1000
+
+
+def get_session(user_id, user_dict: dict) -> TrainerSession:
+    """Sesija korisnika (nova ako ne postoji); najdulje neaktivne se odbacuju iznad MAX_SESSIONS."""
+    with _sessions_lock:
+        session = _sessions.get(user_id)
+        if session is None:
+            session = _sessions[user_id] = TrainerSession(user_dict)
+        else:
+            session.user = user_dict
+        _sessions.move_to_end(user_id)
+        while len(_sessions) > MAX_SESSIONS:
+            _user_id, evicted = _sessions.popitem(last=False)
+            kv_cache_pool.release(evicted)
+        return session
+
 
 class AIVirtualTrainer:
     """AI trener koji može analizirati i zapisati podatke iz razgovora"""
 
-    def __init__(self, user_dict: dict, db_session=None, models=None):
-        self.user = user_dict
+    def __init__(self, user_dict: dict, db_session=None, models=None, session: TrainerSession = None,
+                 host: ModelHost = None, log_writer=None):
         self.db = db_session
         self.models = models  # WorkoutLog, MealLog, MoodLog modeli
-        self.conversation_history = []
-        self._load_model()
+        self.log_writer = log_writer  # app.log_writer.LogWriter; bez njega commit ide u db_session
+        self.session = session or TrainerSession(user_dict)
+        self.session.user = user_dict
+        self.host = (host or ModelHost.instance()).load()
 
-    def _load_model(self):
-        """Učitaj DialoGPT model"""
-        try:
-            print("🤖 Učitavam AI model...")
-            model_name = "microsoft/DialoGPT-medium"
-            self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-            self.model = AutoModelForCausalLM.from_pretrained(model_name)
+    # Model i tokenizer su zajednički (ModelHost), korisnik i povijest su u sesiji
+    @property
+    def model(self):
+        return self.host.model
 
-            if self.tokenizer.pad_token is None:
-                self.tokenizer.pad_token = self.tokenizer.eos_token
+    @property
+    def tokenizer(self):
+        return self.host.tokenizer
 
-            self.history = []
-            print("✅ AI model uspješno učitan!")
+    @property
+    def user(self):
+        return self.session.user
 
-        except Exception as e:
-            print(f"❌ Greška pri učitavanju AI modela: {e}")
-            self.model = None
-            self.tokenizer = None
-            self.history = []
+    @property
+    def history(self):
+        return self.session.history
+
+    @history.setter
+    def history(self, value):
+        self.session.history = value
 
     def analyze_and_save_message(self, user_message: str, user_id: int) -> dict:
         """
@@ -69,55 +504,58 @@ class AIVirtualTrainer:
 
 
         if self.db and self.models:
+            rows = []
+            # Spremi vježbe
+            for exercise_data in recognized['exercises']:
+                rows.append((self.models['WorkoutLog'], dict(
+                    user_id=user_id,
+                    exercise=exercise_data['name'],
+                    sets=exercise_data.get('sets', 1),
+                    reps=exercise_data.get('reps', 1),
+                    weight=exercise_data.get('weight', None),
+                    feeling=recognized['mood']
+                )))
+                analysis_result['exercises_saved'] += 1
+
+            # Spremi hranu
+            for food_data in recognized['food']:
+                rows.append((self.models['MealLog'], dict(
+                    user_id=user_id,
+                    food=food_data['name'],
+                    calories=food_data.get('calories', 100),
+                    liked_recommendation=True
+                )))
+                analysis_result['meals_saved'] += 1
+
+            # Spremi raspoloženje
+            if recognized['mood'] != 'neutral':
+                rows.append((self.models['MoodLog'], dict(
+                    user_id=user_id,
+                    mood='good' if recognized['mood'] == 'positive' else 'bad',
+                    note=user_message[:200]
+                )))
+                analysis_result['mood_saved'] = True
+
+            # Spremi vodu
+            if recognized['water'] > 0:
+                rows.append((self.models['WaterLog'], dict(
+                    user_id=user_id,
+                    amount_ml=recognized['water']
+                )))
+                analysis_result['water_saved'] = recognized['water']
+
             try:
-                # Spremi vježbe
-                for exercise_data in recognized['exercises']:
-                    workout = self.models['WorkoutLog'](
-                        user_id=user_id,
-                        exercise=exercise_data['name'],
-                        sets=exercise_data.get('sets', 1),
-                        reps=exercise_data.get('reps', 1),
-                        weight=exercise_data.get('weight', None),
-                        feeling=recognized['mood']
-                    )
-                    self.db.add(workout)
-                    analysis_result['exercises_saved'] += 1
-
-                # Spremi hranu
-                for food_data in recognized['food']:
-                    meal = self.models['MealLog'](
-                        user_id=user_id,
-                        food=food_data['name'],
-                        calories=food_data.get('calories', 100),
-                        liked_recommendation=True
-                    )
-                    self.db.add(meal)
-                    analysis_result['meals_saved'] += 1
-
-                # Spremi raspoloženje
-                if recognized['mood'] != 'neutral':
-                    mood = self.models['MoodLog'](
-                        user_id=user_id,
-                        mood='good' if recognized['mood'] == 'positive' else 'bad',
-                        note=user_message[:200]
-                    )
-                    self.db.add(mood)
-                    analysis_result['mood_saved'] = True
-
-                # Spremi vodu
-                if recognized['water'] > 0:
-                    water = self.models['WaterLog'](
-                        user_id=user_id,
-                        amount_ml=recognized['water']
-                    )
-                    self.db.add(water)
-                    analysis_result['water_saved'] = recognized['water']
-
-                self.db.commit()
+                if self.log_writer is not None:
+                    # Svi retci poruke idu u istu transakciju grupnog upisa
+                    self.log_writer.write(rows)
+                else:
+                    self.db.add_all([model(**values) for model, values in rows])
+                    self.db.commit()
                 print(f"✅ Uspješno spremljeno: {analysis_result}")
 
             except Exception as e:
-                self.db.rollback()
+                if self.log_writer is None:
+                    self.db.rollback()
                 print(f"❌ Greška pri spremanju u bazu: {e}")
 
         return analysis_result
@@ -134,87 +572,28 @@ class AIVirtualTrainer:
 
         text_lower = text.lower()
 
-
-        exercise_patterns = {
-            r'(?:napravio|radio|trenirao).*?(?:čučanj|squat).*?(?:(\d+)[x×](\d+))?.*?(?:(\d+)\s*kg)?': 'Squat',
-            r'(?:napravio|radio|trenirao).*?(?:mrtvo\s*dizanje|deadlift).*?(?:(\d+)[x×](\d+))?.*?(?:(\d+)\s*kg)?': 'Deadlift',
-            r'(?:napravio|radio|trenirao).*?(?:bench\s*press|potisak).*?(?:(\d+)[x×](\d+))?.*?(?:(\d+)\s*kg)?': 'Bench Press',
-            r'(?:napravio|radio|trenirao).*?(?:zgib|pull.*?up).*?(?:(\d+)[x×](\d+))?': 'Pull-ups',
-            r'(?:napravio|radio|trenirao).*?(?:sklekovi|push.*?up).*?(?:(\d+)[x×](\d+))?': 'Push-ups',
-            r'(?:napravio|radio|trenirao).*?(?:iskorak|lunge).*?(?:(\d+)[x×](\d+))?.*?(?:(\d+)\s*kg)?': 'Lunges',
-            r'(?:napravio|radio|trenirao).*?(?:plank).*?(?:(\d+)\s*(?:min|minuta))?': 'Plank',
-            r'(?:trčao|trčanje|cardio).*?(?:(\d+)\s*(?:min|minuta|km))?': 'Cardio',
-            r'(?:bicikl|cycling).*?(?:(\d+)\s*(?:min|minuta|km))?': 'Cycling',
-            r'(?:plivanje|swimming).*?(?:(\d+)\s*(?:min|minuta))?': 'Swimming'
-        }
-
-        for pattern, exercise_name in exercise_patterns.items():
-            matches = re.finditer(pattern, text_lower)
-            for match in matches:
-                exercise = {'name': exercise_name}
-
-                # Pokušaj izvući brojeve (sets x reps ili vrijeme)
-                numbers = [int(g) for g in match.groups() if g and g.isdigit()]
-                if len(numbers) >= 2:
-                    exercise['sets'] = numbers[0]
-                    exercise['reps'] = numbers[1]
-                elif len(numbers) == 1:
-                    if 'min' in text_lower:
-                        exercise['duration_min'] = numbers[0]
-                    elif 'km' in text_lower:
-                        exercise['distance_km'] = numbers[0]
-                    else:
-                        exercise['reps'] = numbers[0]
-
-
-                weight_match = re.search(r'(\d+)\s*kg', match.group())
-                if weight_match:
-                    exercise['weight'] = int(weight_match.group(1))
-
-                result['exercises'].append(exercise)
-
-
-        food_patterns = {
-
-            r'(?:jeo|pojeo|doručkovao|ručao|večerao).*?(?:jaja|jaje)': {'name': 'Jaja', 'calories': 155},
-            r'(?:jeo|pojeo|doručkovao|ručao|večerao).*?(?:piletina|piletinu)': {'name': 'Piletina', 'calories': 165},
-            r'(?:jeo|pojeo|doručkovao|ručao|večerao).*?(?:riba|ribu)': {'name': 'Riba', 'calories': 140},
-            r'(?:jeo|pojeo|doručkovao|ručao|večerao).*?(?:govedina|govedinu)': {'name': 'Govedina', 'calories': 200},
-            r'(?:jeo|pojeo|doručkovao|ručao|večerao).*?(?:svinjina|svinjetina)': {'name': 'Svinjina', 'calories': 180},
-            r'(?:jeo|pojeo|doručkovao|ručao|večerao).*?(?:tuna|tunu)': {'name': 'Tuna', 'calories': 130},
-
-
-            r'(?:jeo|pojeo|doručkovao|ručao|večerao).*?(?:riža|rižu)': {'name': 'Riža', 'calories': 130},
-            r'(?:jeo|pojeo|doručkovao|ručao|večerao).*?(?:krumpir)': {'name': 'Krumpir', 'calories': 110},
-            r'(?:jeo|pojeo|doručkovao|ručao|večerao).*?(?:tjestenina|pašta)': {'name': 'Tjestenina', 'calories': 150},
-            r'(?:jeo|pojeo|doručkovao|ručao|večerao).*?(?:kruh)': {'name': 'Kruh', 'calories': 80},
-            r'(?:jeo|pojeo|doručkovao|ručao|večerao).*?(?:zobene|ovsene|pahuljice)': {'name': 'Zobene pahuljice',
-                                                                                      'calories': 120},
-
-
-            r'(?:jeo|pojeo|doručkovao|ručao|večerao).*?(?:salata|salatu)': {'name': 'Salata', 'calories': 20},
-            r'(?:jeo|pojeo|doručkovao|ručao|večerao).*?(?:rajčica|rajčice)': {'name': 'Rajčica', 'calories': 25},
-            r'(?:jeo|pojeo|doručkovao|ručao|večerao).*?(?:krastavac)': {'name': 'Krastavac', 'calories': 15},
-            r'(?:jeo|pojeo|doručkovao|ručao|večerao).*?(?:brokula|brokuli)': {'name': 'Brokula', 'calories': 30},
-            r'(?:jeo|pojeo|doručkovao|ručao|večerao).*?(?:špinat)': {'name': 'Špinat', 'calories': 25},
-
-            r'(?:jeo|pojeo|doručkovao|ručao|večerao).*?(?:banana|bananu)': {'name': 'Banana', 'calories': 105},
-            r'(?:jeo|pojeo|doručkovao|ručao|večerao).*?(?:jabuka|jabuku)': {'name': 'Jabuka', 'calories': 80},
-            r'(?:jeo|pojeo|doručkovao|ručao|večerao).*?(?:naranča|narandžu)': {'name': 'Naranča', 'calories': 65},
-            r'(?:jeo|pojeo|doručkovao|ručao|večerao).*?(?:avokado)': {'name': 'Avokado', 'calories': 160},
-
-
-            r'(?:jeo|pojeo|doručkovao|ručao|večerao).*?(?:jogurt)': {'name': 'Jogurt', 'calories': 100},
-            r'(?:jeo|pojeo|doručkovao|ručao|večerao).*?(?:sir)': {'name': 'Sir', 'calories': 110},
-            r'(?:jeo|pojeo|doručkovao|ručao|večerao).*?(?:mlijeko)': {'name': 'Mlijeko', 'calories': 150},
-
-
-            r'(?:jeo|pojeo|doručkovao|ručao|večerao).*?(?:orah|orahi)': {'name': 'Orahi', 'calories': 185},
-            r'(?:jeo|pojeo|doručkovao|ručao|večerao).*?(?:badem|bademi)': {'name': 'Bademi', 'calories': 170},
-        }
-
-        for pattern, food_info in food_patterns.items():
-            if re.search(pattern, text_lower):
+        # Vježbe, namirnice i voda prepoznaju se jednim prolazom kroz poruku (fitness_patterns)
+        found = extract(text)
+        for mention in found['exercises']:
+            entry = mention['entry']
+            if entry['trigger'] and not mention['triggered']:
+                continue
+            exercise = {'name': entry['name']}
+            if 'sets_reps' in mention:
+                exercise['sets'] = mention['sets_reps']['sets']
+                exercise['reps'] = mention['sets_reps']['reps']
+            if 'duration' in mention:
+                exercise['duration_min'] = _whole(mention['duration']['value'])
+            if 'distance' in mention:
+                exercise['distance_km'] = _whole(mention['distance']['value'])
+            if 'weight' in mention:
+                exercise['weight'] = _whole(mention['weight']['value'])
+            result['exercises'].append(exercise)
+
+        for mention in found['foods']:
+            entry = mention['entry']
+            food_info = {'name': entry['name'], 'calories': entry['calories']}
+            if mention['triggered'] and food_info not in result['food']:
                 result['food'].append(food_info)
 
 
@@ -232,24 +611,8 @@ class AIVirtualTrainer:
                 break
 
 
-        water_patterns = [
-            r'(?:popio|pio|pila).*?(\d+)\s*(?:litara|litre|l)\s*vode',
-            r'(\d+)\s*(?:litara|litre|l)\s*vode',
-            r'(?:popio|pio|pila).*?(\d+)\s*(?:čaša|čaše|čašu)\s*vode',
-            r'(\d+)\s*(?:ml|mililitra)\s*vode'
-        ]
-
-        for pattern in water_patterns:
-            match = re.search(pattern, text_lower)
-            if match:
-                amount = int(match.group(1))
-                if 'ml' in match.group(0):
-                    result['water'] = amount
-                elif 'čaš' in match.group(0):
-                    result['water'] = amount * 250  # 250ml po čaši
-                else:  # litri
-                    result['water'] = amount * 1000
-                break
+        if found['water']:
+            result['water'] = found['water'][0]['amount_ml']
 
 
         if 'bol' in text_lower or 'pain' in text_lower:
@@ -259,7 +622,6 @@ class AIVirtualTrainer:
 
         return result
 
-    @torch.inference_mode()
     def generate_response(self, user_message: str, analysis_result: dict = None) -> str:
         """Generiraj AI odgovor na temelju poruke i analize"""
 
@@ -272,27 +634,20 @@ class AIVirtualTrainer:
         try:
 
             input_text = context + "\n\nKorisnik: " + user_message + "\nTrener:"
-            input_ids = self.tokenizer.encode(input_text, return_tensors='pt', max_length=1000, truncation=True)
+            input_ids = self.tokenizer.encode(input_text, max_length=1000, truncation=True)
 
+            # Preko budžeta povijest se skraćuje na zadnjih HISTORY_TOKENS (njen cache tada ne vrijedi)
+            if len(self.history) > KV_CACHE_MAX_TOKENS:
+                self.history = self.history[-HISTORY_TOKENS:]
             if self.history:
-                input_ids = torch.cat([torch.tensor([self.history]).to(input_ids.device), input_ids], dim=1)
-
+                input_ids = self.history + input_ids
 
-            output_ids = self.model.generate(
-                input_ids,
-                max_length=input_ids.shape[1] + 150,
-                do_sample=True,
-                top_p=0.9,
-                temperature=0.75,
-                pad_token_id=self.tokenizer.eos_token_id,
-                repetition_penalty=1.2
-            )
+            # Generiranje ide kroz zajednički red (ModelHost.batcher), u batchu s drugim korisnicima;
+            # povijest je već u KV cache-u sesije, pa model obrađuje samo novi kontekst i poruku
+            new_tokens = self.host.generate(input_ids, session=self.session)
+            response = self.tokenizer.decode(new_tokens, skip_special_tokens=True).strip()
 
-
-            new_tokens = output_ids[:, input_ids.shape[1]:]
-            response = self.tokenizer.decode(new_tokens[0], skip_special_tokens=True).strip()
-
-            self.history = output_ids[0].tolist()[-500:]  # zadnjih 500 tokena
+            self.history = input_ids + new_tokens
 
             # Postprocess odgovor
             response = self._postprocess_response(response, analysis_result)
@@ -390,16 +745,19 @@ class AIVirtualTrainer:
 class TrainerChat:
     """Wrapper klasa za lakšu integraciju s Flask aplikacijom"""
 
-    def __init__(self, user, db_session, models):
+    def __init__(self, user, db_session, models, log_writer=None):
         self.user = user
         self.db = db_session
         self.models = models
-        self.trainer = AIVirtualTrainer({
+        user_dict = {
             'name': user.username,
             'age': user.age or 25,
             'goal': user.goal or 'maintenance',
             'fitness_level': user.fitness_level or 'beginner'
-        }, db_session, models)
+        }
+        # Povijest razgovora ostaje u sesiji korisnika i između instanci TrainerChat-a
+        self.trainer = AIVirtualTrainer(user_dict, db_session, models, session=get_session(user.id, user_dict),
+                                       log_writer=log_writer)
 
     def process_message(self, message: str) -> dict:
         """
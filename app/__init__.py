@@ -3,7 +3,6 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_bcrypt import Bcrypt
 from flask_login import LoginManager
-from groq import Groq  # <-- PROMJENA
 from config import Config
 import os
 
@@ -13,19 +12,32 @@ login_manager = LoginManager()
 login_manager.login_view = 'main.login'
 login_manager.login_message_category = 'info'
 
-# Inicijalizacija Groq klijenta
-groq_client = None # <-- PROMJENA
-if Config.GROQ_API_KEY: # <-- PROMJENA
-    groq_client = Groq(api_key=Config.GROQ_API_KEY) # <-- PROMJENA
-
 def create_app(config_class=Config):
     """Kreira i konfigurira Flask aplikaciju."""
     app = Flask(__name__, instance_path=Config.instance_path)
     app.config.from_object(config_class)
 
     db.init_app(app)
+    # PRAGMA postavke SQLite konekcija (SQLITE_PRAGMAS) - prije prve konekcije
+    from app.database import init_sqlite_pragmas
+    init_sqlite_pragmas(app)
     bcrypt.init_app(app)
     login_manager.init_app(app)
+    # Predmemorija laganih profila za load_user (current_user)
+    from app.user_profiles import init_user_profiles
+    init_user_profiles(app)
+
+    # Jezični model za AI chat (Groq ili lokalna zamjena, vidi LLM_PROVIDER)
+    from app.llm import build_llm
+    app.extensions['llm'] = build_llm(app.config)
+
+    # Grupni upis logova iz svih zahtjeva (LOG_WRITE_BEHIND, LOG_WRITE_ACK)
+    from app.log_writer import init_log_writer
+    init_log_writer(app)
+
+    # Trajanje zahtjeva i njihovih dijelova (SQL, model, renderiranje) za /metrics
+    from app.tracing import init_tracing
+    init_tracing(app)
 
     from app.routes import main_bp
     app.register_blueprint(main_bp)
@@ -33,5 +45,14 @@ def create_app(config_class=Config):
     with app.app_context():
         from app import models
         db.create_all()
+        # create_all ne mijenja postojeće tablice - stupce i indekse dodaju migracije
+        from app.migrations import upgrade
+        upgrade()
+
+    if app.config.get('WARM_UP_MODELS'):
+        from app.services import registry
+        registry.warm_up()
+        from emotion_service import emotion_service
+        emotion_service.load()
 
     return app
\ No newline at end of file
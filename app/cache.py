@@ -0,0 +1,51 @@
+# app/cache.py
+import threading
+import time
+from flask import current_app
+from app import db
+from app.models import DataVersion
+
+
+class VersionedCache:
+    """
+    Predmemorija za strukture izgrađene iz tablica u bazi (indeksi, bazeni vježbi...).
+    Vrijednost se ponovno gradi kad se promijeni DataVersion tablice; verzija se provjerava
+    najviše jednom u DATA_VERSION_CHECK_SECONDS, tako da pogodak u pravilu ne dira bazu.
+    """
+
+    def __init__(self):
+        self._entries = {}  # (baza, tablica, ključ) -> (verzija, vrijednost)
+        self._versions = {}  # (baza, tablica) -> (verzija, vrijeme provjere)
+        self._lock = threading.Lock()
+
+    def _version(self, db_key, table):
+        interval = current_app.config.get('DATA_VERSION_CHECK_SECONDS', 30)
+        cached = self._versions.get((db_key, table))
+        now = time.monotonic()
+        if cached and now - cached[1] < interval:
+            return cached[0]
+        version = DataVersion.current(table)
+        self._versions[(db_key, table)] = (version, now)
+        return version
+
+    def get(self, table, builder, key=None):
+        """Vrati vrijednost za (tablica, ključ), gradeći je pozivom builder() ako je zastarjela."""
+        db_key = str(db.engine.url)
+        with self._lock:
+            version = self._version(db_key, table)
+            entry = self._entries.get((db_key, table, key))
+            if entry and entry[0] == version:
+                return entry[1]
+            value = builder()
+            self._entries[(db_key, table, key)] = (version, value)
+            return value
+
+    def invalidate(self, table=None):
+        """Odmah odbaci spremljene vrijednosti (za promjene napravljene u istom procesu)."""
+        with self._lock:
+            if table is None:
+                self._entries.clear()
+                self._versions.clear()
+                return
+            self._entries = {k: v for k, v in self._entries.items() if k[1] != table}
+            self._versions = {k: v for k, v in self._versions.items() if k[1] != table}
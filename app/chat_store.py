@@ -0,0 +1,157 @@
+# app/chat_store.py
+import textwrap
+import threading
+from collections import OrderedDict, deque
+from flask import current_app
+from sqlalchemy import update
+from app import db
+from app.models import ChatConversation, ChatMessage
+
+
+class _Conversation:
+    """Stanje razgovora u memoriji: sažetak starijih poruka i zadnjih N poruka."""
+    __slots__ = ('id', 'summary', 'recent', 'message_count')
+
+    def __init__(self, conversation_id, summary, recent, message_count):
+        self.id = conversation_id
+        self.summary = summary
+        self.recent = recent
+        self.message_count = message_count
+
+
+def _compact(summary, message, max_chars):
+    """Doda skraćenu poruku u sažetak; ako sažetak prijeđe max_chars, odbacuju se najstariji retci."""
+    label = 'Korisnik' if message['role'] == 'user' else 'Asistent'
+    lines = summary.splitlines() if summary else []
+    lines.append(f"- {label}: {textwrap.shorten(message['content'], width=160, placeholder='…')}")
+    while len(lines) > 1 and sum(len(line) + 1 for line in lines) > max_chars:
+        lines.pop(0)
+    return '\n'.join(lines)
+
+
+class ChatStore:
+    """
+    Razgovori s AI asistentom spremaju se u bazu, a u kolačiću ostaje samo id razgovora.
+    Prompt dobiva zadnjih CHAT_CONTEXT_MESSAGES poruka i sažetak starijih (najviše
+    CHAT_SUMMARY_MAX_CHARS znakova), pa ne raste s duljinom razgovora. Aktivni razgovori
+    drže se u LRU predmemoriji; broj poruka iz baze otkriva je li je drugi proces promijenio.
+    Upis poruke u isti razgovor ide jedan po jedan (zaključavanje po razgovoru u procesu i
+    uvjetni UPDATE po broju poruka između procesa), a predmemorija se mijenja tek nakon commita.
+    """
+    LOCK_STRIPES = 64
+    APPEND_ATTEMPTS = 3
+
+    def __init__(self):
+        self._entries = OrderedDict()  # (baza, id razgovora) -> _Conversation
+        self._lock = threading.Lock()
+        self._append_locks = [threading.Lock() for _ in range(self.LOCK_STRIPES)]
+
+    def _forget(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    @staticmethod
+    def _setting(name, default):
+        return current_app.config.get(name, default)
+
+    def _conversation(self, user_id, conversation_id):
+        if conversation_id is None:
+            return None, None
+        row = db.session.get(ChatConversation, conversation_id)
+        if row is None or row.user_id != user_id:
+            return None, None
+
+        key = (str(db.engine.url), row.id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.message_count == row.message_count:
+                self._entries.move_to_end(key)
+                return row, entry
+
+        context_size = self._setting('CHAT_CONTEXT_MESSAGES', 8)
+        messages = (ChatMessage.query.filter_by(conversation_id=row.id)
+                    .order_by(ChatMessage.id.desc()).limit(context_size).all())
+        recent = deque({'role': m.role, 'content': m.content} for m in reversed(messages))
+        entry = _Conversation(row.id, row.summary, recent, row.message_count)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._setting('CHAT_CACHE_SIZE', 512):
+                self._entries.popitem(last=False)
+        return row, entry
+
+    def resolve(self, user_id, conversation_id):
+        """Vrati id postojećeg razgovora korisnika ili započni novi."""
+        row, _entry = self._conversation(user_id, conversation_id)
+        if row is not None:
+            return row.id
+        row = ChatConversation(user_id=user_id)
+        db.session.add(row)
+        db.session.commit()
+        return row.id
+
+    def append(self, user_id, conversation_id, role, content):
+        """Spremi poruku; poruke koje ispadnu iz konteksta prelaze u sažetak."""
+        message = {'role': role, 'content': content}
+        with self._append_locks[hash((str(db.engine.url), str(conversation_id))) % self.LOCK_STRIPES]:
+            for _attempt in range(self.APPEND_ATTEMPTS):
+                row, entry = self._conversation(user_id, conversation_id)
+                if row is None:
+                    raise ValueError(f"Razgovor {conversation_id} ne postoji za korisnika {user_id}.")
+                key = (str(db.engine.url), row.id)
+
+                # Nova stanja računaju se na kopiji; zapis u predmemoriji ostaje netaknut do commita
+                recent, summary = deque(entry.recent), entry.summary
+                recent.append(message)
+                while len(recent) > self._setting('CHAT_CONTEXT_MESSAGES', 8):
+                    summary = _compact(summary, recent.popleft(), self._setting('CHAT_SUMMARY_MAX_CHARS', 1500))
+                message_count = entry.message_count + 1
+
+                try:
+                    # Uspijeva samo ako nitko drugi u međuvremenu nije dodao poruku u razgovor
+                    updated = db.session.execute(
+                        update(ChatConversation)
+                        .where(ChatConversation.id == row.id, ChatConversation.message_count == entry.message_count)
+                        .values(summary=summary, message_count=message_count)
+                        .execution_options(synchronize_session=False)).rowcount
+                    if updated:
+                        db.session.add(ChatMessage(conversation_id=row.id, role=role, content=content))
+                        db.session.commit()
+                except Exception:
+                    db.session.rollback()
+                    self._forget(key)
+                    raise
+
+                if updated:
+                    with self._lock:
+                        self._entries[key] = _Conversation(row.id, summary, recent, message_count)
+                        self._entries.move_to_end(key)
+                    db.session.expire(row)
+                    return
+                # Razgovor je promijenio drugi proces (ili je sesija imala stari redak): ponovno učitaj
+                db.session.rollback()
+                self._forget(key)
+                db.session.expire(row)
+        raise RuntimeError(f"Razgovor {conversation_id} se istovremeno mijenja; poruka nije spremljena.")
+
+    def context(self, user_id, conversation_id):
+        """Poruke za prompt: sažetak starijeg dijela razgovora (ako postoji) i zadnje poruke."""
+        _row, entry = self._conversation(user_id, conversation_id)
+        if entry is None:
+            return []
+        messages = list(entry.recent)
+        if entry.summary:
+            messages.insert(0, {'role': 'system', 'content': f"Sažetak ranijeg dijela razgovora:\n{entry.summary}"})
+        return messages
+
+    def history(self, user_id, conversation_id, limit=50):
+        """Zadnjih `limit` poruka za prikaz na stranici."""
+        row, _entry = self._conversation(user_id, conversation_id)
+        if row is None:
+            return []
+        messages = (ChatMessage.query.filter_by(conversation_id=row.id)
+                    .order_by(ChatMessage.id.desc()).limit(limit).all())
+        return [{'role': m.role, 'content': m.content} for m in reversed(messages)]
+
+
+chat_store = ChatStore()
@@ -0,0 +1,123 @@
+# app/chat_stream.py
+import json
+import threading
+import time
+from flask import current_app
+from app import db
+from app.chat_store import chat_store
+
+OPEN_TAG = '<execute>'
+CLOSE_TAG = '</execute>'
+
+
+class ExecuteBlockParser:
+    """
+    Dijeli tok tokena na tekst za prikaz i `<execute>` blokove. Tekst koji bi mogao biti
+    početak taga zadržava se dok se ne vidi sljedeći token, pa korisnik nikad ne vidi
+    djelomični `<exec...`, a blok se vraća čim stigne njegov `</execute>`.
+    """
+
+    def __init__(self):
+        self._buffer = ''
+        self._inside = False
+
+    def feed(self, chunk):
+        """Vrati (tekst za prikaz, lista dovršenih blokova) za novi dio odgovora."""
+        self._buffer += chunk
+        text, blocks = [], []
+        while True:
+            if self._inside:
+                end = self._buffer.find(CLOSE_TAG)
+                if end < 0:
+                    break
+                blocks.append(self._buffer[:end])
+                self._buffer = self._buffer[end + len(CLOSE_TAG):]
+                self._inside = False
+                continue
+
+            start = self._buffer.find(OPEN_TAG)
+            if start >= 0:
+                text.append(self._buffer[:start])
+                self._buffer = self._buffer[start + len(OPEN_TAG):]
+                self._inside = True
+                continue
+            keep = next((k for k in range(len(OPEN_TAG) - 1, 0, -1) if self._buffer.endswith(OPEN_TAG[:k])), 0)
+            text.append(self._buffer[:len(self._buffer) - keep])
+            self._buffer = self._buffer[len(self._buffer) - keep:]
+            break
+        return ''.join(text), blocks
+
+    def finish(self):
+        """Ostatak na kraju toka; nezatvoreni blok prikazuje se kao običan tekst."""
+        rest = OPEN_TAG + self._buffer if self._inside else self._buffer
+        self._buffer, self._inside = '', False
+        return rest
+
+
+def acquire_stream_slot():
+    """
+    Zauzmi mjesto za stream bez čekanja. Vraća (uspjeh, funkcija za oslobađanje); uspjeh je
+    False ako je već otvoreno CHAT_MAX_CONCURRENT_STREAMS streamova.
+    """
+    slots = current_app.extensions.setdefault(
+        'chat_stream_slots', threading.BoundedSemaphore(current_app.config.get('CHAT_MAX_CONCURRENT_STREAMS', 4)))
+    return slots.acquire(blocking=False), slots.release
+
+
+def _event(name, **data):
+    return f"event: {name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def action_events(result):
+    """SSE odgovor za poruku koju je riješio parser namjera, bez poziva modela."""
+    yield _event('action', text=result)
+    yield _event('done')
+
+
+def stream_chat(llm, messages, user_id, conversation_id, execute_action, cache_scope=None):
+    """
+    Generator SSE događaja: `token` (tekst odgovora), `action` (rezultat izvršenog bloka),
+    `error` i na kraju `done`. Odgovor i rezultati akcija spremaju se u razgovor na kraju.
+    `cache_scope` se predaje LLMClientu (predmemorija odgovora).
+    """
+    deadline = time.monotonic() + current_app.config.get('CHAT_STREAM_MAX_SECONDS', 60)
+    parser = ExecuteBlockParser()
+    reply, action_results = [], []
+    stream = llm.stream(messages, cache_scope)
+    try:
+        for part in stream:
+            if time.monotonic() > deadline:
+                yield _event('error', text="Odgovor je predugo trajao pa je prekinut.")
+                break
+            text, blocks = parser.feed(part)
+            if text:
+                reply.append(text)
+                yield _event('token', text=text)
+            for block in blocks:
+                try:
+                    action_data = json.loads(block)
+                except json.JSONDecodeError:
+                    print(f"AI je generirao neispravan JSON: {block}")
+                    continue
+                result = execute_action(action_data)
+                action_results.append(result)
+                yield _event('action', text=result)
+
+        rest = parser.finish()
+        if rest:
+            reply.append(rest)
+            yield _event('token', text=rest)
+    except Exception as e:
+        print(f"Greška pri pozivu jezičnog modela: {e}")
+        db.session.rollback()
+        action_results.append("Trenutno imam tehničkih poteškoća.")
+        yield _event('error', text="Trenutno imam tehničkih poteškoća.")
+    finally:
+        stream.close()
+        # Sprema se i kad preglednik prekine vezu usred odgovora
+        reply_text = ''.join(reply).strip()
+        if reply_text:
+            chat_store.append(user_id, conversation_id, "assistant", reply_text)
+        for result in action_results:
+            chat_store.append(user_id, conversation_id, "assistant", result)
+    yield _event('done')
@@ -0,0 +1,39 @@
+# app/database.py
+"""
+Postavke SQLite konekcija. SQLITE_PRAGMAS iz konfiguracije (npr. WAL, synchronous,
+mmap_size, cache_size, busy_timeout - vidi ProductionConfig) izvršavaju se na svakoj
+novoj konekciji iz poola, jer većina PRAGMA postavki vrijedi samo za konekciju
+(journal_mode=WAL ostaje zapisan u datoteci baze).
+"""
+from sqlalchemy import event
+
+
+def _pragma_statements(pragmas):
+    return [f"PRAGMA {name}={value}" for name, value in pragmas.items()]
+
+
+def init_sqlite_pragmas(app):
+    """Registriraj connect hook na engine aplikacije (prije prve konekcije, tj. prije create_all)."""
+    statements = _pragma_statements(app.config.get('SQLITE_PRAGMAS') or {})
+    if not statements:
+        return
+
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+    from app import db
+    with app.app_context():
+        if db.engine.dialect.name != 'sqlite':
+            return
+        event.listen(db.engine, 'connect', on_connect)
+
+
+def sqlite_settings(connection):
+    """Trenutne vrijednosti PRAGMA postavki za konekciju (za provjeru i benchmark)."""
+    return {name: connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+            for name in ('journal_mode', 'synchronous', 'busy_timeout', 'cache_size', 'mmap_size', 'temp_store')}
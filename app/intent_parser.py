@@ -0,0 +1,89 @@
+# app/intent_parser.py
+"""
+Brzi put za strukturirane poruke u AI chatu ("čučanj 3x10 100kg", "popio 2 litre vode").
+
+parse_intent() prepoznaje namjeru (vježba, obrok, voda) i njene brojeve, i vraća isti
+{"action": ..., "parameters": ...} oblik koji jezični model šalje u `<execute>` bloku.
+Poruka ide modelu kad parser nije siguran: prepoznata je više od jedne namjere,
+nedostaje broj, u poruci ostane previše riječi koje parser ne razumije, ili poruka sadrži
+negaciju ili budući/željeni oblik ("nisam jeo", "bez", "sutra ću") - takva poruka nije unos.
+"""
+import re
+from fitness_patterns import extract
+
+CONFIDENCE_THRESHOLD = 0.8
+
+# Riječi koje ne mijenjaju značenje poruke za bilježenje
+FILLER_WORDS = {
+    'sam', 'je', 'i', 'danas', 'jutros', 'večeras', 'upravo', 'malo', 'na', 'za', 'po', 's', 'sa', 'od',
+    'napravio', 'napravila', 'radio', 'radila', 'odradio', 'odradila', 'trenirao', 'trenirala',
+    'jeo', 'jela', 'pojeo', 'pojela', 'doručkovao', 'ručao', 'večerao', 'popio', 'popila', 'pio', 'pila',
+    'serije', 'serija', 'ponavljanja', 'ponavljanje', 'kg', 'g', 'grama', 'ml', 'l', 'vode',
+}
+
+# Riječi zbog kojih poruka nije zapis nečeg što se dogodilo (negacija, budućnost, želja, pitanje)
+NEGATION_WORDS = {
+    'ne', 'nisam', 'nisi', 'nije', 'nismo', 'niste', 'nisu', 'neću', 'nećeš', 'neće', 'nećemo', 'nećete',
+    'nemoj', 'nemojte', 'nemam', 'nema', 'bez', 'nikad', 'nikada', 'niti', 'ni',
+    'ću', 'ćeš', 'će', 'ćemo', 'ćete', 'bih', 'bi', 'bismo', 'biste', 'sutra', 'planiram', 'želim', 'trebam',
+    'trebao', 'trebala', 'mogu', 'smijem', 'li',
+}
+
+_word_re = re.compile(r'\w+')
+
+
+def _leftover_words(text, spans):
+    """Riječi koje nisu dio prepoznatih dijelova ni poznate popunjavajuće riječi."""
+    for start, end in sorted(spans, reverse=True):
+        text = text[:start] + ' ' + text[end:]
+    return [word for word in _word_re.findall(text) if word not in FILLER_WORDS]
+
+
+def _action(found):
+    """Akcija za jedini spomen u poruci i njegovi dijelovi teksta; (None, None) ako nedostaje broj."""
+    if found['water']:
+        water = found['water'][0]
+        return {"action": "log_water", "parameters": {"amount_ml": water['amount_ml']}}, water['spans']
+
+    if found['exercises']:
+        mention = found['exercises'][0]
+        if not mention['entry']['query'] or 'sets_reps' not in mention:
+            return None, None
+        parameters = {"exercise_name": mention['entry']['query'], "sets": mention['sets_reps']['sets'],
+                      "reps": mention['sets_reps']['reps']}
+        if 'weight' in mention:
+            parameters["weight"] = mention['weight']['value']
+        return {"action": "log_workout", "parameters": parameters}, mention['spans']
+
+    mention = found['foods'][0]
+    if 'quantity' not in mention:
+        return None, None
+    unit = mention['quantity']['unit']
+    unit = {'gr': 'g', 'grama': 'g', 'komada': 'kom'}.get(unit, unit or 'kom')
+    parameters = {"food_name": mention['entry']['query'], "quantity": mention['quantity']['value'], "unit": unit}
+    return {"action": "log_meal", "parameters": parameters}, mention['spans']
+
+
+def score_intent(text):
+    """Vrati (akcija ili None, pouzdanost 0-1) za poruku."""
+    text = text.lower().strip()
+    if not text or '?' in text or not NEGATION_WORDS.isdisjoint(_word_re.findall(text)):
+        return None, 0.0
+
+    found = extract(text)
+    if len(found['water']) + len(found['exercises']) + len(found['foods']) != 1:
+        return None, 0.0
+    action_data, spans = _action(found)
+    if action_data is None:
+        return None, 0.0
+
+    leftover = _leftover_words(text, spans)
+    # Svaka nepoznata riječ smanjuje pouzdanost; jedna (npr. "teški") je još u redu
+    confidence = max(0.0, 0.95 - 0.1 * len(leftover))
+    return action_data, confidence
+
+
+def parse_intent(text, threshold=CONFIDENCE_THRESHOLD):
+    """Akcija za `execute_ai_action` ili None ako poruku treba poslati jezičnom modelu."""
+    action_data, confidence = score_intent(text)
+    return action_data if confidence >= threshold else None
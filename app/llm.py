@@ -0,0 +1,290 @@
+# app/llm.py
+"""
+Sučelje prema jezičnom modelu za AI chat.
+
+Provider (Groq ili lokalna deterministička zamjena) bira se u konfiguraciji (LLM_PROVIDER),
+a LLMClient oko njega dodaje predmemoriju odgovora i metrike (pogoci, latencija).
+Lokalni provider ne treba mrežu, pa se chat može testirati i opterećivati bez API ključa.
+"""
+import json
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict, deque
+from flask import current_app
+from app.tracing import record_span, span
+
+
+class LLMProvider:
+    """Osnovno sučelje: complete() vraća cijeli odgovor, stream() dijelove odgovora redom."""
+    name = 'base'
+
+    def complete(self, messages, timeout=None):
+        raise NotImplementedError
+
+    def stream(self, messages, timeout=None):
+        yield self.complete(messages, timeout)
+
+
+class GroqProvider(LLMProvider):
+    name = 'groq'
+
+    def __init__(self, api_key, model, temperature, max_tokens, top_p):
+        from groq import Groq
+        self.client = Groq(api_key=api_key)
+        self.options = dict(model=model, temperature=temperature, max_tokens=max_tokens, top_p=top_p)
+
+    def complete(self, messages, timeout=None):
+        resp = self.client.chat.completions.create(messages=messages, timeout=timeout, **self.options)
+        return resp.choices[0].message.content.strip()
+
+    def stream(self, messages, timeout=None):
+        stream = self.client.chat.completions.create(messages=messages, timeout=timeout, stream=True, **self.options)
+        try:
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            stream.close()
+
+
+WORKOUT_PATTERN = re.compile(
+    r"(?P<name>[^\d]+?)\s+(?P<sets>\d+)\s*(?:x|serij\w*)\s*(?P<reps>\d+)(?:\s*ponavljanj\w*)?"
+    r"(?:\s*(?P<weight>\d+(?:[.,]\d+)?)\s*kg)?", re.IGNORECASE)
+MEAL_PATTERN = re.compile(
+    r"(?:(?:jeo|jela|pojeo|pojela)\s+sam\s+)?(?P<quantity>\d+)\s*(?P<unit>g|kg|ml|kom)?\s+(?P<food>[^\d]+)", re.IGNORECASE)
+
+
+class LocalProvider(LLMProvider):
+    """
+    Deterministička zamjena za model: prepoznaje jednostavne fraze za vježbe i obroke
+    i vraća odgovor u istom obliku kao model (tekst + `<execute>` blok). `latency`
+    simulira vrijeme odgovora udaljenog API-ja.
+    """
+    name = 'local'
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+
+    def complete(self, messages, timeout=None):
+        if self.latency:
+            time.sleep(self.latency)
+        text = next((m['content'] for m in reversed(messages) if m['role'] == 'user'), '').strip()
+
+        match = WORKOUT_PATTERN.fullmatch(text)
+        if match:
+            parameters = {"exercise_name": match['name'].strip(), "sets": int(match['sets']), "reps": int(match['reps'])}
+            if match['weight']:
+                parameters["weight"] = float(match['weight'].replace(',', '.'))
+            action = {"action": "log_workout", "parameters": parameters}
+            return f"Super, bilježim!<execute>{json.dumps(action, ensure_ascii=False)}</execute>"
+
+        match = MEAL_PATTERN.fullmatch(text)
+        if match:
+            action = {"action": "log_meal", "parameters": {"food_name": match['food'].strip(),
+                                                           "quantity": int(match['quantity']),
+                                                           "unit": (match['unit'] or 'g').lower()}}
+            return f"U redu, bilježim.<execute>{json.dumps(action, ensure_ascii=False)}</execute>"
+
+        return "Možete li navesti više detalja (količinu, serije, ponavljanja ili težinu)?"
+
+    def stream(self, messages, timeout=None):
+        # Dijelovi od nekoliko znakova, kao tokeni pravog modela (tag može biti presječen)
+        text = self.complete(messages, timeout)
+        for start in range(0, len(text), 8):
+            yield text[start:start + 8]
+
+
+def normalize_input(text):
+    """Ključ predmemorije: mala slova, NFC, jedan razmak, bez interpunkcije na kraju."""
+    text = unicodedata.normalize('NFC', text).lower()
+    return re.sub(r'\s+', ' ', text).strip().rstrip('.!?,;')
+
+
+EXECUTE_BLOCK = re.compile(r"<execute>(.*?)</execute>", re.DOTALL)
+CACHED_REPLY = "U redu, bilježim."
+# Akcija -> o čemu je riječ; poruka je samostalna ako to spominje (uz broj), npr. "200g piletine"
+ACTION_SUBJECTS = {
+    'log_meal': lambda parameters: parameters.get('food_name'),
+    'log_workout': lambda parameters: parameters.get('exercise_name'),
+    'log_water': lambda parameters: 'voda',
+}
+
+
+def _mentions(text, subject):
+    """Spominje li tekst sve riječi predmeta (po prva tri slova, zbog padeža: "piletina" / "piletine")."""
+    words = [word[:3] for word in re.findall(r'\w+', normalize_input(str(subject or ''))) if len(word) >= 3]
+    text_words = re.findall(r'\w+', text)
+    return bool(words) and all(any(t.startswith(word) for t in text_words) for word in words)
+
+
+def self_contained_action(text, response):
+    """
+    `<execute>` blok iz odgovora ako ga je moguće izvesti iz same poruke (broj i predmet akcije su
+    u poruci), inače None. Samo takvi odgovori smiju se ponoviti za istu poruku u drugom razgovoru;
+    "200g" kao odgovor na "Koliko piletine?" to nije.
+    """
+    match = EXECUTE_BLOCK.search(response)
+    if not match:
+        return None
+    try:
+        action = json.loads(match.group(1))
+    except json.JSONDecodeError:
+        return None
+    subject = ACTION_SUBJECTS.get(action.get('action') if isinstance(action, dict) else None)
+    text = normalize_input(text)
+    if subject is None or not re.search(r'\d', text) or not _mentions(text, subject(action.get('parameters') or {})):
+        return None
+    return match.group(0)
+
+
+class ResponseCache:
+    """LRU predmemorija odgovora s rokom trajanja (TTL) po unosu."""
+
+    def __init__(self, max_entries=1024, ttl_seconds=3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # ključ -> (vrijeme isteka, odgovor)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class LLMClient:
+    """
+    Provider + predmemorija + metrike. Predmemorija se koristi samo kad pozivatelj preda
+    `cache_scope` (naziv i verzija predloška prompta, bez podataka o korisniku); ključ je
+    scope + normalizirana zadnja korisnička poruka. Pamti se samo `<execute>` akcija iz
+    samostalne poruke za bilježenje ("bench press 3x10 80kg", vidi self_contained_action),
+    a pogodak vraća neutralan tekst (CACHED_REPLY) i tu akciju, pa se ni ime korisnika iz
+    odgovora modela ne ponavlja drugom korisniku.
+    """
+
+    def __init__(self, provider, cache, timeout=None):
+        self.provider = provider
+        self.cache = cache
+        self.timeout = timeout
+        self._latencies = deque(maxlen=1000)
+        self._lock = threading.Lock()
+        self.upstream_calls = 0
+        self.upstream_errors = 0
+
+    def _cache_key(self, messages, cache_scope):
+        if cache_scope is None or not messages or messages[-1]['role'] != 'user' or not messages[-1]['content']:
+            return None
+        return (self.provider.name, cache_scope, normalize_input(messages[-1]['content']))
+
+    def _record(self, started, failed=False):
+        with self._lock:
+            self.upstream_calls += 1
+            self.upstream_errors += failed
+            self._latencies.append(time.perf_counter() - started)
+
+    def _remember(self, key, messages, response):
+        if key is not None:
+            action = self_contained_action(messages[-1]['content'], response)
+            if action is not None:
+                self.cache.put(key, action)
+
+    def _cached(self, key):
+        action = self.cache.get(key) if key else None
+        return f"{CACHED_REPLY}{action}" if action is not None else None
+
+    def complete(self, messages, cache_scope=None):
+        key = self._cache_key(messages, cache_scope)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+        started = time.perf_counter()
+        try:
+            with span('llm'):
+                response = self.provider.complete(messages, self.timeout)
+        except Exception:
+            self._record(started, failed=True)
+            raise
+        self._record(started)
+        self._remember(key, messages, response)
+        return response
+
+    def stream(self, messages, cache_scope=None):
+        key = self._cache_key(messages, cache_scope)
+        cached = self._cached(key)
+        if cached is not None:
+            yield cached
+            return
+        started = time.perf_counter()
+        parts = []
+        try:
+            for part in self.provider.stream(messages, self.timeout):
+                parts.append(part)
+                yield part
+        except Exception:
+            self._record(started, failed=True)
+            raise
+        finally:
+            record_span('llm', time.perf_counter() - started)
+        self._record(started)
+        self._remember(key, messages, ''.join(parts))
+
+    def metrics(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            calls, errors = self.upstream_calls, self.upstream_errors
+
+        def percentile(p):
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 1) if latencies else None
+
+        lookups = self.cache.hits + self.cache.misses
+        return {
+            'provider': self.provider.name,
+            'cache': {'entries': len(self.cache), 'hits': self.cache.hits, 'misses': self.cache.misses,
+                      'evictions': self.cache.evictions,
+                      'hit_rate': round(self.cache.hits / lookups, 3) if lookups else None},
+            'upstream': {'calls': calls, 'errors': errors,
+                         'latency_ms': {'p50': percentile(0.5), 'p95': percentile(0.95), 'max': percentile(1.0)}},
+        }
+
+
+def build_llm(config):
+    """Napravi LLMClient iz konfiguracije; None ako odabrani provider nije dostupan (npr. nema API ključa)."""
+    provider_name = config.get('LLM_PROVIDER', 'groq')
+    if provider_name == 'local':
+        provider = LocalProvider(latency=config.get('LOCAL_LLM_LATENCY_SECONDS', 0.0))
+    elif provider_name == 'groq' and config.get('GROQ_API_KEY'):
+        provider = GroqProvider(config['GROQ_API_KEY'], config.get('LLM_MODEL', 'llama-3.1-8b-instant'),
+                                config.get('LLM_TEMPERATURE', 0.2), config.get('LLM_MAX_TOKENS', 512),
+                                config.get('LLM_TOP_P', 0.9))
+    else:
+        return None
+    cache = ResponseCache(config.get('LLM_CACHE_SIZE', 1024), config.get('LLM_CACHE_TTL_SECONDS', 3600))
+    return LLMClient(provider, cache, timeout=config.get('CHAT_LLM_TIMEOUT_SECONDS', 20))
+
+
+def get_llm():
+    """LLMClient trenutne aplikacije (ili None ako AI servis nije dostupan)."""
+    return current_app.extensions.get('llm')
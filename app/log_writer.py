@@ -0,0 +1,257 @@
+# app/log_writer.py
+"""
+Grupni upis logova (treninzi, obroci, raspoloženje, voda) iz svih zahtjeva.
+
+Rute ne rade commit za svaki redak: predaju retke LogWriteru, a pozadinska dretva ih
+skuplja dok ih ne bude LOG_BATCH_MAX_SIZE ili ne prođe LOG_BATCH_MAX_WAIT_MS, pa ih
+sprema u jednoj transakciji (jedan fsync za cijelu grupu). ORM objekti nastaju u toj
+transakciji, pa slušač za DailyRollup radi kao i prije. Retci jednog poziva uvijek
+su u istoj transakciji.
+
+LOG_WRITE_ACK određuje potvrdu pozivatelju:
+- 'commit': poziv čeka da grupa bude spremljena i dobije grešku ako nije;
+- 'queued': poziv se vraća odmah, a čitanja za tog korisnika (get_daily_summary,
+  dashboard) prvo pričekaju njegove predane retke (wait_for_user).
+Uz LOG_WRITE_BEHIND = False retci se spremaju odmah u sesiji pozivatelja.
+"""
+import atexit
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from flask import current_app, has_app_context
+
+ACK_MODES = ('commit', 'queued')
+
+
+class WriteTicket:
+    """Potvrda za retke jednog poziva: wait() vraća kad su spremljeni ili diže grešku spremanja."""
+    __slots__ = ('rows', 'user_ids', 'error', '_done')
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.user_ids = {values.get('user_id') for _, values in rows}
+        self.error = None
+        self._done = threading.Event()
+
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        if not self._done.wait(timeout):
+            raise TimeoutError("Logovi nisu spremljeni u zadanom vremenu.")
+        if self.error is not None:
+            raise self.error
+        return True
+
+    def _finish(self, error=None):
+        self.error = error
+        self._done.set()
+
+
+class LogWriter:
+    """Red za upis logova s grupnim commitom (vidi opis modula)."""
+
+    def __init__(self, app, enabled=True, ack='commit', max_batch_size=64, max_wait_ms=5, ack_timeout=10):
+        if ack not in ACK_MODES:
+            raise ValueError(f"LOG_WRITE_ACK mora biti jedan od {ACK_MODES}, a ne '{ack}'.")
+        self.app = app
+        self.enabled = enabled
+        self.ack = ack
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.ack_timeout = ack_timeout
+        self._queue = deque()
+        self._condition = threading.Condition()
+        self._pending = {}  # user_id -> set(WriteTicket) koji još nisu spremljeni
+        self._worker = None
+        self._closed = False
+        self.rows_written = 0
+        self.transactions = 0
+        self.errors = 0
+
+    # --- predaja ---
+
+    def submit(self, rows):
+        """Predaj listu (model, vrijednosti) za spremanje u jednoj transakciji; vraća WriteTicket."""
+        rows = [(model, self._with_date(model, values)) for model, values in rows]
+        ticket = WriteTicket(rows)
+        if not rows:
+            ticket._finish()
+            return ticket
+        if not self.enabled:
+            self._write_inline(ticket)
+            return ticket
+
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("LogWriter je zatvoren.")
+            for user_id in ticket.user_ids:
+                self._pending.setdefault(user_id, set()).add(ticket)
+            self._queue.append(ticket)
+            self._start_worker()
+            self._condition.notify()
+        return ticket
+
+    def write(self, rows):
+        """Predaj retke i potvrdi prema LOG_WRITE_ACK (uz 'commit' čeka spremanje i diže grešku)."""
+        ticket = self.submit(rows)
+        if self.ack == 'commit':
+            ticket.wait(self.ack_timeout)
+        return ticket
+
+    def log(self, model, **values):
+        """Jedan redak: log(MealLog, user_id=..., food=..., calories=...)."""
+        return self.write([(model, values)])
+
+    @staticmethod
+    def _with_date(model, values):
+        # Datum unosa je trenutak predaje, a ne trenutak spremanja grupe (npr. oko ponoći)
+        if 'date' in model.__table__.c and values.get('date') is None:
+            values = dict(values, date=datetime.utcnow())
+        return values
+
+    # --- čitanje vlastitih upisa ---
+
+    def wait_for_user(self, user_id, timeout=None):
+        """Pričekaj da budu spremljeni svi predani retci korisnika (prije čitanja njegovih logova)."""
+        with self._condition:
+            tickets = list(self._pending.get(user_id, ()))
+        deadline = time.monotonic() + (self.ack_timeout if timeout is None else timeout)
+        for ticket in tickets:
+            ticket._done.wait(max(0.0, deadline - time.monotonic()))
+
+    def flush(self, timeout=None):
+        """Pričekaj da budu spremljeni svi do sada predani retci."""
+        with self._condition:
+            tickets = [ticket for tickets in self._pending.values() for ticket in tickets]
+        deadline = time.monotonic() + (self.ack_timeout if timeout is None else timeout)
+        for ticket in tickets:
+            ticket._done.wait(max(0.0, deadline - time.monotonic()))
+
+    def close(self):
+        """Spremi sve iz reda i zaustavi dretvu (pri gašenju procesa)."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        if self._worker is not None:
+            self._worker.join(self.ack_timeout)
+
+    # --- spremanje ---
+
+    def _write_inline(self, ticket):
+        from app import db
+        try:
+            db.session.add_all([model(**values) for model, values in ticket.rows])
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            self.errors += 1
+            ticket._finish(e)
+        else:
+            self.rows_written += len(ticket.rows)
+            self.transactions += 1
+            ticket._finish()
+
+    def _start_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name='log-writer', daemon=True)
+            self._worker.start()
+
+    def _collect(self):
+        """Prvi ticket iz reda, zatim ostali dok grupa nije puna ili ne istekne max_wait; None pri zatvaranju."""
+        with self._condition:
+            while not self._queue:
+                if self._closed:
+                    return None
+                self._condition.wait()
+            deadline = time.monotonic() + self.max_wait
+            batch, rows = [], 0
+            while True:
+                while self._queue and rows < self.max_batch_size:
+                    ticket = self._queue.popleft()
+                    batch.append(ticket)
+                    rows += len(ticket.rows)
+                remaining = deadline - time.monotonic()
+                if rows >= self.max_batch_size or remaining <= 0 or self._closed:
+                    return batch
+                self._condition.wait(remaining)
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            with self.app.app_context():
+                self._commit_batch(batch)
+
+    def _commit_batch(self, batch):
+        from app import db
+        try:
+            db.session.add_all([model(**values) for ticket in batch for model, values in ticket.rows])
+            db.session.commit()
+            results = [(ticket, None) for ticket in batch]
+            self.transactions += 1
+        except Exception:
+            # Jedan neispravan redak ne smije srušiti cijelu grupu: ponovi svaki poziv zasebno
+            db.session.rollback()
+            results = []
+            for ticket in batch:
+                try:
+                    db.session.add_all([model(**values) for model, values in ticket.rows])
+                    db.session.commit()
+                    results.append((ticket, None))
+                    self.transactions += 1
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"❌ Greška pri spremanju logova: {e}")
+                    results.append((ticket, e))
+        finally:
+            db.session.remove()
+
+        with self._condition:
+            for ticket, error in results:
+                if error is None:
+                    self.rows_written += len(ticket.rows)
+                else:
+                    self.errors += 1
+                for user_id in ticket.user_ids:
+                    tickets = self._pending.get(user_id)
+                    if tickets is not None:
+                        tickets.discard(ticket)
+                        if not tickets:
+                            del self._pending[user_id]
+        for ticket, error in results:
+            ticket._finish(error)
+
+    def stats(self):
+        with self._condition:
+            queued = sum(len(ticket.rows) for ticket in self._queue)
+        return {'enabled': self.enabled, 'ack': self.ack, 'queued_rows': queued, 'rows_written': self.rows_written,
+                'transactions': self.transactions, 'errors': self.errors,
+                'rows_per_transaction': round(self.rows_written / self.transactions, 2) if self.transactions else None}
+
+
+def init_log_writer(app):
+    config = app.config
+    writer = LogWriter(app, enabled=config.get('LOG_WRITE_BEHIND', True), ack=config.get('LOG_WRITE_ACK', 'commit'),
+                       max_batch_size=config.get('LOG_BATCH_MAX_SIZE', 64),
+                       max_wait_ms=config.get('LOG_BATCH_MAX_WAIT_MS', 5),
+                       ack_timeout=config.get('LOG_WRITE_ACK_TIMEOUT_SECONDS', 10))
+    app.extensions['log_writer'] = writer
+    atexit.register(writer.close)
+    return writer
+
+
+def get_log_writer():
+    """LogWriter trenutne aplikacije."""
+    return current_app.extensions['log_writer']
+
+
+def wait_for_user_writes(user_id):
+    """Read-your-writes: prije čitanja logova korisnika pričekaj njegove predane, još nespremljene retke."""
+    if has_app_context():
+        writer = current_app.extensions.get('log_writer')
+        if writer is not None:
+            writer.wait_for_user(user_id)
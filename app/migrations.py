@@ -0,0 +1,81 @@
+# app/migrations.py
+"""
+Verzionirane migracije sheme za postojeće baze.
+
+db.create_all() kreira samo tablice koje ne postoje, pa nove stupce i indekse na starim
+tablicama dodajemo ovdje. Svaka migracija se izvršava jednom, u vlastitoj transakciji, a
+primijenjene verzije bilježe se u tablici `schema_migration`. Migracije moraju biti
+idempotentne jer se izvršavaju i na novim bazama koje je create_all već napravio do kraja.
+"""
+from datetime import datetime
+from sqlalchemy import inspect, text
+from app import db
+
+MIGRATIONS = []
+
+
+def migration(version, description):
+    """Registrira funkciju `fn(connection)` kao migraciju s danim brojem verzije."""
+    def decorator(fn):
+        MIGRATIONS.append((version, description, fn))
+        return fn
+    return decorator
+
+
+@migration(1, "Stupci user.medical_history i user.citizenship")
+def _user_profile_columns(connection):
+    columns = {column['name'] for column in inspect(connection).get_columns('user')}
+    if 'medical_history' not in columns:
+        connection.execute(text("ALTER TABLE user ADD COLUMN medical_history TEXT"))
+    if 'citizenship' not in columns:
+        connection.execute(text("ALTER TABLE user ADD COLUMN citizenship VARCHAR(10)"))
+
+
+@migration(2, "Kompozitni indeksi (user_id, date) na tablicama logova")
+def _log_indexes(connection):
+    for table in ('workout_log', 'meal_log', 'mood_log', 'water_log'):
+        connection.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{table}_user_date ON {table} (user_id, date)"))
+    connection.execute(text("CREATE INDEX IF NOT EXISTS ix_progress_report_lookup "
+                            "ON progress_report (user_id, report_type, generated_date)"))
+
+
+@migration(3, "Dnevni zbrojevi (daily_rollup) iz postojećih logova")
+def _backfill_daily_rollups(connection):
+    from app.models import DailyRollup
+    DailyRollup.rebuild()
+
+
+@migration(4, "Jedinstveni indeks na food_item.name (za upsert USDA namirnica)")
+def _food_item_unique_name(connection):
+    # Stari uvozi su mogli ostaviti duplikate naziva - zadržavamo prvi redak
+    connection.execute(text("DELETE FROM food_item WHERE id NOT IN (SELECT MIN(id) FROM food_item GROUP BY name)"))
+    connection.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ux_food_item_name ON food_item (name)"))
+
+
+def applied_versions():
+    return set(db.session.execute(text("SELECT version FROM schema_migration")).scalars())
+
+
+def upgrade():
+    """Primijeni sve migracije koje još nisu zabilježene; vraća listu primijenjenih verzija."""
+    db.session.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migration ("
+        "version INTEGER PRIMARY KEY, description VARCHAR(200), applied_at DATETIME)"))
+    db.session.commit()
+
+    done = applied_versions()
+    applied = []
+    for version, description, fn in sorted(MIGRATIONS, key=lambda m: m[0]):
+        if version in done:
+            continue
+        try:
+            fn(db.session.connection())
+            db.session.execute(
+                text("INSERT INTO schema_migration (version, description, applied_at) VALUES (:v, :d, :t)"),
+                {'v': version, 'd': description, 't': datetime.utcnow()})
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        applied.append(version)
+    return applied
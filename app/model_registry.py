@@ -0,0 +1,77 @@
+# app/model_registry.py
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+
+class ModelRegistry:
+    """
+    Lijeno učitavanje artefakata (RL agenti, recepti...). Artefakt se učitava pri prvom
+    get() ili u warm_up(); bilježi se trajanje, zauzeta memorija i greška, pa status()
+    pokazuje jesu li preporuke stvarno dostupne umjesto da se greška tiho proguta.
+    """
+
+    RETRY_SECONDS = 60  # nakon neuspjeha ne pokušavamo ponovno pri svakom zahtjevu
+
+    def __init__(self):
+        self._loaders = {}
+        self._artifacts = {}
+        self._status = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, loader):
+        self._loaders[name] = loader
+        self._status[name] = {'state': 'not_loaded'}
+
+    def get(self, name):
+        """Vrati artefakt (učitava ga po potrebi) ili None ako učitavanje nije uspjelo."""
+        if name in self._artifacts:
+            return self._artifacts[name]
+        with self._lock:
+            if name in self._artifacts:
+                return self._artifacts[name]
+            status = self._status[name]
+            if status['state'] == 'failed' and time.monotonic() - status['failed_at'] < self.RETRY_SECONDS:
+                return None
+            return self._load(name)
+
+    def _load(self, name):
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        try:
+            artifact = self._loaders[name]()
+        except Exception as e:
+            print(f"❌ Greška pri učitavanju artefakta '{name}': {e}")
+            self._status[name] = {'state': 'failed', 'error': f"{type(e).__name__}: {e}",
+                                  'failed_at': time.monotonic()}
+            return None
+        finally:
+            load_seconds = time.perf_counter() - started
+            memory = tracemalloc.get_traced_memory()[0] - before
+            if not tracing:
+                tracemalloc.stop()
+
+        self._artifacts[name] = artifact
+        self._status[name] = {'state': 'loaded', 'load_seconds': round(load_seconds, 3),
+                              'memory_mb': round(memory / 2 ** 20, 2),
+                              'loaded_at': datetime.utcnow().isoformat(timespec='seconds')}
+        print(f"✅ Učitan artefakt '{name}' ({load_seconds:.2f} s, {memory / 2 ** 20:.1f} MB)")
+        return artifact
+
+    def warm_up(self):
+        """Učitaj sve registrirane artefakte odmah (npr. iz create_app)."""
+        for name in self._loaders:
+            self.get(name)
+        return self.is_ready()
+
+    def is_ready(self):
+        return all(status['state'] == 'loaded' for status in self._status.values())
+
+    def status(self):
+        artifacts = {name: {k: v for k, v in status.items() if k != 'failed_at'}
+                     for name, status in self._status.items()}
+        return {'ready': self.is_ready(), 'artifacts': artifacts}
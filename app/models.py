@@ -2,11 +2,17 @@
 from app import db, login_manager
 from flask_login import UserMixin
 from datetime import datetime
+from sqlalchemy import event, select, update, delete
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, object_session
 from werkzeug.security import generate_password_hash, check_password_hash
+from flask import current_app
+from app.user_profiles import PROFILE_FIELDS, UserProfile, invalidate_user_profile
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    # Lagani profil iz predmemorije umjesto cijelog retka korisnika na svakom zahtjevu
+    return current_app.extensions['user_profiles'].get(int(user_id), _load_user_profile)
 
 class User(db.Model, UserMixin):
     id = db.Column(db.Integer, primary_key=True)
@@ -30,6 +36,34 @@ class User(db.Model, UserMixin):
         return check_password_hash(self.password_hash, password)
 
 
+def _load_user_profile(user_id):
+    row = db.session.execute(
+        select(*(getattr(User, field) for field in PROFILE_FIELDS)).where(User.id == user_id)).first()
+    return UserProfile(**row._mapping) if row else None
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _invalidate_user_profile(mapper, connection, target):
+    """
+    Izmjena profila briše ga iz predmemorije odmah pri flushu i ponovno nakon commita,
+    da ga zahtjev koji ga je u međuvremenu učitao iz baze ne ostavi zastarjelog.
+    """
+    invalidate_user_profile(target.id)
+    object_session(target).info.setdefault('changed_user_ids', set()).add(target.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed_user_profiles(session):
+    for user_id in session.info.pop('changed_user_ids', ()):
+        invalidate_user_profile(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_changed_user_ids(session):
+    session.info.pop('changed_user_ids', None)
+
+
 class Exercise(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     exercise_name = db.Column(db.String(150), nullable=False)
@@ -39,6 +73,7 @@ class Exercise(db.Model):
     link = db.Column(db.String(300))
 
 class WorkoutLog(db.Model):
+    __table_args__ = (db.Index('ix_workout_log_user_date', 'user_id', 'date'),)
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     exercise = db.Column(db.String(150))
@@ -49,6 +84,7 @@ class WorkoutLog(db.Model):
     feeling = db.Column(db.String(100))
 
 class MealLog(db.Model):
+    __table_args__ = (db.Index('ix_meal_log_user_date', 'user_id', 'date'),)
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     date = db.Column(db.Date, default=datetime.utcnow)
@@ -60,6 +96,7 @@ class MealLog(db.Model):
     liked_recommendation = db.Column(db.Boolean, default=False)
 
 class MoodLog(db.Model):
+    __table_args__ = (db.Index('ix_mood_log_user_date', 'user_id', 'date'),)
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     date = db.Column(db.Date, default=datetime.utcnow)
@@ -67,12 +104,14 @@ class MoodLog(db.Model):
     note = db.Column(db.Text)
 
 class WaterLog(db.Model):
+    __table_args__ = (db.Index('ix_water_log_user_date', 'user_id', 'date'),)
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     date = db.Column(db.Date, default=datetime.utcnow)
     amount_ml = db.Column(db.Integer)
 
 class ProgressReport(db.Model):
+    __table_args__ = (db.Index('ix_progress_report_lookup', 'user_id', 'report_type', 'generated_date'),)
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     report_type = db.Column(db.String(50))
@@ -82,9 +121,148 @@ class ProgressReport(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 class FoodItem(db.Model):
+    __table_args__ = (db.Index('ux_food_item_name', 'name', unique=True),)
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False)
     calories = db.Column(db.Float)
     protein = db.Column(db.Float)
     fat = db.Column(db.Float)
-    carbs = db.Column(db.Float)
\ No newline at end of file
+    carbs = db.Column(db.Float)
+
+
+class ChatConversation(db.Model):
+    """Razgovor s AI asistentom. Starije poruke sažimaju se u `summary`, pa prompt ne raste s razgovorom."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    summary = db.Column(db.Text, nullable=False, default='')
+    message_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class ChatMessage(db.Model):
+    __table_args__ = (db.Index('ix_chat_message_conversation', 'conversation_id', 'id'),)
+    id = db.Column(db.Integer, primary_key=True)
+    conversation_id = db.Column(db.Integer, db.ForeignKey('chat_conversation.id'), nullable=False)
+    role = db.Column(db.String(20), nullable=False)
+    content = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class DataVersion(db.Model):
+    """Brojač verzije podataka po tablici. Skripte za punjenje ga povećavaju kad prepišu tablicu,
+    a predmemorije u aplikaciji (npr. indeks naziva) po njemu znaju kad se trebaju ponovno izgraditi."""
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @classmethod
+    def current(cls, name):
+        return db.session.execute(select(cls.version).where(cls.name == name)).scalar() or 0
+
+    @classmethod
+    def bump(cls, name, session=None):
+        """Povećava verziju tablice. Commit radi pozivatelj, zajedno s promjenom podataka."""
+        session = session if session is not None else db.session
+        result = session.execute(
+            update(cls).where(cls.name == name).values(version=cls.version + 1, updated_at=datetime.utcnow()))
+        if result.rowcount == 0:
+            session.add(cls(name=name, version=1))
+
+
+MOOD_SCORES = {'excellent': 5, 'good': 4, 'okay': 3, 'bad': 2, 'terrible': 1}
+
+
+class DailyRollup(db.Model):
+    """
+    Dnevni zbroj unosa po korisniku (kalorije, voda, treninzi, raspoloženje). Održava ga
+    slušač `_update_daily_rollups` pri svakom flushu novih logova, pa tjedni izvještaj
+    čita najviše 7 redaka umjesto svih logova.
+    """
+    __table_args__ = (db.UniqueConstraint('user_id', 'date', name='uq_daily_rollup_user_date'),)
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    calories = db.Column(db.Float, nullable=False, default=0)
+    water_ml = db.Column(db.Integer, nullable=False, default=0)
+    workout_count = db.Column(db.Integer, nullable=False, default=0)
+    mood_score_sum = db.Column(db.Integer, nullable=False, default=0)
+    mood_count = db.Column(db.Integer, nullable=False, default=0)
+    best_mood_score = db.Column(db.Integer, nullable=False, default=0)  # 0 = nema unosa raspoloženja
+
+    @classmethod
+    def rebuild(cls):
+        """Ponovno izračunaj sve zbrojeve iz logova (za postojeće baze). Commit radi pozivatelj."""
+        totals = {}
+        for log_model, aggregate, field in ((MealLog, db.func.sum(MealLog.calories), 'calories'),
+                                            (WaterLog, db.func.sum(WaterLog.amount_ml), 'water_ml'),
+                                            (WorkoutLog, db.func.count(WorkoutLog.id), 'workout_count')):
+            rows = db.session.query(log_model.user_id, log_model.date, aggregate).group_by(
+                log_model.user_id, log_model.date)
+            for user_id, day, value in rows:
+                _add_delta(totals, user_id, day, **{field: value or 0})
+        rows = db.session.query(MoodLog.user_id, MoodLog.date, MoodLog.mood, db.func.count(MoodLog.id)).group_by(
+            MoodLog.user_id, MoodLog.date, MoodLog.mood)
+        for user_id, day, mood, count in rows:
+            score = MOOD_SCORES.get(mood, 3)
+            _add_delta(totals, user_id, day, mood_score_sum=score * count, mood_count=count, best_mood_score=score)
+
+        db.session.execute(delete(cls))
+        if totals:
+            db.session.execute(cls.__table__.insert(), [
+                dict(user_id=user_id, date=day, **values) for (user_id, day), values in totals.items()])
+
+
+def _add_delta(totals, user_id, day, calories=0, water_ml=0, workout_count=0,
+               mood_score_sum=0, mood_count=0, best_mood_score=0):
+    if isinstance(day, datetime):
+        day = day.date()
+    values = totals.setdefault((user_id, day), dict(calories=0, water_ml=0, workout_count=0,
+                                                    mood_score_sum=0, mood_count=0, best_mood_score=0))
+    values['calories'] += calories
+    values['water_ml'] += water_ml
+    values['workout_count'] += workout_count
+    values['mood_score_sum'] += mood_score_sum
+    values['mood_count'] += mood_count
+    values['best_mood_score'] = max(values['best_mood_score'], best_mood_score)
+
+
+@event.listens_for(Session, 'after_flush')
+def _update_daily_rollups(session, flush_context):
+    """
+    Nakon svakog flusha zbroji nove logove po (korisnik, dan) i dodaj ih u DailyRollup
+    u istoj transakciji. Ovo pokriva sve putanje unosa (rute, AI akcije, AIVirtualTrainer).
+    """
+    totals = {}
+    for obj in session.new:
+        if isinstance(obj, MealLog):
+            _add_delta(totals, obj.user_id, obj.date, calories=obj.calories or 0)
+        elif isinstance(obj, WaterLog):
+            _add_delta(totals, obj.user_id, obj.date, water_ml=obj.amount_ml or 0)
+        elif isinstance(obj, WorkoutLog):
+            _add_delta(totals, obj.user_id, obj.date, workout_count=1)
+        elif isinstance(obj, MoodLog):
+            score = MOOD_SCORES.get(obj.mood, 3)
+            _add_delta(totals, obj.user_id, obj.date, mood_score_sum=score, mood_count=1, best_mood_score=score)
+    if not totals:
+        return
+
+    table = DailyRollup.__table__
+    connection = session.connection()
+    for (user_id, day), values in totals.items():
+        stmt = sqlite_insert(table).values(user_id=user_id, date=day, **values)
+        stmt = stmt.on_conflict_do_update(index_elements=['user_id', 'date'], set_={
+            'calories': table.c.calories + stmt.excluded.calories,
+            'water_ml': table.c.water_ml + stmt.excluded.water_ml,
+            'workout_count': table.c.workout_count + stmt.excluded.workout_count,
+            'mood_score_sum': table.c.mood_score_sum + stmt.excluded.mood_score_sum,
+            'mood_count': table.c.mood_count + stmt.excluded.mood_count,
+            'best_mood_score': db.func.max(table.c.best_mood_score, stmt.excluded.best_mood_score),
+        })
+        connection.execute(stmt)
+
+    # Novi unosi mijenjaju današnji tjedni izvještaj, pa brišemo njegovu spremljenu kopiju
+    connection.execute(delete(ProgressReport.__table__).where(
+        ProgressReport.user_id.in_({user_id for user_id, _ in totals}),
+        ProgressReport.report_type == 'weekly',
+        ProgressReport.generated_date == datetime.utcnow().date()))
@@ -0,0 +1,48 @@
+# app/recipes.py
+import random
+import numpy as np
+import pandas as pd
+
+# Raspon kalorija za svaku apstraktnu akciju RL agenta: 0 = lagani, 1 = srednji, 2 = obilni obrok
+CALORIE_BUCKETS = [(100, 450), (451, 700), (700, None)]
+
+
+class RecipeStore:
+    """
+    Recepti podijeljeni po kalorijskim skupinama pri učitavanju. Svaka skupina čuva stupce
+    kao numpy polja, pa izvlačenje nekoliko recepata ne filtrira i ne kopira DataFrame.
+    """
+
+    def __init__(self, df):
+        names = df['recipe_name'].to_numpy(dtype=object)
+        calories = df['calories'].to_numpy(dtype=np.float64)
+        links = df['url'].to_numpy(dtype=object)
+        self.buckets = []
+        for low, high in CALORIE_BUCKETS:
+            # Ista pravila kao prije: between() je uključiv, a zadnja skupina je strogo > 700
+            mask = (calories >= low) & (calories <= high) if high is not None else calories > low
+            idx = np.flatnonzero(mask)
+            self.buckets.append({
+                'name': names[idx],
+                'calories': calories[idx].astype(np.int32),
+                'link': links[idx],
+            })
+
+    @classmethod
+    def from_csv(cls, path):
+        df = pd.read_csv(path, usecols=['recipe_name', 'calories', 'url'])
+        df.dropna(subset=['calories', 'url'], inplace=True)
+        return cls(df)
+
+    def __len__(self):
+        return sum(len(bucket['name']) for bucket in self.buckets)
+
+    def sample(self, action, k=3):
+        """Nasumično izvuci do k recepata iz skupine za danu akciju (O(k), bez kopiranja)."""
+        bucket = self.buckets[action]
+        size = len(bucket['name'])
+        return [{
+            "name": bucket['name'][i],
+            "calories": int(bucket['calories'][i]),
+            "link": bucket['link'][i]
+        } for i in random.sample(range(size), min(size, k))]
@@ -1,13 +1,23 @@
 # app/routes.py
+import functools
+import hmac
 import re
 import json
-from flask import Blueprint, render_template, redirect, url_for, flash, request, session
+from flask import (Blueprint, render_template, redirect, url_for, flash, request, session, jsonify,
+                   Response, stream_with_context, current_app)
 from flask_login import login_user, logout_user, current_user, login_required
-from app import db, groq_client
-from app.models import User, WorkoutLog, MealLog, FoodItem, Exercise
+from app import db
+from app.models import User, WorkoutLog, MealLog, WaterLog, FoodItem
 from app.services import (generate_workout_plan, get_meal_recommendations,
-                          generate_weekly_report, get_demographic_insights, get_daily_summary)
-from thefuzz import process
+                          generate_weekly_report, get_demographic_insights, get_daily_summary, registry,
+                          GRAMS_PER_UNIT, meal_calories)
+from app.search import exercise_index, food_index
+from app.chat_store import chat_store
+from app.chat_stream import acquire_stream_slot, action_events, stream_chat
+from app.intent_parser import parse_intent
+from app.llm import get_llm
+from app.log_writer import get_log_writer, wait_for_user_writes
+from app.tracing import metrics, span
 
 main_bp = Blueprint('main', __name__)
 
@@ -76,6 +86,7 @@ def logout():
 def dashboard():
     fitness_plan = session.pop('fitness_plan', None)
     meal_recs = session.pop('meal_recs', None)
+    wait_for_user_writes(current_user.id)
     workout_logs = WorkoutLog.query.filter_by(user_id=current_user.id).order_by(WorkoutLog.date.desc()).limit(3).all()
     meal_logs = MealLog.query.filter_by(user_id=current_user.id).order_by(MealLog.date.desc()).limit(3).all()
     return render_template("dashboard.html", user=current_user,
@@ -105,13 +116,13 @@ def get_meals():
     return redirect(url_for('main.dashboard'))
 
 
-def find_best_match(query, choices):
-    """Pronađi najbolji pogodak koristeći fuzzy matching."""
-    if not choices: return None
-    best_match = process.extractOne(query, choices)
+def find_best_match(query, index):
+    """Pronađi najbolji pogodak u indeksu naziva; vraća (id, naziv) ili None."""
+    with span('fuzzy_match'):
+        best_match = index.best_match(query)
     # Vraćamo podudaranje samo ako je sličnost vrlo visoka (npr. > 85)
-    if best_match and best_match[1] > 85:
-        return best_match[0]
+    if best_match and best_match[2] > 85:
+        return best_match[0], best_match[1]
     return None
 
 
@@ -126,24 +137,22 @@ def execute_ai_action(action_data):
             if not exercise_query: return "❌ Niste naveli ime vježbe."
 
             # Logika za pretragu vježbi
-            all_exercise_names = [ex.exercise_name for ex in Exercise.query.all()]
-            best_match = find_best_match(exercise_query, all_exercise_names)
+            match = find_best_match(exercise_query, exercise_index())
 
-            if not best_match:
+            if not match:
                 return f"❌ Vježba '{exercise_query}' nije pronađena. Molimo pokušajte s drugim nazivom."
+            best_match = match[1]
 
-            workout = WorkoutLog(
+            get_log_writer().log(
+                WorkoutLog,
                 user_id=current_user.id,
                 exercise=best_match,
                 sets=int(params.get("sets")),
                 reps=int(params.get("reps")),
                 weight=float(params.get("weight")) if params.get("weight") else None
             )
-            db.session.add(workout)
-            db.session.commit()
             response_message = f"✅ Trening '{best_match}' je uspješno zabilježen!"
         except Exception as e:
-            db.session.rollback()
             return f"❌ Greška pri bilježenju treninga: {e}"
 
     elif action_name == "log_meal":
@@ -151,29 +160,38 @@ def execute_ai_action(action_data):
             food_query = params.get("food_name")
             if not food_query: return "❌ Niste naveli ime namirnice."
 
-            # Pretpostavljamo da je 'quantity' broj komada ili porcija ako jedinica nije navedena
-            quantity = int(params.get("quantity", 1))
+            # 'quantity' je broj komada ili porcija ako jedinica nije navedena, inače grami/ml ("200g")
+            quantity = float(params.get("quantity", 1))
+            unit = params.get("unit")
 
             # Logika za pretragu hrane
-            all_food_names = [item.name for item in FoodItem.query.all()]
-            best_match = find_best_match(food_query, all_food_names)
+            match = find_best_match(food_query, food_index())
 
-            if not best_match:
+            if not match:
                 return f"❌ Namirnica '{food_query}' nije pronađena. Molimo pokušajte s drugim nazivom."
 
-            food_item = FoodItem.query.filter(FoodItem.name == best_match).first()
+            food_id, best_match = match
+            food_item = db.session.get(FoodItem, food_id)
             if not food_item: return f"Greška: Namirnica '{best_match}' ne postoji u bazi."
 
-            # Ovdje se može dodati naprednija logika za kalorije ako AI vrati i jedinicu (npr. "g")
-            total_calories = food_item.calories * quantity
-            meal = MealLog(user_id=current_user.id, food=food_item.name, quantity=quantity, calories=total_calories)
-            db.session.add(meal)
-            db.session.commit()
-            response_message = f"✅ Obrok '{quantity}x {food_item.name}' ({int(total_calories)} kcal) je uspješno zabilježen!"
+            total_calories = meal_calories(food_item.calories, quantity, unit)
+            get_log_writer().log(MealLog, user_id=current_user.id, food=food_item.name, quantity=round(quantity),
+                                 calories=total_calories)
+            amount = f"{quantity:g} {unit}" if unit in GRAMS_PER_UNIT else f"{quantity:g}x"
+            response_message = f"✅ Obrok '{amount} {food_item.name}' ({int(total_calories)} kcal) je uspješno zabilježen!"
         except Exception as e:
-            db.session.rollback()
             return f"❌ Greška pri bilježenju obroka: {e}"
 
+    elif action_name == "log_water":
+        try:
+            amount_ml = int(params.get("amount_ml", 0))
+            if amount_ml <= 0: return "❌ Niste naveli količinu vode."
+
+            get_log_writer().log(WaterLog, user_id=current_user.id, amount_ml=amount_ml)
+            response_message = f"✅ Voda ({amount_ml} ml) je uspješno zabilježena!"
+        except Exception as e:
+            return f"❌ Greška pri bilježenju vode: {e}"
+
     elif action_name == "recommend_workout":
         plan = generate_workout_plan(current_user)
         if "Greška" in plan:
@@ -205,11 +223,13 @@ def execute_ai_action(action_data):
     return response_message or "Nepoznata akcija."
 
 
-@main_bp.route("/smart_input", methods=["GET", "POST"])
-@login_required
-def smart_input():
+# Ključ predmemorije odgovora modela za smart_input; povećaj verziju kad se promijeni predložak prompta
+SMART_INPUT_CACHE_SCOPE = 'smart_input:v1'
+
+
+def _smart_input_system_prompt():
     # Uklonili smo slanje cijele baze u prompt!
-    system_prompt = {
+    return {
         "role": "system",
         "content": f"""Ti si NutriFit AI, precizan fitness asistent. Tvoj zadatak je pomoći korisniku zabilježiti obroke i vježbe.
         Informacije o korisniku: {current_user.username}, Cilj: {current_user.goal}.
@@ -227,11 +247,31 @@ def smart_input():
         PRIMJER (Vježba):
         Korisnik: bench press 3 serije 10 ponavljanja 80kg
         Tvoj odgovor: Super, bilježim!<execute>{{"action": "log_workout", "parameters": {{"exercise_name": "bench press", "sets": 3, "reps": 10, "weight": 80}}}}</execute>
+
+        PRIMJER (Voda):
+        Korisnik: popio sam 2 litre vode
+        Tvoj odgovor: Odlično!<execute>{{"action": "log_water", "parameters": {{"amount_ml": 2000}}}}</execute>
         """
     }
 
-    if "chat_history" not in session:
-        session["chat_history"] = []
+
+def _append_user_message(user_msg):
+    """Spremi poruku korisnika u razgovor iz kolačića (ili u novi); vraća id razgovora."""
+    conversation_id = chat_store.resolve(current_user.id, session.get("chat_conversation_id"))
+    if conversation_id != session.get("chat_conversation_id"):
+        session["chat_conversation_id"] = conversation_id
+    chat_store.append(current_user.id, conversation_id, "user", user_msg)
+    return conversation_id
+
+
+@main_bp.route("/smart_input", methods=["GET", "POST"])
+@login_required
+def smart_input():
+    system_prompt = _smart_input_system_prompt()
+
+    # Povijest razgovora je u bazi; u kolačiću je samo id razgovora (stari chat_history se uklanja)
+    session.pop("chat_history", None)
+    conversation_id = session.get("chat_conversation_id")
 
     if request.method == "POST":
         user_msg = request.form.get("description", "").strip()
@@ -239,20 +279,17 @@ def smart_input():
             flash("Poruka ne može biti prazna.", "warning")
             return redirect(url_for('main.smart_input'))
 
-        session["chat_history"].append({"role": "user", "content": user_msg})
+        conversation_id = _append_user_message(user_msg)
 
-        if groq_client:
+        # Strukturirane poruke ("čučanj 3x10 100kg") rješava parser, bez poziva modela
+        action_data = parse_intent(user_msg)
+        llm = get_llm()
+        if action_data:
+            chat_store.append(current_user.id, conversation_id, "assistant", execute_ai_action(action_data))
+        elif llm:
             try:
-                messages_to_send = [system_prompt] + session["chat_history"]
-
-                resp = groq_client.chat.completions.create(
-                    messages=messages_to_send,
-                    model="llama-3.1-8b-instant",
-                    temperature=0.2,
-                    max_tokens=512,
-                    top_p=0.9
-                )
-                ai_response_text = resp.choices[0].message.content.strip()
+                messages_to_send = [system_prompt] + chat_store.context(current_user.id, conversation_id)
+                ai_response_text = llm.complete(messages_to_send, SMART_INPUT_CACHE_SCOPE)
 
                 action_data = None
                 conversational_reply = ai_response_text
@@ -266,35 +303,109 @@ def smart_input():
                         print(f"AI je generirao neispravan JSON: {json_string}")
 
                 if conversational_reply:
-                    session["chat_history"].append({"role": "assistant", "content": conversational_reply})
+                    chat_store.append(current_user.id, conversation_id, "assistant", conversational_reply)
 
                 if action_data:
                     action_result_msg = execute_ai_action(action_data)
-                    session["chat_history"].append({"role": "assistant", "content": action_result_msg})
+                    chat_store.append(current_user.id, conversation_id, "assistant", action_result_msg)
 
             except Exception as e:
-                print(f"Greška pri pozivu Groq API-ja: {e}")
-                session["chat_history"].append({"role": "assistant", "content": "Trenutno imam tehničkih poteškoća."})
+                print(f"Greška pri pozivu jezičnog modela: {e}")
+                db.session.rollback()
+                chat_store.append(current_user.id, conversation_id, "assistant", "Trenutno imam tehničkih poteškoća.")
         else:
-            session["chat_history"].append({"role": "assistant", "content": "AI servis trenutno nije dostupan."})
-
-        if len(session["chat_history"]) > 10:
-            session["chat_history"] = session["chat_history"][-10:]
+            chat_store.append(current_user.id, conversation_id, "assistant", "AI servis trenutno nije dostupan.")
 
-        session.modified = True
         return redirect(url_for('main.smart_input'))
 
-    return render_template("smart_input.html", chat_history=session.get("chat_history", []))
+    chat_history = chat_store.history(current_user.id, conversation_id) if conversation_id else []
+    return render_template("smart_input.html", chat_history=chat_history)
+
+
+@main_bp.route("/smart_input/stream", methods=["POST"])
+@login_required
+def smart_input_stream():
+    """Ista logika kao smart_input, ali se odgovor šalje token po token (Server-Sent Events)."""
+    user_msg = (request.form.get("description") or (request.get_json(silent=True) or {}).get("description") or "").strip()
+    if not user_msg:
+        return jsonify({"error": "Poruka ne može biti prazna."}), 400
+    action_data = parse_intent(user_msg)
+    llm = get_llm()
+    if not action_data and not llm:
+        return jsonify({"error": "AI servis trenutno nije dostupan."}), 503
+
+    if action_data:
+        conversation_id = _append_user_message(user_msg)
+        result = execute_ai_action(action_data)
+        chat_store.append(current_user.id, conversation_id, "assistant", result)
+        return Response(action_events(result), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+    # Ograničenje broja istovremenih streamova čuva dretve za dashboard i bilježenje
+    acquired, release = acquire_stream_slot()
+    if not acquired:
+        return jsonify({"error": "Previše istovremenih razgovora, pokušajte ponovno."}), 503
+    try:
+        conversation_id = _append_user_message(user_msg)
+        messages = [_smart_input_system_prompt()] + chat_store.context(current_user.id, conversation_id)
+    except Exception:
+        release()
+        raise
+
+    events = stream_chat(llm, messages, current_user.id, conversation_id, execute_ai_action,
+                         SMART_INPUT_CACHE_SCOPE)
+    response = Response(stream_with_context(events), mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    # Poziva se i kad preglednik prekine vezu prije kraja odgovora
+    response.call_on_close(release)
+    return response
 
 
 @main_bp.route("/clear_smart_chat", methods=["POST"])
 @login_required
 def clear_smart_chat():
     session.pop('chat_history', None)
+    session.pop('chat_conversation_id', None)
     flash("Razgovor je poništen. Možete započeti novi.", "info")
     return redirect(url_for('main.smart_input'))
 
 
+@main_bp.route("/health/models")
+def models_health():
+    # Status učitavanja artefakata (vrijeme, memorija, greška); 503 dok svi nisu učitani
+    status = registry.status()
+    return jsonify(status), 200 if status['ready'] else 503
+
+
+def internal_endpoint(view):
+    """Interni brojači: uz METRICS_TOKEN traži 'Authorization: Bearer <token>', inače prijavljenog korisnika."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        token = current_app.config.get('METRICS_TOKEN')
+        if not token:
+            return login_required(view)(*args, **kwargs)
+        if not hmac.compare_digest(request.headers.get('Authorization', '').encode(), f'Bearer {token}'.encode()):
+            return Response("Unauthorized\n", 401, {'WWW-Authenticate': 'Bearer'}, mimetype="text/plain")
+        return view(*args, **kwargs)
+    return wrapper
+
+
+@main_bp.route("/health/llm")
+@internal_endpoint
+def llm_health():
+    # Metrike AI chata: pogoci predmemorije odgovora i latencija poziva prema modelu
+    llm = get_llm()
+    if not llm:
+        return jsonify({"provider": None}), 503
+    return jsonify(llm.metrics())
+
+
+@main_bp.route("/metrics")
+@internal_endpoint
+def request_metrics():
+    # Histogrami trajanja zahtjeva po ruti i dijelova zahtjeva, u Prometheus tekstualnom formatu
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
 @main_bp.route("/reports/weekly")
 @login_required
 def weekly_report():
@@ -318,7 +429,8 @@ def demographic_insights():
 @login_required
 def log_workout():
     try:
-        workout = WorkoutLog(
+        get_log_writer().log(
+            WorkoutLog,
             user_id=current_user.id,
             exercise=request.form.get('exercise'),
             sets=int(request.form.get('sets', 0)),
@@ -326,11 +438,8 @@ def log_workout():
             weight=float(request.form.get('weight')) if request.form.get('weight') else None,
             feeling=request.form.get('feeling', 'good')
         )
-        db.session.add(workout)
-        db.session.commit()
         flash('✅ Trening je uspješno zabilježen!', 'success')
     except Exception as e:
-        db.session.rollback()
         flash(f'❌ Greška pri bilježenju treninga: {e}', 'danger')
     return redirect(url_for('main.dashboard'))
 
@@ -339,16 +448,14 @@ def log_workout():
 @login_required
 def log_meal():
     try:
-        meal = MealLog(
+        get_log_writer().log(
+            MealLog,
             user_id=current_user.id,
             food=request.form.get('food'),
             quantity=int(request.form.get('quantity', 1)),
             calories=float(request.form.get('calories', 0))
         )
-        db.session.add(meal)
-        db.session.commit()
         flash('✅ Obrok je uspješno zabilježen!', 'success')
     except Exception as e:
-        db.session.rollback()
         flash(f'❌ Greška pri bilježenju obroka: {e}', 'danger')
     return redirect(url_for('main.dashboard'))
\ No newline at end of file
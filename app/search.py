@@ -0,0 +1,71 @@
+# app/search.py
+from collections import Counter, defaultdict
+from thefuzz import process, utils
+from app import db
+from app.cache import VersionedCache
+from app.models import Exercise, FoodItem
+
+
+def _trigrams(text):
+    """Skup trigrama po riječima (s razmacima na rubovima, da i kratke riječi imaju trigram)."""
+    grams = set()
+    for token in text.split():
+        padded = f"  {token} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class NameIndex:
+    """
+    Indeks naziva za fuzzy pretragu. Trigrami suzuju izbor na najviše `max_candidates`
+    naziva, a tek se ti boduju s thefuzz (isti scorer kao process.extractOne nad cijelom listom).
+    """
+
+    def __init__(self, rows, max_candidates=50):
+        self.max_candidates = max_candidates
+        self._ids = []
+        self._names = []
+        self._postings = defaultdict(list)  # trigram -> pozicije naziva
+        for row_id, name in rows:
+            if not name:
+                continue
+            position = len(self._names)
+            self._ids.append(row_id)
+            self._names.append(name)
+            for gram in _trigrams(utils.full_process(name)):
+                self._postings[gram].append(position)
+
+    def __len__(self):
+        return len(self._names)
+
+    def best_match(self, query):
+        """Vrati (id, naziv, rezultat) najboljeg pogotka ili None ako nema naziva."""
+        if not self._names or not query:
+            return None
+        hits = Counter()
+        for gram in _trigrams(utils.full_process(query)):
+            for position in self._postings.get(gram, ()):
+                hits[position] += 1
+        if hits:
+            positions = [position for position, _ in hits.most_common(self.max_candidates)]
+        else:
+            # Nema zajedničkog trigrama (npr. upit od samih ne-ASCII znakova) - bodujemo sve
+            positions = range(len(self._names))
+        match = process.extractOne(query, {position: self._names[position] for position in positions})
+        if not match:
+            return None
+        name, score, position = match
+        return self._ids[position], name, score
+
+
+_indexes = VersionedCache()
+
+
+def food_index():
+    """Indeks naziva namirnica, ponovno izgrađen kad a_11_populate_usda_db.py promijeni tablicu."""
+    return _indexes.get('food_item', lambda: NameIndex(db.session.query(FoodItem.id, FoodItem.name)))
+
+
+def exercise_index():
+    """Indeks naziva vježbi, ponovno izgrađen kad 05_populate_exercises_db.py promijeni tablicu."""
+    return _indexes.get('exercise', lambda: NameIndex(db.session.query(Exercise.id, Exercise.exercise_name)))
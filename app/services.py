@@ -1,142 +1,210 @@
 # app/services.py
 import os
+import json
 import random
 import urllib.parse
 import joblib
-import pandas as pd
+import numpy as np
 from datetime import datetime, timedelta, date
-from app.models import Exercise, MealLog, MoodLog, WaterLog, WorkoutLog, User
+from app.models import Exercise, MealLog, WorkoutLog, DailyRollup, ProgressReport
 from config import Config
 from app import db
+from app.cache import VersionedCache
+from app.recipes import RecipeStore
+from app.model_registry import ModelRegistry
 from sqlalchemy import func
-
-
+from emotion_service import EMOTION_MAP, emotion_service
+from app.log_writer import wait_for_user_writes
+from app.tracing import span, traced
+
+
+# Dopuštena oprema po profilu korisnika (None = teretana, sve vježbe)
+EQUIPMENT_PROFILES = {
+    'gym': None,
+    'home_dumbbells': ['Body-Only', 'Body Only', 'Dumbbells'],
+    'body_only': ['Body-Only', 'Body Only'],
+}
+MOVEMENT_PATTERNS = {
+    'push': ['Chest', 'Shoulders', 'Triceps'],
+    'pull': ['Back', 'Biceps', 'Lats'],
+    'legs': ['Legs', 'Calves', 'Glutes', 'Hamstrings', 'Quads'],
+}
+
+_exercise_pools = VersionedCache()
+
+
+def _youtube_link(exercise_name):
+    query = urllib.parse.quote(f"{exercise_name} exercise tutorial")
+    return f"https://www.youtube.com/results?search_query={query}"
+
+
+def equipment_profiles(equipment_needed):
+    """Profili opreme u koje ulazi vježba s danom opremom (podniz, kao u izvornom filtru)."""
+    return [profile for profile, allowed_equipment in EQUIPMENT_PROFILES.items()
+            if allowed_equipment is None or any(allowed in (equipment_needed or '') for allowed in allowed_equipment)]
+
+
+def _build_exercise_pools(profile):
+    """Filtrira vježbe za profil opreme i dijeli ih po obrascu pokreta; linkovi se računaju ovdje, jednom."""
+    pools = {pattern: [] for pattern in MOVEMENT_PATTERNS}
+    count = 0
+    rows = db.session.query(Exercise.exercise_name, Exercise.body_part_targeted, Exercise.equipment_needed)
+    for name, body_part, equipment in rows:
+        if profile not in equipment_profiles(equipment):
+            continue
+        count += 1
+        for pattern, body_parts in MOVEMENT_PATTERNS.items():
+            if body_part in body_parts:
+                pools[pattern].append((name, _youtube_link(name)))
+    pools = {pattern: tuple(entries) for pattern, entries in pools.items()}
+    pools['upper'] = pools['push'] + pools['pull']
+    pools['count'] = count
+    return pools
+
+
+def get_exercise_pools(user):
+    """
+    Bazeni vježbi za opremu korisnika. Svaki profil ima vlastitu DataVersion ('exercise:<profil>'),
+    pa 05_populate_exercises_db.py u upsert načinu poništava samo profile čije je vježbe promijenio.
+    """
+    profile = user.equipment if user.equipment in EQUIPMENT_PROFILES else 'body_only'
+    return _exercise_pools.get(f'exercise:{profile}', lambda: _build_exercise_pools(profile))
+
+
+@traced('recommendation')
 def generate_workout_plan(user):
-    all_exercises = Exercise.query.all()
-    final_exercise_pool = []
-    if user.equipment == 'gym':
-        final_exercise_pool = all_exercises
-    else:
-        allowed_equipment = ['Body-Only', 'Body Only']
-        if user.equipment == 'home_dumbbells':
-            allowed_equipment.append('Dumbbells')
-        for ex in all_exercises:
-            if any(allowed in ex.equipment_needed for allowed in allowed_equipment):
-                final_exercise_pool.append(ex)
-
-    if not final_exercise_pool:
+    pools = get_exercise_pools(user)
+    if not pools['count']:
         return {"Greška": "Nije pronađeno dovoljno vježbi."}
 
-    push_pool = [ex for ex in final_exercise_pool if ex.body_part_targeted in ['Chest', 'Shoulders', 'Triceps']]
-    pull_pool = [ex for ex in final_exercise_pool if ex.body_part_targeted in ['Back', 'Biceps', 'Lats']]
-    legs_pool = [ex for ex in final_exercise_pool if
-                 ex.body_part_targeted in ['Legs', 'Calves', 'Glutes', 'Hamstrings', 'Quads']]
+    def safe_sample(pattern, k):
+        pool = pools[pattern]
+        return [{"name": name, "link": link} for name, link in random.sample(pool, min(len(pool), k))]
 
-    def safe_sample(pool, k):
-        return random.sample(pool, min(len(pool), k))
-
-    workout_plan = {}
     if user.goal == 'muscle_gain':
-        workout_plan = {
-            "Ponedjeljak (Push)": safe_sample(push_pool, 5), "Utorak (Pull)": safe_sample(pull_pool, 5),
-            "Srijeda": ["Odmor"], "Četvrtak (Legs)": safe_sample(legs_pool, 5),
-            "Petak (Gornji dio)": safe_sample(push_pool + pull_pool, 5), "Subota": ["Odmor"], "Nedjelja": ["Odmor"]
-        }
-    else:
-        full_body = safe_sample(push_pool, 2) + safe_sample(pull_pool, 2) + safe_sample(legs_pool, 2)
-        workout_plan = {
-            "Dan 1": full_body, "Dan 2": ["Odmor"], "Dan 3": full_body, "Dan 4": ["Odmor"],
-            "Dan 5": full_body, "Dan 6": ["Odmor"], "Dan 7": ["Odmor"]
+        return {
+            "Ponedjeljak (Push)": safe_sample('push', 5), "Utorak (Pull)": safe_sample('pull', 5),
+            "Srijeda": ["Odmor"], "Četvrtak (Legs)": safe_sample('legs', 5),
+            "Petak (Gornji dio)": safe_sample('upper', 5), "Subota": ["Odmor"], "Nedjelja": ["Odmor"]
         }
-
-    final_plan = {}
-    for day, exercises in workout_plan.items():
-        if exercises and isinstance(exercises[0], Exercise):
-            exercise_list = []
-            for ex in exercises:
-                query = urllib.parse.quote(f"{ex.exercise_name} exercise tutorial")
-                link = f"https://www.youtube.com/results?search_query={query}"
-                exercise_list.append({"name": ex.exercise_name, "link": link})
-            final_plan[day] = exercise_list
-        else:
-            final_plan[day] = exercises
-    return final_plan
+    full_body = safe_sample('push', 2) + safe_sample('pull', 2) + safe_sample('legs', 2)
+    return {
+        "Dan 1": full_body, "Dan 2": ["Odmor"], "Dan 3": full_body, "Dan 4": ["Odmor"],
+        "Dan 5": full_body, "Dan 6": ["Odmor"], "Dan 7": ["Odmor"]
+    }
 
 
 # --- SERVIS ZA PREPORUKE OBROKA ---
-try:
-    agent_gain = joblib.load(os.path.join(Config.MODELS_PATH, 'final_rl_agent_muscle_gain.joblib'))
-    agent_loss = joblib.load(os.path.join(Config.MODELS_PATH, 'final_rl_agent_weight_loss.joblib'))
-    agents = {'muscle_gain': agent_gain, 'weight_loss': agent_loss, 'maintenance': agent_loss}
-    df_recipes = pd.read_csv(os.path.join(Config.PROCESSED_DATA_PATH, 'recipes_processed.csv'))
-    df_recipes.dropna(subset=['calories', 'url'], inplace=True)
-except Exception:
-    agents = {}
-    df_recipes = pd.DataFrame()
+# Agenti i recepti učitavaju se tek pri prvoj preporuci (ili u warm_up iz create_app),
+# a ne pri importu modula - status učitavanja vidi se na /health/models.
+registry = ModelRegistry()
 
 
-def get_meal_recommendations(user, day_of_week=0, calories_consumed=0, emotion_text="neutral"):
-    if not agents or df_recipes.empty:
-        return [{"name": "Greška", "calories": 0, "link": "#", "error": "Modeli ili recepti nisu dostupni."}]
+def _load_agent(filename):
+    return lambda: joblib.load(os.path.join(Config.MODELS_PATH, filename))
 
-    agent = agents.get(user.goal)
-    if not agent:
-        return [{"name": "Greška", "calories": 0, "link": "#", "error": "Agent za vaš cilj nije pronađen."}]
 
-    goal_map = {'weight_loss': 0, 'maintenance': 1, 'muscle_gain': 2}
-    user_goal_idx = goal_map.get(user.goal, 1)
+def _load_maintenance_agent():
+    # Ako agent za održavanje nije istreniran (a_14), koristi se agent za mršavljenje kao i prije
+    path = os.path.join(Config.MODELS_PATH, 'final_rl_agent_maintenance.joblib')
+    if not os.path.exists(path):
+        path = os.path.join(Config.MODELS_PATH, 'final_rl_agent_weight_loss.joblib')
+    return joblib.load(path)
 
-    caloric_status = 0 if calories_consumed < 500 else 1 if calories_consumed < 1500 else 2
-    current_state = (day_of_week, user_goal_idx, caloric_status, 1)
 
-    agent.epsilon = 0.0
-    abstract_action = agent.choose_action(current_state)
+registry.register('agent_muscle_gain', _load_agent('final_rl_agent_muscle_gain.joblib'))
+registry.register('agent_weight_loss', _load_agent('final_rl_agent_weight_loss.joblib'))
+registry.register('agent_maintenance', _load_maintenance_agent)
+registry.register('recipes', lambda: RecipeStore.from_csv(
+    os.path.join(Config.PROCESSED_DATA_PATH, 'recipes_processed.csv')))
 
-    if abstract_action == 0:
-        candidates = df_recipes[df_recipes['calories'].between(100, 450)]
-    elif abstract_action == 1:
-        candidates = df_recipes[df_recipes['calories'].between(451, 700)]
-    else:
-        candidates = df_recipes[df_recipes['calories'] > 700]
-
-    if candidates.empty:
-        return [{"name": "Nema recepata", "calories": 0, "link": "#", "error": "Nema odgovarajućih recepata."}]
+GOAL_AGENTS = {'muscle_gain': 'agent_muscle_gain', 'weight_loss': 'agent_weight_loss',
+               'maintenance': 'agent_maintenance'}
+GOAL_MAP = {'weight_loss': 0, 'maintenance': 1, 'muscle_gain': 2}
 
-    chosen_recipes = candidates.sample(n=min(len(candidates), 3)).to_dict('records')
 
-    recommendations = []
-    for recipe in chosen_recipes:
-        recommendations.append({
-            "name": recipe.get('recipe_name'),
-            "calories": int(recipe.get('calories')),
-            "link": recipe.get('url')
-        })
-    return recommendations
+def get_meal_recommendations(user, day_of_week=0, calories_consumed=0, emotion_text="neutral"):
+    return get_meal_recommendations_batch([(user, day_of_week, calories_consumed, emotion_text)])[0]
+
+
+@traced('recommendation')
+def get_meal_recommendations_batch(requests):
+    """
+    Preporuke za više korisnika/stanja odjednom. `requests` je lista n-torki
+    (user, day_of_week, calories_consumed, emotion_text); vraća listu preporuka istim redom.
+    Akcije agenta računaju se jednim indeksiranjem Q-tablice po cilju. Emocije svih tekstova
+    analiziraju se zajedno (emotion_service); tekst koji nije u predmemoriji klasificira se u
+    pozadini, a zahtjev na rezultat čeka najviše EMOTION_WAIT_MS. Ako ne stigne (npr. modeli se
+    još učitavaju), tekst se računa kao neutralan i preporuka dobije 'provisional_emotion': True.
+    """
+    recipe_store = registry.get('recipes')
+    if not recipe_store:
+        return [[{"name": "Greška", "calories": 0, "link": "#", "error": "Modeli ili recepti nisu dostupni."}]
+                for _ in requests]
+
+    results = [None] * len(requests)
+    agents = {}
+    by_goal = {}
+    with span('emotion'):
+        analyzed = emotion_service.analyze([request[3] for request in requests], wait=Config.EMOTION_WAIT_MS / 1000)
+    emotions = [EMOTION_MAP.get(result['label'], 1) for result in analyzed]
+    for i, (user, day_of_week, calories_consumed, _emotion_text) in enumerate(requests):
+        if user.goal not in agents and user.goal in GOAL_AGENTS:
+            agents[user.goal] = registry.get(GOAL_AGENTS[user.goal])
+        if agents.get(user.goal) is None:
+            results[i] = [{"name": "Greška", "calories": 0, "link": "#", "error": "Agent za vaš cilj nije pronađen."}]
+            continue
+        by_goal.setdefault(user.goal, []).append((i, day_of_week, calories_consumed, emotions[i]))
+
+    for goal, items in by_goal.items():
+        positions, days, calories, emotion_idx = zip(*items)
+        calories = np.asarray(calories, dtype=np.float64)
+        caloric_status = np.where(calories < 500, 0, np.where(calories < 1500, 1, 2))
+        # Stanje: (dan u tjednu, cilj, kalorijski status, emocija) - greedy akcija agenta (epsilon = 0)
+        q_values = agents[goal].q_table[np.asarray(days), GOAL_MAP.get(goal, 1), caloric_status,
+                                        np.asarray(emotion_idx)]
+        for i, abstract_action in zip(positions, q_values.argmax(axis=-1)):
+            recommendations = recipe_store.sample(int(abstract_action), 3)
+            if analyzed[i]['provisional']:
+                for recommendation in recommendations:
+                    recommendation['provisional_emotion'] = True
+            results[i] = recommendations or [
+                {"name": "Nema recepata", "calories": 0, "link": "#", "error": "Nema odgovarajućih recepata."}]
+    return results
 
 
 # --- SERVIS ZA TJEDNI IZVJEŠTAJ ---
 def generate_weekly_report(user_id):
-    """Generira podatke za tjedni izvještaj za određenog korisnika."""
+    """
+    Generira podatke za tjedni izvještaj (zadnjih 7 dana) za određenog korisnika.
+    Čita dnevne zbrojeve iz DailyRollup, a gotov izvještaj sprema u ProgressReport; spremljena
+    kopija vrijedi do prvog novog unosa tog dana (briše je slušač u app/models.py).
+    """
     end_date = datetime.utcnow().date()
-    start_date = end_date - timedelta(days=7)
+    start_date = end_date - timedelta(days=6)
+    wait_for_user_writes(user_id)  # novi logovi brišu spremljenu kopiju tek kad su spremljeni
+
+    cached = ProgressReport.query.filter_by(user_id=user_id, report_type='weekly', generated_date=end_date) \
+        .order_by(ProgressReport.created_at.desc()).first()
+    if cached:
+        return cached.data, json.loads(cached.insights)
 
-    workout_logs = WorkoutLog.query.filter(WorkoutLog.user_id == user_id, WorkoutLog.date >= start_date).all()
-    meal_logs = MealLog.query.filter(MealLog.user_id == user_id, MealLog.date >= start_date).all()
-    mood_logs = MoodLog.query.filter(MoodLog.user_id == user_id, MoodLog.date >= start_date).all()
-    water_logs = WaterLog.query.filter(WaterLog.user_id == user_id, WaterLog.date >= start_date).all()
+    days = DailyRollup.query.filter(DailyRollup.user_id == user_id,
+                                    DailyRollup.date.between(start_date, end_date)) \
+        .order_by(DailyRollup.date).all()
 
-    workout_count = len(workout_logs)
-    total_calories = sum(log.calories for log in meal_logs if log.calories)
-    avg_daily_calories = round(total_calories / 7, 1) if meal_logs else 0
-    total_water = sum(log.amount_ml for log in water_logs if log.amount_ml)
-    avg_daily_water = round(total_water / 7, 1) if water_logs else 0
+    workout_count = sum(day.workout_count for day in days)
+    total_calories = sum(day.calories for day in days)
+    avg_daily_calories = round(total_calories / 7, 1) if total_calories else 0
+    total_water = sum(day.water_ml for day in days)
+    avg_daily_water = round(total_water / 7, 1) if total_water else 0
 
-    mood_scores = {'excellent': 5, 'good': 4, 'okay': 3, 'bad': 2, 'terrible': 1}
     avg_mood_score = 3
     best_mood_day = None
-    if mood_logs:
-        avg_mood_score = sum(mood_scores.get(log.mood, 3) for log in mood_logs) / len(mood_logs)
-        best_mood_day = max(mood_logs, key=lambda x: mood_scores.get(x.mood, 3)).date.isoformat()
+    mood_count = sum(day.mood_count for day in days)
+    if mood_count:
+        avg_mood_score = sum(day.mood_score_sum for day in days) / mood_count
+        best_mood_day = max(days, key=lambda day: day.best_mood_score).date.isoformat()
 
     insights = []
     if workout_count >= 4:
@@ -157,6 +225,9 @@ def generate_weekly_report(user_id):
         'best_mood_day': best_mood_day,
         'period': f"{start_date.isoformat()} do {end_date.isoformat()}"
     }
+    db.session.add(ProgressReport(user_id=user_id, report_type='weekly', generated_date=end_date,
+                                  data=report_data, insights=json.dumps(insights, ensure_ascii=False)))
+    db.session.commit()
     return report_data, insights
 
 
@@ -178,20 +249,36 @@ def get_demographic_insights(user):
 
 
 # --- NOVA FUNKCIJA ZA DNEVNI SAŽETAK ---
+# Jedinica količine obroka -> grama (ml) po jedinici; kalorije namirnica (USDA) su na 100 g
+GRAMS_PER_UNIT = {'g': 1, 'gr': 1, 'grama': 1, 'kg': 1000, 'ml': 1, 'dl': 100, 'l': 1000}
+
+
+def meal_calories(calories_per_100g, quantity, unit=None):
+    """Kalorije obroka: za g/ml/kg/l preračun s 100 g, inače je količina broj komada/porcija."""
+    grams_per_unit = GRAMS_PER_UNIT.get((unit or '').lower())
+    if grams_per_unit is None:
+        return calories_per_100g * quantity
+    return calories_per_100g * quantity * grams_per_unit / 100
+
+
 def get_daily_summary(user_id):
     """Dohvaća i formatira sažetak unosa za današnji dan za određenog korisnika."""
     today = date.today()
+    tomorrow = today + timedelta(days=1)
+    wait_for_user_writes(user_id)  # logovi iz reda za grupni upis moraju biti vidljivi u sažetku
 
-    # Zbroji kalorije za danas
+    # Raspon [danas, sutra) umjesto func.date(...) kako bi upit mogao koristiti indeks (user_id, date)
     total_calories = db.session.query(func.sum(MealLog.calories)).filter(
         MealLog.user_id == user_id,
-        func.date(MealLog.date) == today
+        MealLog.date >= today,
+        MealLog.date < tomorrow
     ).scalar() or 0
 
     # Prebroji treninge za danas
     workout_count = WorkoutLog.query.filter(
         WorkoutLog.user_id == user_id,
-        func.date(WorkoutLog.date) == today
+        WorkoutLog.date >= today,
+        WorkoutLog.date < tomorrow
     ).count()
 
     summary_text = f"\n\n---\n**📊 Današnji pregled:**\n- Ukupno uneseno: **{int(total_calories)} kcal**\n- Odrađeno treninga: **{workout_count}**"
@@ -0,0 +1,181 @@
+# app/tracing.py
+"""
+Mjerenje trajanja zahtjeva i njihovih dijelova, bez vanjskog servisa.
+
+Svaki zahtjev mjeri se u cjelini (po ruti), a unutar njega imenovani dijelovi (span):
+SQL upiti (slušač na engineu), renderiranje predložaka (Flask signali) te pozivi
+označeni sa `span(...)` ili `@traced(...)` - jezični model, fuzzy pretraga, preporuke.
+Trajanja se skupljaju u histograme po ruti i po dijelu; /metrics ih vraća u
+Prometheus tekstualnom formatu. Uz SLOW_REQUEST_MS sporiji zahtjevi ispisuju se
+s raspodjelom vremena po dijelovima. Streamani odgovori (npr. /smart_input/stream) mjere
+se do zatvaranja odgovora, a ne do slanja zaglavlja.
+"""
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import before_render_template, current_app, g, has_request_context, request, template_rendered
+from sqlalchemy import event
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Kumulativni histogram trajanja (sekunde) s Prometheus granicama BUCKETS."""
+    __slots__ = ('counts', 'count', 'total')
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.counts[i] += 1
+
+
+class Metrics:
+    """Histogrami po ruti (cijeli zahtjev) i po (ruta, dio)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = {}  # (ruta, metoda, status) -> Histogram
+        self.spans = {}  # (ruta, dio) -> Histogram
+
+    def observe_request(self, route, method, status, seconds):
+        with self._lock:
+            self.requests.setdefault((route, method, str(status)), Histogram()).observe(seconds)
+
+    def observe_span(self, route, name, seconds):
+        with self._lock:
+            self.spans.setdefault((route, name), Histogram()).observe(seconds)
+
+    @staticmethod
+    def _histogram_lines(metric, labels, histogram):
+        label_text = ','.join(f'{key}="{value}"' for key, value in labels)
+        lines = [f'{metric}_bucket{{{label_text},le="{bound}"}} {count}'
+                 for bound, count in zip(BUCKETS, histogram.counts)]
+        lines.append(f'{metric}_bucket{{{label_text},le="+Inf"}} {histogram.count}')
+        lines.append(f'{metric}_sum{{{label_text}}} {histogram.total:.6f}')
+        lines.append(f'{metric}_count{{{label_text}}} {histogram.count}')
+        return lines
+
+    def render(self):
+        """Sve metrike u Prometheus tekstualnom formatu."""
+        with self._lock:
+            requests = sorted(self.requests.items())
+            spans = sorted(self.spans.items())
+        lines = ['# HELP http_request_duration_seconds Trajanje HTTP zahtjeva po ruti.',
+                 '# TYPE http_request_duration_seconds histogram']
+        for (route, method, status), histogram in requests:
+            lines += self._histogram_lines('http_request_duration_seconds',
+                                           [('route', route), ('method', method), ('status', status)], histogram)
+        lines += ['# HELP request_span_duration_seconds Trajanje dijelova zahtjeva (SQL, model, renderiranje...).',
+                  '# TYPE request_span_duration_seconds histogram']
+        for (route, name), histogram in spans:
+            lines += self._histogram_lines('request_span_duration_seconds', [('route', route), ('span', name)], histogram)
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+
+
+def _route():
+    if not has_request_context():
+        return 'background'
+    return request.endpoint or 'unknown'
+
+
+def record_span(name, seconds):
+    """Zabilježi trajanje dijela; unutar zahtjeva zbraja se i u raspodjelu tog zahtjeva."""
+    metrics.observe_span(_route(), name, seconds)
+    if has_request_context() and 'trace_spans' in g:
+        totals = g.trace_spans
+        count, total = totals.get(name, (0, 0.0))
+        totals[name] = (count + 1, total + seconds)
+
+
+@contextmanager
+def span(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, time.perf_counter() - started)
+
+
+def traced(name):
+    """Dekorator: cijeli poziv funkcije je dio `name`."""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _start_request():
+    g.trace_started = time.perf_counter()
+    g.trace_spans = {}
+
+
+def _observe_request(route, method, path, status, started, spans, slow_ms):
+    seconds = time.perf_counter() - started
+    metrics.observe_request(route, method, status, seconds)
+    if slow_ms is not None and seconds * 1000 >= slow_ms:
+        breakdown = ', '.join(f"{name} {total * 1000:.1f} ms ({count}x)"
+                              for name, (count, total) in sorted(spans.items(), key=lambda item: -item[1][1]))
+        print(f"🐢 Spor zahtjev {method} {path} ({route}): {seconds * 1000:.1f} ms"
+              f"{' - ' + breakdown if breakdown else ''}")
+
+
+def _finish_request(response):
+    started = g.pop('trace_started', None)
+    if started is None:
+        return response
+    observation = (_route(), request.method, request.path, response.status_code, started, g.trace_spans,
+                   current_app.config.get('SLOW_REQUEST_MS'))
+    if response.is_streamed:
+        # Tijelo se generira tek nakon after_request; dijelovi (npr. llm) dodaju se u isti g.trace_spans
+        response.call_on_close(lambda: _observe_request(*observation))
+    else:
+        _observe_request(*observation)
+    return response
+
+
+def init_tracing(app):
+    """Uključi mjerenje za aplikaciju: zahtjevi, SQL upiti i renderiranje predložaka."""
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('trace_query_started', []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        record_span('sql', time.perf_counter() - conn.info['trace_query_started'].pop())
+
+    def handle_error(exception_context):
+        started = exception_context.connection.info.get('trace_query_started') if exception_context.connection else None
+        if started:
+            record_span('sql', time.perf_counter() - started.pop())
+
+    from app import db
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        event.listen(db.engine, 'after_cursor_execute', after_cursor_execute)
+        event.listen(db.engine, 'handle_error', handle_error)
+
+    def before_render(sender, template, context, **extra):
+        g.setdefault('trace_render_started', []).append(time.perf_counter())
+
+    def after_render(sender, template, context, **extra):
+        if g.get('trace_render_started'):
+            record_span('render', time.perf_counter() - g.trace_render_started.pop())
+
+    before_render_template.connect(before_render, app, weak=False)
+    template_rendered.connect(after_render, app, weak=False)
@@ -0,0 +1,121 @@
+# app/user_profiles.py
+"""
+Lagani profil prijavljenog korisnika za Flask-Login (current_user).
+
+load_user se poziva na svakom zahtjevu prijavljenog korisnika; umjesto cijelog ORM objekta
+User (s medical_history i ostalim stupcima) vraća UserProfile sa samo onim poljima koja
+čitaju rute, servisi i predlošci. Profili se pamte u LRU predmemoriji s rokom trajanja
+(USER_PROFILE_CACHE_SIZE, USER_PROFILE_TTL_SECONDS), a izmjena ili brisanje korisnika kroz
+ORM briše njegov profil (slušači u app/models.py). TTL pokriva izmjene mimo ORM-a i iz
+drugih procesa.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, has_app_context
+
+PROFILE_FIELDS = ('id', 'username', 'age', 'gender', 'height', 'weight', 'goal', 'fitness_level', 'equipment')
+
+
+class UserProfile:
+    """Samo za čitanje: polja iz PROFILE_FIELDS i sučelje koje Flask-Login očekuje od korisnika."""
+    __slots__ = PROFILE_FIELDS
+
+    def __init__(self, **values):
+        for field in PROFILE_FIELDS:
+            object.__setattr__(self, field, values.get(field))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("UserProfile je samo za čitanje; izmjene idu preko modela User.")
+
+    @property
+    def is_authenticated(self):
+        return True
+
+    @property
+    def is_active(self):
+        return True
+
+    @property
+    def is_anonymous(self):
+        return False
+
+    def get_id(self):
+        return str(self.id)
+
+    def __eq__(self, other):
+        return getattr(other, 'get_id', None) is not None and self.get_id() == other.get_id()
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __repr__(self):
+        return f'<UserProfile {self.id} {self.username}>'
+
+
+class ProfileCache:
+    """LRU predmemorija profila s rokom trajanja (TTL) po unosu; ključ je id korisnika."""
+
+    def __init__(self, max_entries=1024, ttl_seconds=60):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # id -> (vrijeme isteka, UserProfile)
+        self._generations = {}  # id -> broj invalidacija; profil učitan prije invalidacije se ne sprema
+        self._epoch = 0  # raste s clear()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id, loader):
+        """
+        Profil iz predmemorije ili loader(user_id); None (nepostojeći korisnik) se ne pamti.
+        Učitavanje ide bez zaključavanja, pa ako se profil u međuvremenu invalidira (izmjena
+        ili brisanje korisnika), učitani profil vrijedi samo za ovaj zahtjev i ne sprema se.
+        """
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] >= time.monotonic():
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = (self._epoch, self._generations.get(user_id, 0))
+        profile = loader(user_id)
+        if profile is not None:
+            with self._lock:
+                if (self._epoch, self._generations.get(user_id, 0)) != generation:
+                    return profile
+                self._entries[user_id] = (time.monotonic() + self.ttl_seconds, profile)
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return profile
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+            # Brojač raste trajno (jedan int po izmijenjenom korisniku), da usporedba u get() bude točna
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._epoch += 1
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+def init_user_profiles(app):
+    app.extensions['user_profiles'] = ProfileCache(app.config.get('USER_PROFILE_CACHE_SIZE', 1024),
+                                                   app.config.get('USER_PROFILE_TTL_SECONDS', 60))
+
+
+def invalidate_user_profile(user_id):
+    """Obriši profil korisnika iz predmemorije trenutne aplikacije (ako postoji)."""
+    if has_app_context():
+        cache = current_app.extensions.get('user_profiles')
+        if cache is not None:
+            cache.invalidate(user_id)
@@ -0,0 +1,103 @@
+# benchmarks/bench_fitness_patterns.py
+"""
+Mikro-benchmark prepoznavanja vježbi/namirnica/vode u dugim porukama: stari način
+(~35 regexa s `.*?` prefiksom, prevedenih pri svakom pozivu) prema fitness_patterns.extract
+(jedan unaprijed preveden regex, jedan prolaz).
+
+Pokretanje iz root-a projekta:  python benchmarks/bench_fitness_patterns.py [--messages 200]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from fitness_patterns import extract
+
+# Stari izrazi iz AIVirtualTrainer._extract_fitness_data, za usporedbu
+LEGACY_VERBS = r'(?:jeo|pojeo|doručkovao|ručao|večerao)'
+LEGACY_EXERCISES = {
+    r'(?:napravio|radio|trenirao).*?(?:čučanj|squat).*?(?:(\d+)[x×](\d+))?.*?(?:(\d+)\s*kg)?': 'Squat',
+    r'(?:napravio|radio|trenirao).*?(?:mrtvo\s*dizanje|deadlift).*?(?:(\d+)[x×](\d+))?.*?(?:(\d+)\s*kg)?': 'Deadlift',
+    r'(?:napravio|radio|trenirao).*?(?:bench\s*press|potisak).*?(?:(\d+)[x×](\d+))?.*?(?:(\d+)\s*kg)?': 'Bench Press',
+    r'(?:napravio|radio|trenirao).*?(?:zgib|pull.*?up).*?(?:(\d+)[x×](\d+))?': 'Pull-ups',
+    r'(?:napravio|radio|trenirao).*?(?:sklekovi|push.*?up).*?(?:(\d+)[x×](\d+))?': 'Push-ups',
+    r'(?:napravio|radio|trenirao).*?(?:iskorak|lunge).*?(?:(\d+)[x×](\d+))?.*?(?:(\d+)\s*kg)?': 'Lunges',
+    r'(?:napravio|radio|trenirao).*?(?:plank).*?(?:(\d+)\s*(?:min|minuta))?': 'Plank',
+    r'(?:trčao|trčanje|cardio).*?(?:(\d+)\s*(?:min|minuta|km))?': 'Cardio',
+    r'(?:bicikl|cycling).*?(?:(\d+)\s*(?:min|minuta|km))?': 'Cycling',
+    r'(?:plivanje|swimming).*?(?:(\d+)\s*(?:min|minuta))?': 'Swimming',
+}
+LEGACY_FOODS = ['jaja|jaje', 'piletina|piletinu', 'riba|ribu', 'govedina|govedinu', 'svinjina|svinjetina', 'tuna|tunu',
+                'riža|rižu', 'krumpir', 'tjestenina|pašta', 'kruh', 'zobene|ovsene|pahuljice', 'salata|salatu',
+                'rajčica|rajčice', 'krastavac', 'brokula|brokuli', 'špinat', 'banana|bananu', 'jabuka|jabuku',
+                'naranča|narandžu', 'avokado', 'jogurt', 'sir', 'mlijeko', 'orah|orahi', 'badem|bademi']
+LEGACY_WATER = [r'(?:popio|pio|pila).*?(\d+)\s*(?:litara|litre|l)\s*vode', r'(\d+)\s*(?:litara|litre|l)\s*vode',
+                r'(?:popio|pio|pila).*?(\d+)\s*(?:čaša|čaše|čašu)\s*vode', r'(\d+)\s*(?:ml|mililitra)\s*vode']
+
+
+def legacy_extract(text):
+    text_lower = text.lower()
+    exercises, foods = [], []
+    for pattern, name in LEGACY_EXERCISES.items():
+        for match in re.finditer(pattern, text_lower):
+            exercises.append((name, match.groups()))
+    for forms in LEGACY_FOODS:
+        if re.search(rf'{LEGACY_VERBS}.*?(?:{forms})', text_lower):
+            foods.append(forms)
+    water = next((m.group(1) for p in LEGACY_WATER for m in [re.search(p, text_lower)] if m), None)
+    return exercises, foods, water
+
+
+SENTENCES = [
+    "Danas sam radio čučanj 3x10 100kg i bench press 4x8 80kg.",
+    "Za doručak sam jeo zobene pahuljice s bananom, a za ručak piletinu i rižu.",
+    "Popio sam 2 litre vode tijekom dana.",
+    "Trening je bio naporan, ali osjećam se super i motivirano.",
+    "Sutra planiram trčanje 30 min i možda malo plivanja.",
+    "Nisam siguran jesam li dovoljno spavao, ukupno možda šest sati.",
+    "Navečer sam pojeo jogurt i nekoliko oraha uz film.",
+    "Koljeno me malo boli nakon iskoraka pa ću pripaziti sljedeći put.",
+]
+
+
+def build_corpus(messages, seed=0):
+    """Duge poruke (20-60 rečenica) slučajno složene iz SENTENCES."""
+    rng = random.Random(seed)
+    return [' '.join(rng.choice(SENTENCES) for _ in range(rng.randint(20, 60))) for _ in range(messages)]
+
+
+def measure(fn, corpus, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for text in corpus:
+            fn(text)
+        best = min(best, time.perf_counter() - started)
+    return best / len(corpus)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark prepoznavanja fitness podataka u dugim porukama.")
+    parser.add_argument('--messages', type=int, default=200)
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.messages)
+    average_chars = sum(map(len, corpus)) / len(corpus)
+    print(f"--- {len(corpus)} poruka, prosječno {average_chars:,.0f} znakova ---")
+
+    legacy = measure(legacy_extract, corpus)
+    single_pass = measure(extract, corpus)
+    print(f"Stari regexi:       {legacy * 1e6:10.1f} µs/poruka")
+    print(f"fitness_patterns:   {single_pass * 1e6:10.1f} µs/poruka  ({legacy / single_pass:.1f}x brže)")
+
+    # Najgori slučajevi za stare izraze: `.*?` nakon okidača prolazi do kraja poruke za svaki okidač
+    for label, text in (("jedan okidač", "napravio " + "bla " * 2500),
+                        ("okidač u svakoj rečenici", "radio sam nešto drugo danas. " * 350)):
+        print(f"{label} ({len(text):,} znakova): stari {measure(legacy_extract, [text], 1) * 1e3:.1f} ms, "
+              f"novi {measure(extract, [text], 1) * 1e3:.2f} ms")
@@ -0,0 +1,144 @@
+# benchmarks/bench_sqlite_writes.py
+"""
+Propusnost upisa u SQLite pod istovremenim korisnicima: zadani profil (Config, rollback
+journal) prema produkcijskom (ProductionConfig: WAL, synchronous=NORMAL, mmap, veća
+predmemorija stranica, busy_timeout i eksplicitni pool), oba s commitom po retku, te
+produkcijski profil s grupnim upisom logova (app/log_writer.py, potvrda nakon commita).
+
+Za svaki profil puni se nova privremena baza (benchmarks/fixtures.py), zatim `--writers`
+klijenata (svaki u svojoj dretvi i kao svoj korisnik) naizmjence šalje /log_meal i
+/log_workout, a `--readers` klijenata istovremeno otvara /dashboard. Ispisuju se upisi u
+sekundi, latencije upisa i čitanja (p50/p95/p99) i broj grešaka (npr. "database is locked").
+
+Pokretanje iz root-a projekta:  python benchmarks/bench_sqlite_writes.py [--writers 8] [--readers 4] [--writes 100]
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fixtures import BENCH_PASSWORD, create_bench_app, percentiles, seed_database
+
+from config import Config, ProductionConfig
+
+PROFILES = {
+    'default': {'SQLITE_PRAGMAS': Config.SQLITE_PRAGMAS, 'SQLALCHEMY_ENGINE_OPTIONS': {}, 'LOG_WRITE_BEHIND': False},
+    'production': {'SQLITE_PRAGMAS': ProductionConfig.SQLITE_PRAGMAS,
+                   'SQLALCHEMY_ENGINE_OPTIONS': ProductionConfig.SQLALCHEMY_ENGINE_OPTIONS, 'LOG_WRITE_BEHIND': False},
+    'write_behind': {'SQLITE_PRAGMAS': ProductionConfig.SQLITE_PRAGMAS,
+                     'SQLALCHEMY_ENGINE_OPTIONS': ProductionConfig.SQLALCHEMY_ENGINE_OPTIONS, 'LOG_WRITE_BEHIND': True,
+                     'LOG_WRITE_ACK': 'commit'},
+}
+
+
+def _login(app, email):
+    client = app.test_client()
+    client.post('/login', data=dict(email=email, password=BENCH_PASSWORD))
+    return client
+
+
+def _timed(samples, errors, lock, client, send):
+    """Izmjeri zahtjev; greška je i 'danger' flash poruka (rute za upis hvataju iznimke i preusmjeravaju)."""
+    started = time.perf_counter()
+    try:
+        response = send()
+        ok = response.status_code in (200, 302)
+        response.close()
+    except Exception as e:
+        print(f"❌ {e}")
+        ok = False
+    elapsed = time.perf_counter() - started
+    with client.session_transaction() as session:  # isprazni flash poruke da kolačić sesije ne raste
+        flashes = session.pop('_flashes', [])
+    ok = ok and not any(category == 'danger' for category, _ in flashes)
+    with lock:
+        samples.append(elapsed)
+        if not ok:
+            errors.append(elapsed)
+
+
+def run_profile(name, writers, readers, writes, log_rows, seed):
+    app = create_bench_app(**PROFILES[name])
+    with app.app_context():
+        from app import db
+        from app.database import sqlite_settings
+        seeded = seed_database(users=writers + readers, exercises=100, foods=500, log_rows=log_rows, seed=seed)
+        with db.engine.connect() as connection:
+            settings = sqlite_settings(connection)
+
+    clients = [_login(app, email) for _, email in seeded]
+    lock = threading.Lock()
+    write_samples, write_errors, read_samples, read_errors = [], [], [], []
+    writers_done = threading.Event()
+
+    def writer(client, worker):
+        for i in range(writes):
+            if i % 2:
+                _timed(write_samples, write_errors, lock, client, lambda: client.post('/log_workout', data={
+                    'exercise': 'Squat', 'sets': '3', 'reps': str(5 + (worker + i) % 10), 'weight': '80'}))
+            else:
+                _timed(write_samples, write_errors, lock, client, lambda: client.post('/log_meal', data={
+                    'food': 'Banana', 'quantity': '1', 'calories': str(100 + (worker * 7 + i) % 800)}))
+
+    def reader(client):
+        while not writers_done.is_set():
+            _timed(read_samples, read_errors, lock, client, lambda: client.get('/dashboard'))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=writers + readers) as pool:
+        reader_futures = [pool.submit(reader, client) for client in clients[writers:]]
+        writer_futures = [pool.submit(writer, client, worker) for worker, client in enumerate(clients[:writers])]
+        for future in writer_futures:
+            future.result()
+        duration = time.perf_counter() - started
+        writers_done.set()
+        for future in reader_futures:
+            future.result()
+
+    return {
+        'profile': name,
+        'sqlite': settings,
+        'engine_options': PROFILES[name]['SQLALCHEMY_ENGINE_OPTIONS'],
+        'log_writer': app.extensions['log_writer'].stats(),
+        'duration_seconds': round(duration, 2),
+        'writes': {'requests': len(write_samples), 'errors': len(write_errors),
+                   'throughput_rps': round(len(write_samples) / duration, 2), 'latency_ms': percentiles(write_samples)},
+        'reads': {'requests': len(read_samples), 'errors': len(read_errors),
+                  'throughput_rps': round(len(read_samples) / duration, 2), 'latency_ms': percentiles(read_samples)},
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Propusnost upisa u SQLite: zadani prema produkcijskom profilu.")
+    parser.add_argument('--profiles', nargs='+', choices=list(PROFILES), default=list(PROFILES))
+    parser.add_argument('--writers', type=int, default=8, help="istovremeni klijenti koji upisuju logove")
+    parser.add_argument('--readers', type=int, default=4, help="istovremeni klijenti koji otvaraju dashboard")
+    parser.add_argument('--writes', type=int, default=100, help="upisa po klijentu")
+    parser.add_argument('--log-rows', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="JSON datoteka (inače samo sažetak)")
+    args = parser.parse_args()
+
+    results = []
+    for profile in args.profiles:
+        result = run_profile(profile, args.writers, args.readers, args.writes, args.log_rows, args.seed)
+        results.append(result)
+        writes, reads = result['writes'], result['reads']
+        print(f"{profile:12} upisi {writes['throughput_rps']:8.1f}/s  p50 {writes['latency_ms']['p50']} ms  "
+              f"p95 {writes['latency_ms']['p95']} ms  greške {writes['errors']} | dashboard "
+              f"{reads['throughput_rps']:7.1f}/s  p95 {reads['latency_ms']['p95']} ms  greške {reads['errors']}")
+
+    if len(results) > 1:
+        baseline = results[0]
+        for result in results[1:]:
+            print(f"{result['profile']}: {result['writes']['throughput_rps'] / baseline['writes']['throughput_rps']:.2f}x "
+                  f"upisa u sekundi u odnosu na '{baseline['profile']}'")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"Rezultat spremljen u {args.output}")
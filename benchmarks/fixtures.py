@@ -0,0 +1,141 @@
+# benchmarks/fixtures.py
+"""
+Zajedničke pripreme za benchmarke: aplikacija nad privremenom SQLite bazom, sintetički
+podaci (korisnici, vježbe, USDA namirnice, mjeseci logova) iz zadanog seeda i sintetički
+RL agenti/recepti u registry-ju, tako da preporuke rade i bez datoteka iz models/ i data/.
+"""
+import os
+import random
+import sys
+import tempfile
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from werkzeug.security import generate_password_hash
+
+from config import Config
+
+BENCH_PASSWORD = 'benchmark'
+GOALS = ['weight_loss', 'maintenance', 'muscle_gain']
+EQUIPMENT = ['gym', 'home_dumbbells', 'body_only']
+MOODS = ['excellent', 'good', 'okay', 'bad', 'terrible']
+EXERCISE_NAMES = ['Squat', 'Deadlift', 'Bench Press', 'Pull-up', 'Push-up', 'Lunge', 'Shoulder Press', 'Row',
+                  'Curl', 'Dip', 'Calf Raise', 'Plank', 'Hip Thrust', 'Leg Press', 'Lat Pulldown']
+BODY_PARTS = ['Chest', 'Shoulders', 'Triceps', 'Back', 'Biceps', 'Lats', 'Legs', 'Calves', 'Glutes', 'Hamstrings',
+              'Quads', 'Abdominals']
+EQUIPMENT_NEEDED = ['Barbell', 'Dumbbells', 'Body Only', 'Body-Only', 'Cable', 'Machine']
+FOOD_WORDS = ['Chicken', 'Rice', 'Egg', 'Banana', 'Apple', 'Oats', 'Milk', 'Beef', 'Tuna', 'Potato', 'Bread',
+              'Yogurt', 'Cheese', 'Broccoli', 'Spinach', 'Almonds', 'Walnuts', 'Pasta', 'Salmon', 'Tomato']
+FOOD_STYLES = ['raw', 'cooked', 'boiled', 'roasted', 'fried', 'canned', 'dried', 'frozen', 'whole', 'skim']
+
+
+def create_bench_app(db_path=None, **overrides):
+    """Flask aplikacija nad (privremenom) SQLite bazom, s lokalnim jezičnim modelom umjesto Groq-a."""
+    db_path = db_path or os.path.join(tempfile.mkdtemp(prefix='bench_'), 'bench.db')
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{db_path}'
+        TESTING = True
+        LLM_PROVIDER = 'local'
+        WARM_UP_MODELS = False
+
+    for key, value in overrides.items():
+        setattr(BenchConfig, key, value)
+
+    from app import create_app
+    return create_app(BenchConfig)
+
+
+class SyntheticAgent:
+    """Zamjena za RL agenta: samo Q-tablica oblika (dan, cilj, kalorijski status, emocija, akcija)."""
+
+    def __init__(self, rng):
+        self.q_table = rng.random((7, 3, 3, 3, 3))
+
+
+def register_synthetic_artifacts(seed=0, recipes=3000):
+    """Sintetički agenti i recepti u registry-ju (umjesto joblib/CSV datoteka)."""
+    from app.recipes import RecipeStore
+    from app.services import GOAL_AGENTS, registry
+
+    rng = np.random.default_rng(seed)
+    for name in set(GOAL_AGENTS.values()):
+        agent = SyntheticAgent(rng)
+        registry.register(name, lambda agent=agent: agent)
+    frame = pd.DataFrame({'recipe_name': [f'Recipe {i}' for i in range(recipes)],
+                          'calories': rng.integers(100, 1200, recipes),
+                          'url': [f'https://example.com/recipe/{i}' for i in range(recipes)]})
+    registry.register('recipes', lambda: RecipeStore(frame))
+
+
+def _insert(model, rows, chunk=50000):
+    from app import db
+    for start in range(0, len(rows), chunk):
+        db.session.execute(model.__table__.insert(), rows[start:start + chunk])
+
+
+def seed_database(users=20, exercises=300, foods=5000, log_rows=20000, days=120, seed=0):
+    """
+    Napuni bazu aplikacije (unutar app contexta) sintetičkim podacima. `log_rows` je ukupan broj
+    redaka logova (treninzi, obroci, raspoloženje, voda) raspoređen na korisnike i zadnjih `days`
+    dana. Logovi se upisuju izravno (bez ORM-a), a DailyRollup se zatim izračuna iz njih.
+    Vraća listu (id, email) korisnika; lozinka svih je BENCH_PASSWORD.
+    """
+    from app import db
+    from app.models import DailyRollup, Exercise, FoodItem, MealLog, MoodLog, User, WaterLog, WorkoutLog
+
+    rng = random.Random(seed)
+    password_hash = generate_password_hash(BENCH_PASSWORD)  # jednom: hashiranje je namjerno sporo
+    _insert(User, [dict(username=f'bench{i}', email=f'bench{i}@example.com', password_hash=password_hash,
+                        age=rng.randint(18, 65), gender=rng.choice(['male', 'female']),
+                        height=rng.uniform(155, 200), weight=rng.uniform(50, 120), goal=GOALS[i % 3],
+                        fitness_level=rng.choice(['beginner', 'intermediate', 'advanced']),
+                        equipment=EQUIPMENT[i % 3]) for i in range(users)])
+    _insert(Exercise, [dict(exercise_name=f'{rng.choice(EXERCISE_NAMES)} {i}', body_part_targeted=rng.choice(BODY_PARTS),
+                            equipment_needed=rng.choice(EQUIPMENT_NEEDED), difficulty='Intermediate',
+                            link=f'https://example.com/exercise/{i}') for i in range(exercises)])
+    _insert(FoodItem, [dict(name=f'{rng.choice(FOOD_WORDS)}, {rng.choice(FOOD_STYLES)} {i}',
+                            calories=rng.uniform(20, 600), protein=rng.uniform(0, 40), fat=rng.uniform(0, 30),
+                            carbs=rng.uniform(0, 80)) for i in range(foods)])
+    db.session.commit()
+
+    user_ids = [row.id for row in db.session.query(User.id).order_by(User.id)]
+    today = date.today()
+    workouts, meals, moods, water = [], [], [], []
+    for i in range(log_rows):
+        user_id, day = rng.choice(user_ids), today - timedelta(days=rng.randrange(days))
+        kind = i % 4
+        if kind == 0:
+            workouts.append(dict(user_id=user_id, date=day, exercise=rng.choice(EXERCISE_NAMES), sets=rng.randint(2, 5),
+                                 reps=rng.randint(5, 15), weight=rng.uniform(10, 150), feeling='good'))
+        elif kind == 1:
+            meals.append(dict(user_id=user_id, date=day, food=rng.choice(FOOD_WORDS), quantity=rng.randint(1, 3),
+                              calories=rng.uniform(100, 900)))
+        elif kind == 2:
+            moods.append(dict(user_id=user_id, date=day, mood=rng.choice(MOODS), note=''))
+        else:
+            water.append(dict(user_id=user_id, date=day, amount_ml=rng.choice([250, 500, 750, 1000])))
+    for model, rows in ((WorkoutLog, workouts), (MealLog, meals), (MoodLog, moods), (WaterLog, water)):
+        _insert(model, rows)
+    DailyRollup.rebuild()
+    db.session.commit()
+    return [(row.id, row.email) for row in db.session.query(User.id, User.email).order_by(User.id)]
+
+
+def percentiles(samples):
+    """p50/p95/p99/prosjek/max u milisekundama za listu trajanja u sekundama."""
+    if not samples:
+        return {'p50': None, 'p95': None, 'p99': None, 'mean': None, 'max': None}
+    ordered = sorted(samples)
+
+    def at(p):
+        return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000, 2)
+
+    return {'p50': at(0.5), 'p95': at(0.95), 'p99': at(0.99),
+            'mean': round(sum(ordered) / len(ordered) * 1000, 2), 'max': round(ordered[-1] * 1000, 2)}
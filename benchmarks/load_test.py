@@ -0,0 +1,151 @@
+# benchmarks/load_test.py
+"""
+Test opterećenja glavnih korisničkih putanja: privremena SQLite baza sa sintetičkim
+podacima (benchmarks/fixtures.py), zatim `--workers` istovremenih klijenata (Flask test
+client, svaki u svojoj dretvi i kao svoj korisnik) ponavlja putanju: dashboard, novi plan,
+preporuke obroka, unos obroka, AI chat (lokalni model umjesto Groq-a) i tjedni izvještaj.
+Registracija i prijava mjere se jednom po klijentu. Rezultat je JSON s propusnošću i
+p50/p95/p99 po endpointu, za usporedbu između verzija (isti --seed daje iste podatke).
+
+Pokretanje iz root-a projekta:  python benchmarks/load_test.py [--workers 8] [--iterations 25] [--output rezultat.json]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fixtures import (BENCH_PASSWORD, create_bench_app, percentiles, project_root, register_synthetic_artifacts,
+                      seed_database)
+
+CHAT_MESSAGES = [
+    "čučanj 3x10 100kg",  # parser namjera, bez modela
+    "popio sam 2 litre vode",
+    "bench press 4x8 80kg",  # lokalni model prepoznaje i bilježi
+    "kako da brže napredujem na treningu?",  # lokalni model traži više detalja
+]
+
+
+class Recorder:
+    """Trajanja i greške po endpointu, iz više dretvi."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+        self.errors = {}
+
+    def call(self, name, send, expected=(200, 302)):
+        started = time.perf_counter()
+        try:
+            response = send()
+            ok = response.status_code in expected
+            response.close()
+        except Exception as e:
+            print(f"❌ {name}: {e}")
+            ok = False
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.samples.setdefault(name, []).append(elapsed)
+            if not ok:
+                self.errors[name] = self.errors.get(name, 0) + 1
+
+
+def run_client(app, recorder, worker, email, iterations, seed):
+    rng = random.Random(seed * 1000 + worker)
+    client = app.test_client()
+
+    # Novi korisnik (registracija), zatim prijava kao seedani korisnik s povijesti logova
+    recorder.call('register', lambda: client.post('/register', data=dict(
+        username=f'load{worker}', email=f'load{worker}@example.com', password='load', age='30', gender='male',
+        height='180', weight='80', goal='muscle_gain', fitness_level='beginner', equipment='gym')))
+    recorder.call('login', lambda: client.post('/login', data=dict(email=email, password=BENCH_PASSWORD)))
+
+    for i in range(iterations):
+        recorder.call('dashboard', lambda: client.get('/dashboard'))
+        recorder.call('generate_plan', lambda: client.post('/generate_plan'))
+        recorder.call('get_meals', lambda: client.post('/get_meals', data={'calories_so_far': str(rng.randint(0, 2500))}))
+        recorder.call('log_meal', lambda: client.post('/log_meal', data={
+            'food': 'Banana', 'quantity': '1', 'calories': str(rng.randint(50, 900))}))
+        message = CHAT_MESSAGES[(worker + i) % len(CHAT_MESSAGES)]
+        recorder.call('smart_input', lambda: client.post('/smart_input', data={'description': message}))
+        recorder.call('weekly_report', lambda: client.get('/reports/weekly'))
+
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', '-C', project_root, 'rev-parse', '--short', 'HEAD'],
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_load_test(workers=8, iterations=25, users=50, exercises=500, foods=20000, log_rows=100000, days=180,
+                  llm_latency=0.0, seed=0):
+    random.seed(seed)
+    app = create_bench_app(LOCAL_LLM_LATENCY_SECONDS=llm_latency)
+    seeding_started = time.perf_counter()
+    with app.app_context():
+        seeded = seed_database(users=users, exercises=exercises, foods=foods, log_rows=log_rows, days=days, seed=seed)
+        register_synthetic_artifacts(seed)
+    seeding_seconds = time.perf_counter() - seeding_started
+    print(f"Baza napunjena za {seeding_seconds:.1f} s ({users} korisnika, {foods} namirnica, {log_rows} logova)")
+
+    recorder = Recorder()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_client, app, recorder, worker, seeded[worker % len(seeded)][1], iterations, seed)
+                   for worker in range(workers)]
+        for future in futures:
+            future.result()
+    duration = time.perf_counter() - started
+
+    endpoints = {}
+    for name, samples in recorder.samples.items():
+        endpoints[name] = {'requests': len(samples), 'errors': recorder.errors.get(name, 0),
+                           'throughput_rps': round(len(samples) / duration, 2),
+                           'latency_ms': percentiles(samples)}
+    total = sum(len(samples) for samples in recorder.samples.values())
+    return {
+        'revision': _git_revision(),
+        'python': platform.python_version(),
+        'parameters': {'workers': workers, 'iterations': iterations, 'users': users, 'exercises': exercises,
+                       'foods': foods, 'log_rows': log_rows, 'days': days, 'llm_latency': llm_latency, 'seed': seed},
+        'seeding_seconds': round(seeding_seconds, 2),
+        'duration_seconds': round(duration, 2),
+        'total': {'requests': total, 'errors': sum(recorder.errors.values()),
+                  'throughput_rps': round(total / duration, 2),
+                  'latency_ms': percentiles([s for samples in recorder.samples.values() for s in samples])},
+        'endpoints': endpoints,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Test opterećenja glavnih korisničkih putanja (JSON rezultat).")
+    parser.add_argument('--workers', type=int, default=8, help="istovremeni klijenti")
+    parser.add_argument('--iterations', type=int, default=25, help="ponavljanja putanje po klijentu")
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--exercises', type=int, default=500)
+    parser.add_argument('--foods', type=int, default=20000)
+    parser.add_argument('--log-rows', type=int, default=100000)
+    parser.add_argument('--days', type=int, default=180, help="raspon datuma logova")
+    parser.add_argument('--llm-latency', type=float, default=0.0, help="umjetno kašnjenje lokalnog modela (s)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="JSON datoteka (inače ispis)")
+    args = parser.parse_args()
+
+    result = run_load_test(args.workers, args.iterations, args.users, args.exercises, args.foods, args.log_rows,
+                           args.days, args.llm_latency, args.seed)
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+        print(f"Rezultat spremljen u {args.output}")
+    else:
+        print(text)
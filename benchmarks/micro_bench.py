@@ -0,0 +1,238 @@
+# benchmarks/micro_bench.py
+"""
+Mikro-benchmarki servisnih funkcija na više veličina podataka, s usporedbom prema
+spremljenoj baznoj liniji (benchmarks/baselines/<veličina>.json).
+
+Za svaku veličinu (--scales) puni se nova privremena baza (benchmarks/fixtures.py) i mjeri
+medijan trajanja: generate_workout_plan, get_meal_recommendations, generate_weekly_report
+(bez spremljene kopije izvještaja), get_daily_summary, find_best_match (namirnice) i
+AIVirtualTrainer._extract_fitness_data. Uz svako ponavljanje funkcije mjeri se i referentni
+posao neovisan o aplikaciji (Python i SQLite u memoriji), a rezultati se spremaju i uspoređuju
+kao višekratnik njegovog trajanja, pa promjena brzine računala (frekvencija, opterećenje)
+ne izgleda kao regresija. Funkcija je regresija ako je sporija od bazne linije za više od
+--threshold (udio) i ako je usporenje (preračunato u µs ovog pokretanja) veće od --min-delta-us,
+da šum na funkcijama od desetak µs ne ruši provjeru; tada skripta završava s izlaznim kodom 1.
+
+Relativne bazne linije ne ovise o računalu i spremljene su u gitu; nakon namjerne promjene
+brzine obnavljaju se s --update-baseline. Veličina bez bazne linije (ili sa starom, apsolutnom)
+također završava s izlaznim kodom 1, da provjera ne prođe samo zato što nema s čime usporediti.
+
+Pokretanje iz root-a projekta:  python benchmarks/micro_bench.py [--scales small medium] [--threshold 0.25]
+"""
+import argparse
+import gc
+import itertools
+import json
+import math
+import os
+import sqlite3
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fixtures import create_bench_app, register_synthetic_artifacts, seed_database
+
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+
+# naziv -> (redaka logova, namirnica); korisnika je uvijek 20, pa logovi po korisniku rastu s veličinom
+SCALES = {
+    'small': (1_000, 1_000),
+    'medium': (10_000, 10_000),
+    'large': (100_000, 100_000),
+    'xlarge': (1_000_000, 100_000),
+}
+USERS = 20
+REFERENCE_ROWS = 2_000
+SAMPLE_SECONDS = 0.002  # najkraći uzorak; kraće funkcije se ponavljaju unutar uzorka
+FOOD_QUERIES = ['chicken roasted', 'banana raw', 'oats dried', 'salmon fried', 'yogurt skim', 'piletina']
+TRAINER_MESSAGE = ("Danas sam radio čučanj 3x10 100kg i bench press 4x8 80kg, a za ručak sam jeo piletinu i rižu. "
+                   "Popio sam 2 litre vode. ") * 5
+
+
+def _calls_per_sample(function, target=SAMPLE_SECONDS):
+    """Koliko poziva stane u jedan uzorak od barem `target` sekundi (kao timeit.autorange); ujedno zagrijava."""
+    started = time.perf_counter()
+    function()
+    return max(1, math.ceil(target / max(time.perf_counter() - started, 1e-9)))
+
+
+def _timed(function, calls):
+    started = time.perf_counter()
+    for _ in range(calls):
+        function()
+    return (time.perf_counter() - started) / calls
+
+
+def measure(function, reference, repeat):
+    """
+    Medijan trajanja funkcije i referentnog posla (µs po pozivu). Izvode se naizmjence, pa oba
+    mjerenja vide isto stanje računala; kratke funkcije se u uzorku pozivaju više puta, a GC je
+    za vrijeme mjerenja isključen (kao u timeitu).
+    """
+    calls, reference_calls = _calls_per_sample(function), _calls_per_sample(reference)
+    timings, reference_timings = [], []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            reference_timings.append(_timed(reference, reference_calls))
+            timings.append(_timed(function, calls))
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return round(statistics.median(timings) * 1e6, 1), round(statistics.median(reference_timings) * 1e6, 1)
+
+
+def reference_workload():
+    """Fiksni posao neovisan o kodu aplikacije: grupiranje u SQLite-u u memoriji i sortiranje u Pythonu."""
+    connection = sqlite3.connect(':memory:')
+    connection.execute("CREATE TABLE reference (k INTEGER, v REAL)")
+    connection.executemany("INSERT INTO reference VALUES (?, ?)",
+                           ((i % 97, (i * 7919) % 1000 / 10) for i in range(REFERENCE_ROWS)))
+
+    def run():
+        totals = dict(connection.execute("SELECT k, SUM(v) FROM reference GROUP BY k"))
+        rows = connection.execute("SELECT k, v FROM reference WHERE v > 50").fetchall()
+        return sorted(rows, key=lambda row: (totals[row[0]], row[1]))
+    return run
+
+
+def _trainer_extract():
+    """_extract_fitness_data ne koristi model; None ako ai_virtual_trainer nije moguće importati (npr. nema torcha)."""
+    try:
+        from ai_virtual_trainer import AIVirtualTrainer
+    except ImportError as e:
+        print(f"-> Preskačem AIVirtualTrainer._extract_fitness_data ({e})")
+        return None
+    return lambda: AIVirtualTrainer._extract_fitness_data(None, TRAINER_MESSAGE)
+
+
+def run_scale(scale, repeat, seed=0):
+    """({funkcija: medijan µs}, {funkcija: medijan referentnog posla µs}) za jednu veličinu podataka."""
+    log_rows, foods = SCALES[scale]
+    app = create_bench_app()
+    with app.app_context(), app.test_request_context():
+        from app import db
+        from app.models import ProgressReport, User
+        from app.routes import find_best_match
+        from app.search import food_index
+        from app.services import (generate_weekly_report, generate_workout_plan, get_daily_summary,
+                                  get_meal_recommendations)
+
+        started = time.perf_counter()
+        seed_database(users=USERS, exercises=500, foods=foods, log_rows=log_rows, days=365, seed=seed)
+        register_synthetic_artifacts(seed)
+        print(f"\n== {scale}: {log_rows:,} redaka logova, {foods:,} namirnica "
+              f"(baza napunjena za {time.perf_counter() - started:.1f} s) ==")
+        user = db.session.get(User, 1)
+
+        def weekly_report_uncached():
+            ProgressReport.query.filter_by(user_id=user.id).delete()
+            return generate_weekly_report(user.id)
+
+        queries = itertools.cycle(FOOD_QUERIES)
+        functions = {
+            'generate_workout_plan': lambda: generate_workout_plan(user),
+            'get_meal_recommendations': lambda: get_meal_recommendations(user, 2, 900, 'neutral'),
+            'generate_weekly_report': weekly_report_uncached,
+            'get_daily_summary': lambda: get_daily_summary(user.id),
+            'find_best_match': lambda: find_best_match(next(queries), food_index()),
+        }
+        extract = _trainer_extract()
+        if extract:
+            functions['AIVirtualTrainer._extract_fitness_data'] = extract
+
+        reference = reference_workload()
+        results, references = {}, {}
+        for name, function in functions.items():
+            results[name], references[name] = measure(function, reference, repeat)
+            print(f"{name:42} {results[name]:12,.1f} µs  {results[name] / references[name]:10.4f}x ref "
+                  f"(ref {references[name]:,.1f} µs)")
+        db.session.rollback()
+    return results, references
+
+
+def relative(results, references):
+    """Trajanja kao višekratnik referentnog posla izmjerenog uz istu funkciju."""
+    return {name: round(value / references[name], 6) for name, value in results.items()}
+
+
+def compare(scale, results, references, threshold, min_delta_us, repeat):
+    """
+    Lista regresija (naziv, bazna linija, sada) prema spremljenoj baznoj liniji veličine; vrijednosti
+    su relativne, a `references` (µs referentnog posla iz ovog pokretanja) služe za --min-delta-us.
+    None ako bazne linije nema ili je u starom formatu.
+    """
+    path = os.path.join(BASELINES_PATH, f'{scale}.json')
+    if not os.path.exists(path):
+        print(f"❌ Nema bazne linije za '{scale}' ({path}); spremi je s --update-baseline")
+        return None
+    with open(path, encoding='utf-8') as f:
+        saved = json.load(f)
+    if 'reference_us' not in saved:
+        print(f"❌ Bazna linija '{path}' nije relativna (stari format); spremi je ponovno s --update-baseline")
+        return None
+    if saved.get('repeat') != repeat:
+        # find_best_match izmjenjuje upite, pa drugi --repeat mjeri drugačiju mješavinu
+        print(f"-> Bazna linija '{scale}' izmjerena je s --repeat {saved.get('repeat')}, a sada je {repeat}")
+    baseline = saved['results']
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        change = current / previous - 1
+        regressed = change > threshold and (current - previous) * references[name] > min_delta_us
+        marker = '❌ REGRESIJA' if regressed else ''
+        print(f"{name:42} {previous:10.4f} -> {current:10.4f}x ref ({change:+.0%}) {marker}")
+        if regressed:
+            regressions.append((name, previous, current))
+    return regressions
+
+
+def save_baseline(scale, results, references, repeat):
+    os.makedirs(BASELINES_PATH, exist_ok=True)
+    log_rows, foods = SCALES[scale]
+    path = os.path.join(BASELINES_PATH, f'{scale}.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'scale': {'log_rows': log_rows, 'foods': foods, 'users': USERS}, 'repeat': repeat,
+                   'unit': 'median / reference workload median', 'reference_us': references,
+                   'results': relative(results, references), 'microseconds': results}, f, indent=2)
+    print(f"-> Bazna linija spremljena u {path}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Mikro-benchmarki servisnih funkcija s baznim linijama.")
+    parser.add_argument('--scales', nargs='+', choices=list(SCALES), default=['small', 'medium'])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--threshold', type=float, default=0.25, help="dopušteno usporenje (0.25 = 25%%)")
+    parser.add_argument('--min-delta-us', type=float, default=100,
+                        help="najmanje usporenje u µs koje se računa kao regresija")
+    parser.add_argument('--update-baseline', action='store_true', help="spremi rezultate kao novu baznu liniju")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    all_regressions, missing = [], []
+    for scale in args.scales:
+        results, references = run_scale(scale, args.repeat, args.seed)
+        if args.update_baseline:
+            save_baseline(scale, results, references, args.repeat)
+        else:
+            regressions = compare(scale, relative(results, references), references, args.threshold,
+                                  args.min_delta_us, args.repeat)
+            if regressions is None:
+                missing.append(scale)
+            else:
+                all_regressions += [(scale, *regression) for regression in regressions]
+
+    if all_regressions:
+        print(f"\n❌ {len(all_regressions)} regresija iznad {args.threshold:.0%}:")
+        for scale, name, previous, current in all_regressions:
+            print(f"   [{scale}] {name}: {previous:.4f} -> {current:.4f}x ref")
+    if missing:
+        print(f"\n❌ Nema bazne linije za: {', '.join(missing)} (spremi je s --update-baseline)")
+    if all_regressions or missing:
+        sys.exit(1)
+    print("\n✅ Nema regresija.")
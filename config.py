@@ -21,8 +21,93 @@ class Config:
 
     # --- ISPRAVAK: Ažurirane putanje do modela i podataka ---
     # Putanje sada pokazuju na direktorije u root-u projekta, a ne unutar 'app'
-    MODELS_PATH = os.path.join(os.path.dirname(BASE_DIR), 'models')
-    PROCESSED_DATA_PATH = os.path.join(os.path.dirname(BASE_DIR), 'data', 'processed')
+    MODELS_PATH = os.path.join(BASE_DIR, 'models')
+    PROCESSED_DATA_PATH = os.path.join(BASE_DIR, 'data', 'processed')
 
     # Groq API Token
-    GROQ_API_KEY = os.environ.get('GROQ_API_KEY')
\ No newline at end of file
+    GROQ_API_KEY = os.environ.get('GROQ_API_KEY')
+
+    # Koliko često (u sekundama) predmemorije provjeravaju je li neka skripta za punjenje promijenila tablicu
+    DATA_VERSION_CHECK_SECONDS = 30
+
+    # Učitaj RL agente i recepte već pri pokretanju (inače pri prvoj preporuci)
+    WARM_UP_MODELS = os.environ.get('WARM_UP_MODELS') == '1'
+    # Koliko preporuka čeka pozadinsku analizu emocija novog teksta (inače ga zasad računa kao neutralan)
+    EMOTION_WAIT_MS = float(os.environ.get('EMOTION_WAIT_MS', 250))
+
+    # AI chat: broj zadnjih poruka u promptu, najveća duljina sažetka starijih poruka
+    # i broj razgovora u memoriji procesa (ostali se čitaju iz baze)
+    CHAT_CONTEXT_MESSAGES = 8
+    CHAT_SUMMARY_MAX_CHARS = 1500
+    CHAT_CACHE_SIZE = 512
+
+    # Streaming chat: najviše istovremenih streamova (ostali dobiju 503), timeout poziva
+    # prema Groq-u i najdulje trajanje jednog odgovora
+    CHAT_MAX_CONCURRENT_STREAMS = 4
+    CHAT_LLM_TIMEOUT_SECONDS = 20
+    CHAT_STREAM_MAX_SECONDS = 60
+
+    # Jezični model: 'groq' (treba GROQ_API_KEY) ili 'local' (deterministička zamjena za
+    # testiranje bez mreže, s umjetnim kašnjenjem LOCAL_LLM_LATENCY_SECONDS)
+    LLM_PROVIDER = os.environ.get('LLM_PROVIDER', 'groq')
+    LLM_MODEL = 'llama-3.1-8b-instant'
+    LLM_TEMPERATURE = 0.2
+    LLM_MAX_TOKENS = 512
+    LLM_TOP_P = 0.9
+    LOCAL_LLM_LATENCY_SECONDS = float(os.environ.get('LOCAL_LLM_LATENCY_SECONDS', 0))
+    # Predmemorija odgovora za ponovljene fraze za bilježenje
+    LLM_CACHE_SIZE = 1024
+    LLM_CACHE_TTL_SECONDS = 3600
+
+    # Mjerenje zahtjeva (/metrics): zahtjevi sporiji od ovoga ispisuju se s raspodjelom
+    # vremena (SQL, model, renderiranje...); None isključuje ispis
+    SLOW_REQUEST_MS = float(os.environ['SLOW_REQUEST_MS']) if os.environ.get('SLOW_REQUEST_MS') else None
+    # /metrics i /health/llm: uz METRICS_TOKEN traže zaglavlje "Authorization: Bearer <token>"
+    # (npr. za Prometheus), bez njega samo prijavljenog korisnika
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+    # SQLite PRAGMA postavke za svaku konekciju (prazno = zadane postavke SQLite-a, vidi ProductionConfig)
+    SQLITE_PRAGMAS = {}
+
+    # Profili prijavljenih korisnika (current_user) u memoriji: najviše toliko korisnika, svaki
+    # najdulje USER_PROFILE_TTL_SECONDS (izmjene kroz ORM brišu profil odmah)
+    USER_PROFILE_CACHE_SIZE = 1024
+    USER_PROFILE_TTL_SECONDS = 60
+
+    # Grupni upis logova (app/log_writer.py): retci iz svih zahtjeva spremaju se zajedno kad ih
+    # je LOG_BATCH_MAX_SIZE ili nakon LOG_BATCH_MAX_WAIT_MS. LOG_WRITE_ACK: 'commit' (zahtjev čeka
+    # spremanje) ili 'queued' (zahtjev ne čeka, čitanja korisnika čekaju njegove retke)
+    LOG_WRITE_BEHIND = True
+    LOG_WRITE_ACK = os.environ.get('LOG_WRITE_ACK', 'commit')
+    LOG_BATCH_MAX_SIZE = 64
+    LOG_BATCH_MAX_WAIT_MS = 5
+    LOG_WRITE_ACK_TIMEOUT_SECONDS = 10
+
+
+class ProductionConfig(Config):
+    """
+    Produkcijski profil baze: SQLite u WAL načinu, tako da čitanja (npr. dashboard) ne čekaju
+    upis logova, a upisi ne rade fsync pri svakom commitu (synchronous=NORMAL - nakon nestanka
+    struje mogu se izgubiti zadnji commitovi, ali baza ostaje ispravna).
+    """
+    # PRAGMA postavke koje se primjenjuju na svaku novu konekciju (app/database.py)
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,  # ms čekanja na zaključanu bazu prije "database is locked"
+        'cache_size': -65536,  # negativno = KiB, tj. 64 MB predmemorije stranica po konekciji
+        'mmap_size': 268435456,  # 256 MB memorijski mapiranog čitanja
+        'temp_store': 'MEMORY',
+    }
+    # Konekcije po procesu: pool_size stalnih + max_overflow privremenih; zahtjev koji ne dobije
+    # konekciju u pool_timeout sekundi dobiva grešku umjesto beskonačnog čekanja
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': 8,
+        'max_overflow': 4,
+        'pool_timeout': 10,
+        'pool_recycle': 3600,
+    }
+
+
+# Profil po nazivu, za APP_CONFIG (run.py)
+CONFIGS = {'development': Config, 'production': ProductionConfig}
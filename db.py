@@ -1,7 +1,12 @@
-import sqlite3
-conn = sqlite3.connect('instance/database.db')
-c = conn.cursor()
-c.execute("ALTER TABLE user ADD COLUMN medical_history TEXT;")
-c.execute("ALTER TABLE user ADD COLUMN citizenship VARCHAR(100);")
-conn.commit()
-conn.close()
\ No newline at end of file
+# db.py - primjenjuje migracije sheme (app/migrations.py) na postojeću bazu
+from app import create_app, db
+from app.migrations import MIGRATIONS, applied_versions
+
+# create_app() sam pokreće upgrade(), pa je baza nakon ovoga na zadnjoj verziji
+app = create_app()
+
+with app.app_context():
+    done = applied_versions()
+    for version, description, _ in sorted(MIGRATIONS, key=lambda m: m[0]):
+        status = "primijenjena" if version in done else "NIJE primijenjena"
+        print(f"{version:>3}  {status:<18} {description}")
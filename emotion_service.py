@@ -0,0 +1,220 @@
+# emotion_service.py
+"""
+Analiza emocija za engleski i hrvatski (i druge jezike) tekst, za liste tekstova.
+
+Engleski tekstovi idu modelu za emocije (j-hartmann), ostali višejezičnom modelu
+za sentiment (nlptown, 1-5 zvjezdica -> negative/neutral/positive). Tekstovi se
+grupiraju po jeziku, pa svaki model dobije jedan poziv s batchem, a rezultat se
+pamti u ograničenoj LRU predmemoriji po normaliziranom tekstu. Na putu zahtjeva nepoznati
+tekstovi klasificiraju se u pozadinskoj dretvi, a pozivatelj čeka rezultat najviše zadano
+vrijeme (wait u sekundama; wait=False ne čeka). Tekst koji nije stigao dobije 'neutral'
+s oznakom 'provisional': True, pa pozivatelj zna da oznaka nije stvarna. EMOTION_MAP je
+preslikavanje oznaka u indeks emocije iz stanja RL agenta (NutritionEnvironmentV4).
+"""
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from langdetect import DetectorFactory, LangDetectException, detect
+
+DetectorFactory.seed = 0  # langdetect je inače nedeterministički za kratke tekstove
+
+# Oznaka -> indeks emocije u stanju agenta: 0 pozitivno, 1 neutralno, 2 negativno
+EMOTION_MAP = {'positive': 0, 'joy': 0, 'love': 0, 'surprise': 0, 'neutral': 1,
+               'negative': 2, 'sadness': 2, 'anger': 2, 'fear': 2, 'disgust': 2}
+NEUTRAL = 'neutral'
+CACHE_SIZE = 4096
+BATCH_SIZE = 16
+
+
+def normalize_text(text):
+    """Ključ predmemorije: NFC, mala slova, jedan razmak."""
+    return re.sub(r'\s+', ' ', unicodedata.normalize('NFC', text).lower()).strip()
+
+
+def _sentiment_label(result):
+    score = int(result['label'].split()[0])
+    if score <= 2:
+        return 'negative'
+    if score == 3:
+        return 'neutral'
+    return 'positive'
+
+
+def _fallback(language=None, provisional=False):
+    return {'language': language, 'type': None, 'label': NEUTRAL, 'score': None, 'provisional': provisional}
+
+
+class EmotionService:
+    """
+    analyze(texts) vraća za svaki tekst {'language', 'type' ('emotion'/'sentiment'/None),
+    'label', 'score', 'provisional'}. Modeli se učitavaju pri prvoj klasifikaciji (ili s load()); tekst koji
+    je već oznaka (npr. "neutral") i tekst iz predmemorije ne trebaju model. Red za pozadinsku
+    klasifikaciju ograničen je na max_entries tekstova; višak se ne klasificira dok se ne ponovi.
+    """
+
+    def __init__(self, max_entries=CACHE_SIZE, batch_size=BATCH_SIZE):
+        self.max_entries = max_entries
+        self.batch_size = batch_size
+        self._results = OrderedDict()  # normalizirani tekst -> rezultat
+        self._lock = threading.Lock()
+        self._classified = threading.Condition(self._lock)  # budi pozivatelje koji čekaju pozadinski rezultat
+        self._load_lock = threading.Lock()
+        self._classifiers = None
+        self._queued = OrderedDict()  # normalizirani tekst -> izvorni tekst, čeka pozadinsku klasifikaciju
+        self._worker = None
+        self.hits = 0
+        self.misses = 0
+
+    def load(self):
+        """Učitaj modele (jednom); vraća (model za emocije, model za sentiment), None za nedostupan."""
+        if self._classifiers is None:
+            with self._load_lock:
+                if self._classifiers is None:
+                    from model_variants import load_pipeline
+                    print("Učitavam modele za analizu teksta...")
+                    try:
+                        emotion_classifier = load_pipeline('emotion', top_k=1)
+                        sentiment_classifier = load_pipeline('sentiment')
+                        print("-> Modeli za emocije/sentiment uspješno učitani.")
+                    except Exception as e:
+                        print(f"GREŠKA pri učitavanju NLP modela: {e}")
+                        emotion_classifier = sentiment_classifier = None
+                    self._classifiers = (emotion_classifier, sentiment_classifier)
+        return self._classifiers
+
+    def is_loaded(self):
+        return self._classifiers is not None
+
+    def classify_in_background(self, pending):
+        """Stavi {ključ: izvorni tekst} u red pozadinske dretve (učitava modele ako treba i puni predmemoriju)."""
+        with self._lock:
+            for key, text in pending.items():
+                if key not in self._queued and len(self._queued) < self.max_entries:
+                    self._queued[key] = text
+            if self._queued and self._worker is None:
+                self._worker = threading.Thread(target=self._classify_queued, name='emotion-classifier', daemon=True)
+                self._worker.start()
+
+    def _classify_queued(self):
+        while True:
+            with self._lock:
+                if not self._queued:
+                    self._worker = None
+                    return
+                batch = {}
+                while self._queued and len(batch) < self.batch_size * 4:
+                    key, text = self._queued.popitem(last=False)
+                    batch[key] = text
+            try:
+                for key, result in self._classify(batch).items():
+                    self._remember(key, result)
+            except Exception as e:
+                print(f"GREŠKA pri pozadinskoj analizi emocija: {e}")
+            with self._classified:
+                self._classified.notify_all()
+
+    def _cached(self, key):
+        with self._lock:
+            result = self._results.get(key)
+            if result is not None:
+                self._results.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return result
+
+    def _remember(self, key, result):
+        with self._lock:
+            self._results[key] = result
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+
+    def _classify(self, pending):
+        """{ključ: rezultat} za {ključ: izvorni tekst} kojih nema u predmemoriji; modeli dobiju izvorni tekst."""
+        emotion_classifier, sentiment_classifier = self.load()
+        results, english, other = {}, [], []
+        for key, text in pending.items():
+            try:
+                language = detect(text)
+            except LangDetectException:
+                results[key] = _fallback()
+                continue
+            (english if language == 'en' and emotion_classifier else other).append((key, text, language))
+
+        if english:
+            outputs = emotion_classifier([text for _, text, _ in english], batch_size=self.batch_size, truncation=True)
+            for (key, _text, language), output in zip(english, outputs):
+                best = output[0] if isinstance(output, list) else output
+                results[key] = {'language': language, 'type': 'emotion', 'label': best['label'], 'score': best['score'],
+                                'provisional': False}
+        if other and sentiment_classifier:
+            outputs = sentiment_classifier([text for _, text, _ in other], batch_size=self.batch_size, truncation=True)
+            for (key, _text, language), output in zip(other, outputs):
+                results[key] = {'language': language, 'type': 'sentiment', 'label': _sentiment_label(output),
+                                'score': output['score'], 'provisional': False}
+        for key, _text, language in other:
+            results.setdefault(key, _fallback(language))
+        return results
+
+    def _wait_for(self, pending, timeout):
+        """{ključ: rezultat} za tekstove iz `pending` koje pozadinska dretva klasificira unutar `timeout` sekundi."""
+        deadline = time.monotonic() + timeout
+        with self._classified:
+            while True:
+                done = {key: self._results[key] for key in pending if key in self._results}
+                remaining = deadline - time.monotonic()
+                if len(done) == len(pending) or remaining <= 0:
+                    return done
+                self._classified.wait(remaining)
+
+    def analyze(self, texts, wait=True):
+        """
+        Rezultat za svaki tekst, istim redom. wait=True klasificira nove tekstove u ovoj dretvi.
+        Inače idu u pozadinsku klasifikaciju, a poziv čeka najviše `wait` sekundi (False: ne čeka);
+        tekstovi bez rezultata dobiju 'neutral' s 'provisional': True.
+        """
+        keys = [normalize_text(text) if text else '' for text in texts]
+        found, pending = {}, {}
+        for key, text in zip(keys, texts):
+            if key in found or key in pending:
+                continue
+            if not key:
+                found[key] = _fallback()
+            elif key in EMOTION_MAP:
+                found[key] = {'language': None, 'type': 'label', 'label': key, 'score': None, 'provisional': False}
+            else:
+                result = self._cached(key)
+                if result is None:
+                    pending[key] = text
+                else:
+                    found[key] = result
+
+        if pending and wait is not True:
+            self.classify_in_background(pending)
+            done = self._wait_for(pending, wait) if wait else {}
+            found.update((key, done.get(key) or _fallback(provisional=True)) for key in pending)
+        elif pending:
+            for key, result in self._classify(pending).items():
+                self._remember(key, result)
+                found[key] = result
+        return [found[key] for key in keys]
+
+    def labels(self, texts, wait=True):
+        return [result['label'] for result in self.analyze(texts, wait)]
+
+    def indices(self, texts, wait=True):
+        """Indeks emocije (EMOTION_MAP, 1 za nepoznatu oznaku) za svaki tekst."""
+        return [EMOTION_MAP.get(label, 1) for label in self.labels(texts, wait)]
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._results), 'hits': self.hits, 'misses': self.misses,
+                    'queued': len(self._queued),
+                    'models_loaded': self._classifiers is not None}
+
+
+emotion_service = EmotionService()
@@ -0,0 +1,184 @@
+# fitness_patterns.py
+"""
+Rječnik vježbi i namirnica za prepoznavanje u porukama, kao tablica podataka.
+
+Svi izrazi (okidači, vježbe, namirnice, brojevi s jedinicama) spajaju se jednom, pri
+importu, u jedan regex s imenovanim grupama. scan() zato prolazi poruku samo jednom i
+vraća sve pogotke redom, a extract() brojeve (serije x ponavljanja, kg, min, km, grami)
+pridružuje vježbi ili namirnici uz koju stoje. Koriste ga AIVirtualTrainer i parser
+namjera u AI chatu (app/intent_parser.py).
+"""
+import re
+
+# Glagoli nakon kojih spomen vježbe ili namirnice znači da je korisnik to napravio/pojeo
+EXERCISE_TRIGGERS = ['napravio', 'napravila', 'radio', 'radila', 'odradio', 'odradila', 'trenirao', 'trenirala']
+FOOD_TRIGGERS = ['jeo', 'jela', 'pojeo', 'pojela', 'doručkovao', 'ručao', 'večerao']
+
+# name: naziv u AIVirtualTrainer-u, forms: oblici riječi (regex), query: naziv za pretragu baze vježbi,
+# trigger: treba li prije spomena glagol iz EXERCISE_TRIGGERS
+EXERCISES = [
+    {'name': 'Squat', 'forms': r'čuč\w*|squats?', 'query': 'Squat', 'trigger': True},
+    {'name': 'Deadlift', 'forms': r'mrtv\w*\s+dizanj\w*|deadlifts?', 'query': 'Deadlift', 'trigger': True},
+    {'name': 'Bench Press', 'forms': r'bench\s*press\w*|potis\w*', 'query': 'Bench Press', 'trigger': True},
+    {'name': 'Pull-ups', 'forms': r'zgib\w*|pull[\s-]?ups?', 'query': 'Pull-up', 'trigger': True},
+    {'name': 'Push-ups', 'forms': r'sklek\w*|push[\s-]?ups?', 'query': 'Push-up', 'trigger': True},
+    {'name': 'Lunges', 'forms': r'iskora\w*|lunges?', 'query': 'Lunge', 'trigger': True},
+    {'name': 'Plank', 'forms': r'plank\w*', 'query': None, 'trigger': True},
+    {'name': 'Cardio', 'forms': r'trčao|trčala|trčanj\w*|cardio', 'query': None, 'trigger': False},
+    {'name': 'Cycling', 'forms': r'bicikl\w*|cycling', 'query': None, 'trigger': False},
+    {'name': 'Swimming', 'forms': r'plivanj\w*|plivao|plivala|swimming', 'query': None, 'trigger': False},
+]
+
+# name i calories (po porciji): za AIVirtualTrainer, query: naziv za pretragu USDA namirnica
+FOODS = [
+    {'name': 'Jaja', 'forms': r'jaj\w*', 'calories': 155, 'query': 'Egg'},
+    {'name': 'Piletina', 'forms': r'piletin\w*', 'calories': 165, 'query': 'Chicken breast'},
+    {'name': 'Riba', 'forms': r'rib[aeu]', 'calories': 140, 'query': 'Fish'},
+    {'name': 'Govedina', 'forms': r'govedin\w*', 'calories': 200, 'query': 'Beef'},
+    {'name': 'Svinjina', 'forms': r'svinjin\w*|svinjetin\w*', 'calories': 180, 'query': 'Pork'},
+    {'name': 'Tuna', 'forms': r'tun[aeu]', 'calories': 130, 'query': 'Tuna'},
+    {'name': 'Riža', 'forms': r'riž\w*|riz[aeiu]', 'calories': 130, 'query': 'Rice'},
+    {'name': 'Krumpir', 'forms': r'krumpir\w*', 'calories': 110, 'query': 'Potato'},
+    {'name': 'Tjestenina', 'forms': r'tjestenin\w*|pašt\w*', 'calories': 150, 'query': 'Pasta'},
+    {'name': 'Kruh', 'forms': r'kruh\w*', 'calories': 80, 'query': 'Bread'},
+    {'name': 'Zobene pahuljice', 'forms': r'zobene\s+pahuljice|ovsene\s+pahuljice|zobene|ovsene|pahuljic\w*',
+     'calories': 120, 'query': 'Oats'},
+    {'name': 'Salata', 'forms': r'salat\w*', 'calories': 20, 'query': 'Lettuce'},
+    {'name': 'Rajčica', 'forms': r'rajčic\w*', 'calories': 25, 'query': 'Tomato'},
+    {'name': 'Krastavac', 'forms': r'krastav\w*', 'calories': 15, 'query': 'Cucumber'},
+    {'name': 'Brokula', 'forms': r'brokul\w*', 'calories': 30, 'query': 'Broccoli'},
+    {'name': 'Špinat', 'forms': r'špinat\w*', 'calories': 25, 'query': 'Spinach'},
+    {'name': 'Banana', 'forms': r'banan\w*', 'calories': 105, 'query': 'Banana'},
+    {'name': 'Jabuka', 'forms': r'jabuk\w*', 'calories': 80, 'query': 'Apple'},
+    {'name': 'Naranča', 'forms': r'naranč\w*|narandž\w*', 'calories': 65, 'query': 'Orange'},
+    {'name': 'Avokado', 'forms': r'avokad\w*', 'calories': 160, 'query': 'Avocado'},
+    {'name': 'Jogurt', 'forms': r'jogurt\w*', 'calories': 100, 'query': 'Yogurt'},
+    {'name': 'Sir', 'forms': r'sir|sira|siru|sirom', 'calories': 110, 'query': 'Cheese'},
+    {'name': 'Mlijeko', 'forms': r'mlijek\w*', 'calories': 150, 'query': 'Milk'},
+    {'name': 'Orahi', 'forms': r'orah\w*', 'calories': 185, 'query': 'Walnuts'},
+    {'name': 'Bademi', 'forms': r'badem\w*', 'calories': 170, 'query': 'Almonds'},
+]
+
+# Brojevi s jedinicama; redoslijed je važan jer se na istom mjestu uzima prvi izraz koji odgovara
+NUMBER_PATTERNS = [
+    ('water', r'(?P<water_amount>\d+(?:[.,]\d+)?)\s*(?P<water_unit>ml|mililit\w*|l|lit\w*|čaš\w*)\s+vode'),
+    ('sets_reps', r'(?P<sets>\d+)\s*(?:[x×]|serij\w*\s*(?:po\s*)?)\s*(?P<reps>\d+)(?:\s*ponavljanj\w*)?'),
+    ('weight', r'(?P<weight_value>\d+(?:[.,]\d+)?)\s*kg\b'),
+    ('duration', r'(?P<duration_value>\d+)\s*(?:min|minut\w*)\b'),
+    ('distance', r'(?P<distance_value>\d+(?:[.,]\d+)?)\s*km\b'),
+    ('quantity', r'(?P<quantity_value>\d+)\s*(?P<quantity_unit>g|gr|grama|ml|kom|komada)?\b'),
+]
+EXERCISE_SLOTS = ('sets_reps', 'weight', 'duration', 'distance')
+WATER_ML_PER_GLASS = 250
+
+
+def _branches(forms):
+    """Razdvoji oblike riječi na alternative najviše razine ('a|b(?:c|d)' -> ['a', 'b(?:c|d)'])."""
+    branches, depth, current = [], 0, ''
+    for char in forms:
+        depth += (char in '([') - (char in ')]')
+        if char == '|' and depth == 0:
+            branches.append(current)
+            current = ''
+        else:
+            current += char
+    return branches + [current]
+
+
+def _compile():
+    """
+    Jedan regex za cijelu tablicu. Svaka alternativa počinje slovom, a pripadnost unosu
+    označava prazna imenovana grupa na kraju, jer `re` alternative koje počinju drugim
+    slovom preskače bez pokušaja. Vraća (regex, ime grupe -> (vrsta, unos iz tablice)).
+    """
+    alternatives = [rf'(?P<{kind}>{pattern})' for kind, pattern in NUMBER_PATTERNS]
+    groups = {kind: (kind, None) for kind, _pattern in NUMBER_PATTERNS}
+    vocabularies = [('exercise_trigger', [(word, None) for word in EXERCISE_TRIGGERS]),
+                    ('food_trigger', [(word, None) for word in FOOD_TRIGGERS]),
+                    ('exercise', [(entry['forms'], entry) for entry in EXERCISES]),
+                    ('food', [(entry['forms'], entry) for entry in FOODS])]
+    for kind, entries in vocabularies:
+        for forms, entry in entries:
+            for branch in _branches(forms):
+                name = f'g{len(groups)}'
+                alternatives.append(rf'{branch}\b(?P<{name}>)')
+                groups[name] = (kind, entry)
+    # Pogodak može početi samo na početku riječi, pa se unutar riječi alternacija niti ne pokušava
+    return re.compile(rf"(?<!\w)(?=\w)(?:{'|'.join(alternatives)})"), groups
+
+
+COMBINED_PATTERN, _GROUPS = _compile()
+
+
+def _number(value):
+    return float(value.replace(',', '.'))
+
+
+def scan(text):
+    """
+    Jedan prolaz kroz (mala slova) tekst. Vraća listu (vrsta, podatak, span), gdje je vrsta
+    'exercise', 'food', okidač ili vrsta broja, a podatak unos iz tablice ili izvučeni brojevi.
+    """
+    tokens = []
+    for match in COMBINED_PATTERN.finditer(text):
+        kind, entry = _GROUPS[match.lastgroup]
+        if kind in ('exercise', 'food'):
+            tokens.append((kind, entry, match.span()))
+        elif kind == 'water':
+            amount, unit = _number(match['water_amount']), match['water_unit']
+            if unit.startswith('čaš'):
+                amount_ml = amount * WATER_ML_PER_GLASS
+            elif unit.startswith('m'):
+                amount_ml = amount
+            else:
+                amount_ml = amount * 1000
+            tokens.append(('water', {'amount_ml': int(amount_ml)}, match.span()))
+        elif kind == 'sets_reps':
+            tokens.append((kind, {'sets': int(match['sets']), 'reps': int(match['reps'])}, match.span()))
+        elif kind in ('weight', 'duration', 'distance'):
+            tokens.append((kind, {'value': _number(match[f'{kind}_value'])}, match.span()))
+        elif kind == 'quantity':
+            tokens.append((kind, {'value': int(match['quantity_value']), 'unit': match['quantity_unit']},
+                           match.span()))
+        else:
+            tokens.append((kind, None, match.span()))
+    return tokens
+
+
+def extract(text):
+    """
+    Pogoci iz scan() složeni po spomenima. Broj ide spomenu ispred sebe (ili sljedećem,
+    ako spomena još nema): serije/kg/min/km vježbi, količina namirnici. Vraća rječnik
+    s listama 'exercises', 'foods' i 'water'; svaki spomen ima 'entry', 'triggered'
+    (je li prije njega bio odgovarajući glagol), pronađene brojeve i 'spans'.
+    """
+    result = {'exercises': [], 'foods': [], 'water': []}
+    exercise_triggered = food_triggered = False
+    pending = []  # brojevi prije prvog spomena
+    last = {'exercise': None, 'food': None}
+
+    for kind, data, span in scan(text.lower()):
+        if kind == 'exercise_trigger':
+            exercise_triggered = True
+        elif kind == 'food_trigger':
+            food_triggered = True
+        elif kind == 'water':
+            result['water'].append({'amount_ml': data['amount_ml'], 'spans': [span]})
+        elif kind in ('exercise', 'food'):
+            mention = {'entry': data, 'spans': [span],
+                       'triggered': exercise_triggered if kind == 'exercise' else food_triggered}
+            result[f'{kind}s'].append(mention)
+            last[kind] = mention
+            for slot_kind, slot_data, slot_span in pending:
+                if (slot_kind in EXERCISE_SLOTS) == (kind == 'exercise') and slot_kind not in mention:
+                    mention[slot_kind] = slot_data
+                    mention['spans'].append(slot_span)
+            pending = [p for p in pending if p[0] not in mention]
+        else:
+            owner = last['exercise'] if kind in EXERCISE_SLOTS else last['food']
+            if owner is not None and kind not in owner:
+                owner[kind] = data
+                owner['spans'].append(span)
+            else:
+                pending.append((kind, data, span))
+    return result
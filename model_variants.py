@@ -0,0 +1,135 @@
+# model_variants.py
+"""
+Učitavanje NLP modela (DialoGPT, emocije, sentiment) u odabranoj varijanti:
+
+  fp32 - originalni Hugging Face model (zadano),
+  int8 - dinamički kvantizirani linearni slojevi (torch), ~4x manje težine i brže na CPU-u,
+  onnx - model izvezen za ONNX Runtime (treba paket optimum[onnxruntime]).
+
+Varijanta se bira varijablom okoline MODEL_VARIANT, ili za pojedini model s
+MODEL_VARIANT_<KLJUČ> (npr. MODEL_VARIANT_DIALOGPT=int8). int8 i onnx varijante
+izvozi skripta a_15_optimize_nlp_models.py u models/optimized/<ključ>/<varijanta>/;
+ako odabrana varijanta nije izvezena, učitava se fp32.
+"""
+import os
+
+MODELS = {
+    'dialogpt': {'name': 'microsoft/DialoGPT-medium', 'task': 'text-generation'},
+    'emotion': {'name': 'j-hartmann/emotion-english-distilroberta-base', 'task': 'text-classification'},
+    'sentiment': {'name': 'nlptown/bert-base-multilingual-uncased-sentiment', 'task': 'sentiment-analysis'},
+}
+VARIANTS = ('fp32', 'int8', 'onnx')
+OPTIMIZED_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'optimized')
+INT8_WEIGHTS = 'quantized_state_dict.pt'
+
+
+def model_key(model_name):
+    """Ključ u MODELS za Hugging Face naziv modela (None ako model nije u tablici)."""
+    return next((key for key, spec in MODELS.items() if spec['name'] == model_name), None)
+
+
+def selected_variant(key):
+    variant = os.environ.get(f'MODEL_VARIANT_{key.upper()}') or os.environ.get('MODEL_VARIANT', 'fp32')
+    if variant not in VARIANTS:
+        print(f"⚠️ Nepoznata varijanta modela '{variant}' (moguće: {', '.join(VARIANTS)}), koristim fp32.")
+        return 'fp32'
+    return variant
+
+
+def variant_path(key, variant):
+    return os.path.join(OPTIMIZED_PATH, key, variant)
+
+
+def _model_class(task, onnx=False):
+    causal = task == 'text-generation'
+    if onnx:
+        from optimum.onnxruntime import ORTModelForCausalLM, ORTModelForSequenceClassification
+        return ORTModelForCausalLM if causal else ORTModelForSequenceClassification
+    from transformers import AutoModelForCausalLM, AutoModelForSequenceClassification
+    return AutoModelForCausalLM if causal else AutoModelForSequenceClassification
+
+
+def _conv1d_to_linear(model):
+    """
+    GPT-2 (DialoGPT) umjesto nn.Linear koristi transformers Conv1D, koji dinamička
+    kvantizacija ne prepoznaje; zamijeni ih ekvivalentnim nn.Linear slojevima.
+    """
+    import torch
+    from transformers.pytorch_utils import Conv1D
+
+    for parent in list(model.modules()):
+        for child_name, child in parent.named_children():
+            if isinstance(child, Conv1D):
+                linear = torch.nn.Linear(child.weight.shape[0], child.nf)
+                linear.weight.data = child.weight.data.t().contiguous()
+                linear.bias.data = child.bias.data
+                setattr(parent, child_name, linear)
+    return model
+
+
+def quantize_int8(model):
+    """Dinamička int8 kvantizacija linearnih slojeva (težine int8, aktivacije se kvantiziraju u hodu)."""
+    import torch
+    model = _conv1d_to_linear(model).eval()
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def load_model(key, variant=None):
+    """(tokenizer, model, varijanta) za model iz MODELS; model je u eval načinu."""
+    from transformers import AutoConfig, AutoTokenizer
+
+    spec = MODELS[key]
+    variant = variant or selected_variant(key)
+    path = variant_path(key, variant)
+    if variant != 'fp32' and not os.path.isdir(path):
+        print(f"⚠️ Varijanta '{variant}' modela {spec['name']} nije izvezena ({path}), koristim fp32.")
+        variant = 'fp32'
+
+    if variant == 'fp32':
+        tokenizer = AutoTokenizer.from_pretrained(spec['name'])
+        model = _model_class(spec['task']).from_pretrained(spec['name']).eval()
+    elif variant == 'onnx':
+        tokenizer = AutoTokenizer.from_pretrained(path)
+        model = _model_class(spec['task'], onnx=True).from_pretrained(path)
+    else:
+        # Arhitektura iz konfiguracije (bez učitavanja fp32 težina), zatim spremljene int8 težine
+        import torch
+        tokenizer = AutoTokenizer.from_pretrained(path)
+        model = quantize_int8(_model_class(spec['task']).from_config(AutoConfig.from_pretrained(path)))
+        model.load_state_dict(torch.load(os.path.join(path, INT8_WEIGHTS), weights_only=False))
+    return tokenizer, model, variant
+
+
+def load_pipeline(key, variant=None, **kwargs):
+    """transformers pipeline za model iz MODELS u odabranoj varijanti (kwargs idu pipeline-u, npr. top_k)."""
+    from transformers import pipeline
+
+    tokenizer, model, variant = load_model(key, variant)
+    return pipeline(MODELS[key]['task'], model=model, tokenizer=tokenizer, **kwargs)
+
+
+def export_variant(key, variant):
+    """Izvezi int8 ili onnx varijantu modela u models/optimized/<ključ>/<varijanta>/; vraća putanju."""
+    from transformers import AutoTokenizer
+
+    spec = MODELS[key]
+    path = variant_path(key, variant)
+    tokenizer = AutoTokenizer.from_pretrained(spec['name'])
+
+    # Mapa se stvara tek kad je model spreman, jer load_model() postojeću mapu smatra izvezenom varijantom
+    if variant == 'int8':
+        import torch
+        model = _model_class(spec['task']).from_pretrained(spec['name'])
+        config = model.config
+        state_dict = quantize_int8(model).state_dict()
+        os.makedirs(path, exist_ok=True)
+        config.save_pretrained(path)
+        torch.save(state_dict, os.path.join(path, INT8_WEIGHTS))
+    elif variant == 'onnx':
+        model = _model_class(spec['task'], onnx=True).from_pretrained(spec['name'], export=True)
+        os.makedirs(path, exist_ok=True)
+        model.save_pretrained(path)
+    else:
+        raise ValueError(f"Varijanta '{variant}' se ne izvozi (moguće: int8, onnx)")
+    tokenizer.save_pretrained(path)
+    return path
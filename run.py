@@ -1,7 +1,11 @@
 # run.py
+import os
+
 from app import create_app
+from config import CONFIGS
 
-app = create_app()
+# APP_CONFIG=production uključuje produkcijski profil baze (WAL, pool), vidi config.py
+app = create_app(CONFIGS[os.environ.get('APP_CONFIG', 'development')])
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True)
@@ -0,0 +1,58 @@
+# tests/test_emotion_service.py
+import time
+
+import pytest
+
+import emotion_service as module
+from emotion_service import EmotionService
+
+
+@pytest.fixture(autouse=True)
+def english(monkeypatch):
+    monkeypatch.setattr(module, 'detect', lambda text: 'en')
+
+
+def _service(delay=0.0):
+    """Servis s lažnim modelom za emocije: 'joy' za svaki tekst, nakon `delay` sekundi."""
+    calls = []
+
+    def emotion_classifier(texts, **kwargs):
+        calls.append(list(texts))
+        time.sleep(delay)
+        return [[{'label': 'joy', 'score': 0.9}] for _ in texts]
+
+    service = EmotionService()
+    service._classifiers = (emotion_classifier, None)
+    return service, calls
+
+
+def test_first_call_for_new_text_waits_for_background_result():
+    service, calls = _service(delay=0.05)
+    result = service.analyze(["Best workout of my life today!"], wait=2)[0]
+    assert result['label'] == 'joy'
+    assert result['provisional'] is False
+    assert calls == [["Best workout of my life today!"]]
+
+
+def test_first_call_past_timeout_is_provisional():
+    service, _calls = _service(delay=0.5)
+    result = service.analyze(["I feel wonderful"], wait=0.01)[0]
+    assert result['label'] == 'neutral'
+    assert result['provisional'] is True
+
+    # Pozadinska klasifikacija se dovrši, pa sljedeći poziv dobije stvarnu oznaku
+    result = service.analyze(["I feel wonderful"], wait=2)[0]
+    assert (result['label'], result['provisional']) == ('joy', False)
+
+
+def test_no_wait_returns_provisional_neutral():
+    service, _calls = _service()
+    assert service.analyze(["Such a great day"], wait=False)[0]['provisional'] is True
+
+
+def test_cached_and_label_texts_are_not_provisional():
+    service, calls = _service()
+    service.analyze(["Great session"])  # wait=True: klasificira u ovoj dretvi
+    results = service.analyze(["great   session", "neutral"], wait=False)
+    assert [(r['label'], r['provisional']) for r in results] == [('joy', False), ('neutral', False)]
+    assert len(calls) == 1
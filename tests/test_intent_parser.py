@@ -0,0 +1,26 @@
+# tests/test_intent_parser.py
+import pytest
+
+from app.intent_parser import parse_intent
+
+
+@pytest.mark.parametrize('text', [
+    "nisam jeo 2 banane",
+    "ne 2 banane",
+    "nisam radio čučanj 3x10",
+    "danas nije bilo 2 litre vode",
+    "bez 200g piletine",
+    "sutra ću popiti 2 litre vode",
+    "neću raditi bench press 4x8 80kg",
+])
+def test_negated_or_future_messages_go_to_model(text):
+    assert parse_intent(text) is None
+
+
+@pytest.mark.parametrize('text, action', [
+    ("pojeo sam 2 banane", 'log_meal'),
+    ("čučanj 3x10 100kg", 'log_workout'),
+    ("popio sam 2 litre vode", 'log_water'),
+])
+def test_plain_log_messages_use_fast_path(text, action):
+    assert parse_intent(text)['action'] == action
@@ -0,0 +1,64 @@
+# tests/test_llm_cache.py
+from app.llm import CACHED_REPLY, LLMClient, LocalProvider, ResponseCache
+
+SCOPE = 'smart_input:v1'
+
+
+class CountingProvider(LocalProvider):
+    def __init__(self, reply=None):
+        super().__init__()
+        self.calls = 0
+        self.reply = reply
+
+    def complete(self, messages, timeout=None):
+        self.calls += 1
+        return self.reply or super().complete(messages, timeout)
+
+
+def _conversation(username, *turns):
+    system = {'role': 'system', 'content': f"Ti si NutriFit AI. Informacije o korisniku: {username}, Cilj: mršavljenje."}
+    return [system] + [{'role': role, 'content': content} for role, content in turns]
+
+
+def test_same_phrase_from_another_user_is_served_from_cache():
+    provider = CountingProvider()
+    llm = LLMClient(provider, ResponseCache())
+
+    first = llm.complete(_conversation('ana', ('user', 'bench press 3x10 80kg')), SCOPE)
+    # Drugi korisnik, usred vlastitog razgovora
+    second = llm.complete(_conversation('marko', ('user', 'bok'), ('assistant', 'Bok! Što bilježimo?'),
+                                        ('user', 'Bench press 3x10 80kg!')), SCOPE)
+
+    assert provider.calls == 1
+    assert llm.cache.hits == 1
+    assert second.startswith(CACHED_REPLY)
+    assert second.endswith(first[first.index('<execute>'):])
+
+
+def test_streamed_reply_is_served_from_cache():
+    provider = CountingProvider()
+    llm = LLMClient(provider, ResponseCache())
+    ''.join(llm.stream(_conversation('ana', ('user', 'jeo sam 200g piletine')), SCOPE))
+    cached = ''.join(llm.stream(_conversation('marko', ('user', 'jeo sam 200g piletine')), SCOPE))
+    assert provider.calls == 1
+    assert '"log_meal"' in cached
+
+
+def test_follow_up_answer_is_not_cached():
+    # "200g" je potpun samo uz prethodno pitanje, pa se ne smije ponoviti u drugom razgovoru
+    reply = 'U redu.<execute>{"action": "log_meal", "parameters": {"food_name": "piletina", "quantity": 200}}</execute>'
+    provider = CountingProvider(reply)
+    llm = LLMClient(provider, ResponseCache())
+    turns = [('user', 'jeo sam piletinu'), ('assistant', 'Koliko?'), ('user', '200g')]
+    llm.complete(_conversation('ana', *turns), SCOPE)
+    llm.complete(_conversation('marko', ('user', '200g')), SCOPE)
+    assert provider.calls == 2
+    assert len(llm.cache) == 0
+
+
+def test_no_cache_without_scope():
+    provider = CountingProvider()
+    llm = LLMClient(provider, ResponseCache())
+    for _ in range(2):
+        llm.complete(_conversation('ana', ('user', 'bench press 3x10 80kg')))
+    assert provider.calls == 2
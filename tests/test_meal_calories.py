@@ -0,0 +1,21 @@
+# tests/test_meal_calories.py
+import pytest
+
+from app.intent_parser import parse_intent
+from app.services import meal_calories
+
+
+def test_grams_are_per_100g():
+    assert meal_calories(165, 200, 'g') == pytest.approx(330)
+    assert meal_calories(42, 250, 'ml') == pytest.approx(105)
+    assert meal_calories(100, 0.5, 'kg') == pytest.approx(500)
+
+
+def test_pieces_without_unit():
+    assert meal_calories(89, 2, 'kom') == pytest.approx(178)
+    assert meal_calories(89, 2, None) == pytest.approx(178)
+
+
+def test_parsed_gram_meal_is_not_multiplied_by_grams():
+    parameters = parse_intent("pojeo sam 200g piletine")['parameters']
+    assert meal_calories(165, parameters['quantity'], parameters['unit']) == pytest.approx(330)
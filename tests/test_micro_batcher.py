@@ -0,0 +1,92 @@
+# tests/test_micro_batcher.py
+from types import SimpleNamespace
+
+import pytest
+
+torch = pytest.importorskip('torch')
+transformers = pytest.importorskip('transformers')
+
+from ai_virtual_trainer import KVCachePool, MicroBatcher, TrainerSession, _GenerationRequest
+
+EOS = 63
+NEW_TOKENS = 6
+
+
+@pytest.fixture(scope='module')
+def host():
+    """
+    Mali nasumični GPT-2 (bez preuzimanja), float64 da padding ne mijenja greedy odabir. Veće
+    početne težine daju raznolike tokene (inače model samo ponavlja zadnji token ulaza, a tada
+    bi test prošao i s krivim pozicijama ili cache-om).
+    """
+    torch.manual_seed(0)
+    config = transformers.GPT2Config(vocab_size=64, n_positions=128, n_embd=32, n_layer=2, n_head=2,
+                                     bos_token_id=EOS, eos_token_id=EOS, initializer_range=0.5)
+    model = transformers.GPT2LMHeadModel(config).double().eval()
+    return SimpleNamespace(model=model, tokenizer=SimpleNamespace(pad_token_id=EOS, eos_token_id=EOS))
+
+
+def _unbatched(host, input_ids):
+    with torch.inference_mode():
+        output = host.model.generate(torch.tensor([input_ids]), attention_mask=torch.ones(1, len(input_ids)),
+                                     max_new_tokens=NEW_TOKENS, do_sample=False, pad_token_id=EOS)
+    tokens = output[0, len(input_ids):].tolist()
+    return tokens[:tokens.index(EOS) + 1] if EOS in tokens else tokens
+
+
+def _run(host, requests):
+    MicroBatcher(host, max_new_tokens=NEW_TOKENS, do_sample=False)._run_batch(requests)
+    for request in requests:
+        assert request.error is None, request.error
+    return requests
+
+
+def test_batched_generation_matches_unbatched(host):
+    prompts = [[5, 6, 7], [10, 11, 12, 13, 14, 15, 16], [20, 21, 22, 23, 24]]
+    requests = _run(host, [_GenerationRequest(prompt) for prompt in prompts])
+    for prompt, request in zip(prompts, requests):
+        assert request.output == _unbatched(host, prompt)
+        # Cache pokriva ulaz i generirane tokene osim zadnjeg
+        assert request.cache[0][0].shape[2] == len(prompt) + len(request.output) - 1
+
+
+def test_batched_generation_with_cached_past_matches_unbatched(host):
+    prompts = [[5, 6, 7], [10, 11, 12, 13, 14, 15, 16], [20, 21, 22, 23, 24]]
+    first_turn = _run(host, [_GenerationRequest(prompt) for prompt in prompts])
+    follow_ups = [[30, 31], [32, 33, 34, 35, 36, 37], [38]]
+
+    second_turn, expected = [], []
+    for prompt, request, follow_up in zip(prompts, first_turn, follow_ups):
+        history = prompt + request.output + follow_up
+        cached = len(prompt) + len(request.output) - 1
+        second_turn.append(_GenerationRequest(history, request.cache, cached))
+        expected.append(_unbatched(host, history))
+    # Redak bez cache-a u istom batchu s recima koji ga imaju
+    second_turn.append(_GenerationRequest([40, 41, 42, 43]))
+    expected.append(_unbatched(host, [40, 41, 42, 43]))
+
+    for request, tokens in zip(_run(host, second_turn), expected):
+        assert request.output == tokens
+
+
+def test_kv_cache_pool_is_capped_by_bytes():
+    pool = KVCachePool(max_tokens=10, max_mb=2 * 10 * 128 / 1024 / 1024)  # 2 puna razgovora po 128 B po tokenu
+    layer = (torch.zeros(1, 2, 4, 8), torch.zeros(1, 2, 4, 8))  # 4 tokena; K i V po 2 × 8 × 4 B po tokenu
+    sessions = [TrainerSession({}) for _ in range(4)]
+    for session in sessions[:3]:
+        pool.store(session, [layer], [1, 2, 3, 4])
+    assert pool.bytes_per_token == 128
+    assert pool.sessions == 2
+    assert pool.stats()['sessions'] == 3  # 12 tokena, limit je 20 tokena
+
+    pool.store(sessions[3], [(torch.zeros(1, 2, 10, 8), torch.zeros(1, 2, 10, 8))], list(range(10)))
+    assert pool.bytes <= pool.max_bytes
+    assert sessions[0].kv_cache is None  # najdulje nekorišten
+    assert sessions[1].kv_cache is not None
+
+
+def test_kv_cache_pool_counts_sessions_from_model_config(host):
+    pool = KVCachePool(max_tokens=640, max_mb=384)
+    # 2 sloja × 32 × float64: 1 KiB po tokenu
+    assert pool.configure(host.model) == 384 * 1024 // 640
+    assert pool.bytes_per_token == 2 * 2 * 32 * 8
@@ -0,0 +1,45 @@
+# tests/test_user_profiles.py
+from app.user_profiles import ProfileCache, UserProfile
+
+
+def _profile(user_id, goal):
+    return UserProfile(id=user_id, username='u', goal=goal)
+
+
+def test_profile_is_cached_until_invalidated():
+    cache, loads = ProfileCache(), []
+
+    def loader(user_id):
+        loads.append(user_id)
+        return _profile(user_id, 'muscle_gain')
+
+    assert cache.get(1, loader).goal == 'muscle_gain'
+    cache.get(1, loader)
+    assert loads == [1]
+    cache.invalidate(1)
+    cache.get(1, loader)
+    assert loads == [1, 1]
+
+
+def test_profile_loaded_during_invalidation_is_not_cached():
+    cache = ProfileCache()
+    goals = iter(['muscle_gain', 'weight_loss'])
+
+    def stale_loader(user_id):
+        profile = _profile(user_id, next(goals))
+        cache.invalidate(user_id)  # izmjena korisnika dok se stari redak učitava
+        return profile
+
+    assert cache.get(1, stale_loader).goal == 'muscle_gain'  # zahtjev koji je učitao dobije svoj profil
+    assert cache.get(1, lambda user_id: _profile(user_id, 'weight_loss')).goal == 'weight_loss'
+
+
+def test_clear_during_load_discards_profile():
+    cache = ProfileCache()
+
+    def loader(user_id):
+        cache.clear()
+        return _profile(user_id, 'maintenance')
+
+    cache.get(2, loader)
+    assert cache.stats()['entries'] == 0